@@ -2,26 +2,44 @@
 Damage Assessment API
 Handles image upload, analysis, and damage assessment endpoints
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
+import asyncio
+import json
 import os
 import uuid
 import shutil
+import time
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 import logging
 import numpy as np
 
 
-from ..config.database import get_database
+from ..config.database import SessionLocal, get_database
 from ..config.settings import get_settings
+from ..config.fidelity import ML_INPUT_SIZE, FidelityTier, resolve_fidelity
 from ..services.cv_service import CVService
 from ..services.ml_service import MLService
 from ..services.geospatial_service import GeospatialService
+from ..services.image_downloader import DownloadedImage, get_image_downloader
+from ..services.job_queue import JobQueueFullError, get_job_queue, job_handler
+from ..services.post_processing import post_process
+from ..services.result_cache import get_result_cache
+from ..services.stage_graph import PipelineStage, StageGraph
 from ..models.damage_assessment import DamageAssessmentModel
 from ..schemas.damage_assessment import DamageAssessmentResponse
-from ..utils.image_io import download_and_normalize_image, validate_image_file
+from ..utils.image_io import (
+    ImageTooLargeError, image_file_extension, is_zip_upload, iter_zip_images, write_image_file,
+)
+from ..utils.image_context import ImageAnalysisContext
+from ..utils.image_derivatives import DERIVATIVE_FORMATS, derivative_path, derivative_source, write_derivatives
+from ..utils.image_roi import RegionOfInterest, crop_region, parse_regions, regions_key
+from ..utils.image_tiles import TiledImage
+from ..utils.image_hash import bytes_sha256, difference_hash, file_sha256
 
 router = APIRouter(prefix="/api/v1/damage")
 settings = get_settings()
@@ -36,155 +54,793 @@ class AnalyzeByUrlPayload(BaseModel):
     fileUrl: str
     latitude: Optional[float] = None
     longitude: Optional[float] = None
+    fidelity: Optional[str] = None
+    rois: Optional[List[Dict[str, Any]]] = None
 
 
 @router.post("/analyze-by-url", response_model=DamageAssessmentResponse)
-async def analyze_damage_by_url(payload: AnalyzeByUrlPayload, db: Session = Depends(get_database)):
+async def analyze_damage_by_url(payload: AnalyzeByUrlPayload, stream: Optional[str] = None,
+                                db: Session = Depends(get_database)):
+    """
+    Analyze an image by URL. With **stream** (ndjson or sse) results are
+    streamed progressively: a coarse estimate first, then each refined stage.
+    **rois** restricts the analysis to regions of the image (see /assess-damage).
+    """
     try:
         if not payload.fileUrl:
             raise HTTPException(status_code=400, detail="fileUrl is required")
 
-        # Download & normalize image from URL -> file_path
-        try:
-            file_path = download_and_normalize_image(payload.fileUrl, settings.upload_directory)
-            logger.info(f"Image downloaded and normalized: {file_path}")
-
-            # Validate the downloaded file
-            if not validate_image_file(file_path):
-                # Clean up invalid file
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                raise HTTPException(status_code=400, detail="Downloaded file is not a valid image")
-
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=str(e))
-        except Exception as e:
-            logger.error(f"Failed to download image from URL: {str(e)}")
-            raise HTTPException(status_code=500, detail="Failed to download image from URL")
-
-        # Generate assessment_id for tracking
-        assessment_id = str(uuid.uuid4())
-
-        # 🔥 AI DAMAGE ASSESSMENT PIPELINE
+        tier = get_fidelity_tier(payload.fidelity)
+        stream_format = get_stream_format(stream)
+        regions = get_regions(payload.rois)
 
-        # 1. Computer Vision Analysis
-        cv_result = await cv_service.analyze_damage(file_path)
-        cv_result = convert_numpy_types(cv_result)
+        # Download the image into memory; it is decoded straight from these bytes
+        downloaded = await download_url_image(payload.fileUrl)
+        if stream_format:
+            return stream_url_assessment(stream_format, downloaded, payload.fileUrl,
+                                         payload.latitude, payload.longitude, tier, regions)
+        result = await assess_url_image(downloaded, payload.fileUrl, payload.latitude, payload.longitude, tier,
+                                        regions)
 
-        # 2. Machine Learning Damage Classification
-        ml_result = await ml_service.classify_damage(file_path, None)  # No disaster type from URL
-        ml_result = convert_numpy_types(ml_result)
+        # Save to database
+        db.add(result.assessment)
+        db.commit()
+        db.refresh(result.assessment)
 
-        # 3. Infrastructure Impact Assessment
-        infrastructure_impact = await cv_service.assess_infrastructure_damage(file_path)
-        infrastructure_impact = convert_numpy_types(infrastructure_impact)
+        logger.info(f"✅ URL-based damage assessment completed - Severity: {result.assessment.severity_score}/10, "
+                    f"Priority: {result.assessment.priority_score}")
 
-        # 4. Severity Scoring (1-10 scale)
-        severity_score = calculate_severity_score(cv_result, ml_result, infrastructure_impact)
-        severity_score = float(severity_score)
+        # The stored copy is the downloaded bytes as-is, written by the post-processing workers
+        if result.file_path:
+            await post_process("persist_image", write_image_file, result.file_path, downloaded.data)
 
-        # 5. Resource Requirement Prediction
-        resource_requirements = await ml_service.predict_resource_requirements(
-            severity_score, infrastructure_impact, None
-        )
-        resource_requirements = convert_numpy_types(resource_requirements)
+        return result.response()
 
-        # 6. Priority Assessment
-        priority_score = await ml_service.calculate_priority_score(
-            severity_score, resource_requirements, payload.latitude, payload.longitude
-        )
-        priority_score = float(priority_score)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("URL-based analysis failed")
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
-        # 7. Geospatial Analysis (if coordinates provided)
-        location_data = None
-        if payload.latitude is not None and payload.longitude is not None:
-            location_data = await geo_service.get_location_info(payload.latitude, payload.longitude)
-            if location_data:
-                location_data = convert_numpy_types(location_data)
+class BulkUrlItem(BaseModel):
+    fileUrl: str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    rois: Optional[List[Dict[str, Any]]] = None
 
-        # 8. Generate Action Recommendations
-        recommendations = generate_action_recommendations(
-            severity_score, resource_requirements, infrastructure_impact
-        )
 
-        # Compile comprehensive assessment data
-        analysis_data = {
-            "file_info": {
-                "filename": os.path.basename(file_path),
-                "assessment_id": assessment_id,
-                "file_path": file_path,
-                "source_url": payload.fileUrl
-            },
-            "damage_analysis": {
-                "severity_score": severity_score,
-                "damage_level": get_damage_level(severity_score),
-                "confidence_score": max(cv_result.get("confidence_score", 0), ml_result.get("confidence_score", 0)),
-                "assessment_timestamp": datetime.utcnow().isoformat()
-            },
-            "computer_vision": cv_result,
-            "machine_learning": ml_result,
-            "infrastructure_impact": infrastructure_impact,
-            "resource_requirements": resource_requirements,
-            "priority_assessment": {
-                "priority_score": priority_score,
-                "urgency_level": get_urgency_level(priority_score),
-                "estimated_response_time": calculate_response_time(priority_score)
-            },
-            "location_data": {
-                "latitude": payload.latitude,
-                "longitude": payload.longitude,
-                "geospatial_analysis": location_data
-            }
-        }
+class BulkAnalyzeByUrlPayload(BaseModel):
+    items: List[BulkUrlItem]
+    fidelity: Optional[str] = None
 
-        # Convert the entire analysis_data to ensure no numpy types remain
-        analysis_data = convert_numpy_types(analysis_data)
 
-        # Save to database
-        assessment = DamageAssessmentModel(
-            image_path=file_path,
-            image_filename=os.path.basename(file_path),
-            damage_level=get_damage_level(severity_score),
-            severity_score=severity_score,
-            confidence_score=float(analysis_data["damage_analysis"]["confidence_score"]),
-            priority_score=priority_score,
-            urgency_level=get_urgency_level(priority_score),
-            analysis_data=analysis_data,
-            processing_time=0,  # Will be calculated
-            location_data={"latitude": payload.latitude, "longitude": payload.longitude} if payload.latitude and payload.longitude else None,
-            disaster_type=None,  # URL-based analysis doesn't specify disaster type
-            status="completed",
-            created_at=datetime.utcnow()
-        )
+@router.post("/analyze-by-url/bulk")
+async def analyze_damage_by_url_bulk(payload: BulkAnalyzeByUrlPayload):
+    """
+    Analyze a batch of image URLs in one request
 
+    Downloads run concurrently, analysis runs on a bounded number of workers
+    and assessments are inserted in batches. Results stream back as NDJSON
+    (application/x-ndjson), one line per item in completion order, followed
+    by a summary line. Full records are available from /assessment/{id}.
+    """
+    if not payload.items:
+        raise HTTPException(status_code=400, detail="items must not be empty")
+    if len(payload.items) > settings.bulk_max_items:
+        raise HTTPException(status_code=400, detail=f"At most {settings.bulk_max_items} items per request")
+    tier = get_fidelity_tier(payload.fidelity)
+    return StreamingResponse(stream_bulk_url_assessments(payload.items, tier), media_type="application/x-ndjson")
+
+BULK_BATCH_LINGER_SECONDS = 0.2  # how long a partial insert batch waits for more results
+
+async def stream_bulk_url_assessments(items: List[BulkUrlItem], tier: FidelityTier):
+    """Fetch-and-analyze pipeline for the bulk endpoint, yielding NDJSON lines"""
+    started = time.perf_counter()
+    results: asyncio.Queue = asyncio.Queue()
+    download_slots = asyncio.Semaphore(settings.bulk_download_concurrency)
+    analysis_slots = asyncio.Semaphore(settings.bulk_analysis_workers)
+    # Bounds how many downloaded images wait in memory for an analysis worker
+    in_flight = asyncio.Semaphore(settings.bulk_download_concurrency + settings.bulk_analysis_workers)
+
+    async def process(index: int, item: BulkUrlItem) -> None:
+        item_started = time.perf_counter()
+        try:
+            async with in_flight:
+                async with download_slots:
+                    downloaded = await download_url_image(item.fileUrl)
+                async with analysis_slots:
+                    result = await assess_url_image(downloaded, item.fileUrl, item.latitude, item.longitude, tier,
+                                                    get_regions(item.rois))
+            await results.put((index, item, result, downloaded, None, time.perf_counter() - item_started))
+        except HTTPException as e:
+            await results.put((index, item, None, None, e.detail, time.perf_counter() - item_started))
+        except Exception as e:
+            logger.exception(f"Bulk analysis failed for {item.fileUrl}")
+            await results.put((index, item, None, None, f"Analysis failed: {str(e)}",
+                               time.perf_counter() - item_started))
+
+    tasks = [asyncio.create_task(process(index, item)) for index, item in enumerate(items)]
+    completed = failed = 0
+    remaining = len(items)
+    db = SessionLocal()
+    try:
+        while remaining:
+            batch = [await results.get()]
+            # Group results finishing close together into one insert
+            while len(batch) < settings.bulk_db_batch_size and len(batch) < remaining:
+                try:
+                    batch.append(await asyncio.wait_for(results.get(), BULK_BATCH_LINGER_SECONDS))
+                except asyncio.TimeoutError:
+                    break
+            remaining -= len(batch)
+
+            saved = [entry for entry in batch if entry[2] is not None]
+            fields = {}
+            save_error = None
+            if saved:
+                try:
+                    db.add_all([entry[2].assessment for entry in saved])
+                    db.flush()  # assigns ids; read before commit expires the rows
+                    fields = {entry[0]: bulk_result_fields(entry[2].assessment, entry[2].assessment_id) for entry in saved}
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Bulk insert of {len(saved)} assessments failed: {str(e)}")
+                    save_error = f"Database insert failed: {str(e)}"
+
+            for index, item, result, downloaded, error, elapsed in batch:
+                line = {"index": index, "fileUrl": item.fileUrl}
+                error = error or (save_error if result is not None else None)
+                if error is not None:
+                    failed += 1
+                    line.update(status="failed", error=error)
+                else:
+                    completed += 1
+                    line.update(status="completed", **fields[index])
+                    if result.file_path:
+                        await post_process("persist_image", write_image_file, result.file_path, downloaded.data)
+                line["elapsed_ms"] = round(elapsed * 1000, 1)
+                yield json.dumps(line) + "\n"
+
+        yield json.dumps({"summary": {
+            "total": len(items),
+            "completed": completed,
+            "failed": failed,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }}) + "\n"
+    finally:
+        # Stop outstanding work if the client disconnects mid-stream
+        for task in tasks:
+            task.cancel()
+        db.close()
+
+def bulk_result_fields(assessment: DamageAssessmentModel, assessment_id: str) -> Dict:
+    """Per-item summary returned by the bulk and batch endpoints"""
+    return {
+        "id": assessment.id,
+        "assessment_id": assessment_id,
+        "severity_score": assessment.severity_score,
+        "damage_level": assessment.damage_level,
+        "confidence_score": assessment.confidence_score,
+        "priority_score": assessment.priority_score,
+        "urgency_level": assessment.urgency_level,
+        "cache_hit": assessment.analysis_data["cache"].get("hit", False),
+    }
+
+def persist_assessment(assessment: DamageAssessmentModel, describe: Callable[[DamageAssessmentModel], Any]) -> Any:
+    """
+    Store an assessment in its own session and return ``describe(assessment)``,
+    read after the insert and before the commit expires the row
+    """
+    db = SessionLocal()
+    try:
         db.add(assessment)
+        db.flush()
+        result = describe(assessment)
         db.commit()
-        db.refresh(assessment)
-
-        logger.info(f"✅ URL-based damage assessment completed - Severity: {severity_score}/10, Priority: {priority_score}")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return result
+
+@dataclass
+class UrlAssessment:
+    """A finished URL-based assessment that has not been saved yet"""
+    assessment: DamageAssessmentModel
+    assessment_id: str
+    file_path: Optional[str]
+    resource_requirements: Dict
+    infrastructure_impact: Dict
+    recommendations: List[str]
 
-        # Return properly structured response matching DamageAssessmentResponse schema
+    def response(self) -> DamageAssessmentResponse:
+        """Response for the saved assessment (matches the DamageAssessmentResponse schema)"""
+        assessment = self.assessment
         return DamageAssessmentResponse(
             id=assessment.id,
-            assessment_id=assessment_id,
-            severity_score=severity_score,
-            damage_level=get_damage_level(severity_score),
-            confidence_score=float(analysis_data["damage_analysis"]["confidence_score"]),
-            priority_score=priority_score,
-            urgency_level=get_urgency_level(priority_score),
-            resource_requirements=resource_requirements,
-            infrastructure_impact=infrastructure_impact,
-            analysis_data=analysis_data,
-            recommendations=recommendations,
+            assessment_id=self.assessment_id,
+            severity_score=assessment.severity_score,
+            damage_level=assessment.damage_level,
+            confidence_score=assessment.confidence_score,
+            priority_score=assessment.priority_score,
+            urgency_level=assessment.urgency_level,
+            resource_requirements=self.resource_requirements,
+            infrastructure_impact=self.infrastructure_impact,
+            analysis_data=assessment.analysis_data,
+            recommendations=self.recommendations,
             status="completed",
             created_at=assessment.created_at
         )
 
-    except HTTPException:
-        raise
+async def download_url_image(file_url: str) -> DownloadedImage:
+    """Fetch an image for URL-based analysis; raises 400 for bad URLs/content and 500 otherwise"""
+    try:
+        downloaded = await get_image_downloader().fetch(file_url)
+        logger.info(f"Image {'revalidated' if downloaded.from_cache else 'downloaded'}: "
+                    f"{file_url} ({len(downloaded.data)} bytes)")
+        return downloaded
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.exception("URL-based analysis failed")
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+        logger.error(f"Failed to download image from URL: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to download image from URL")
+
+def url_damage_request(
+    downloaded: DownloadedImage,
+    file_url: str,
+    latitude: Optional[float],
+    longitude: Optional[float],
+    tier: FidelityTier,
+    regions: Tuple[RegionOfInterest, ...] = (),
+) -> "DamageRequest":
+    """Pipeline request for a downloaded image, with its storage path when URL images are kept"""
+    file_path = None
+    if settings.persist_url_images:
+        file_path = os.path.join(
+            settings.upload_directory,
+            f"{uuid.uuid4()}.{image_file_extension(file_url, downloaded.content_type)}",
+        )
+    # No disaster type from URL
+    return DamageRequest(downloaded.data, tier, file_path, latitude, longitude, regions=regions)
+
+async def assess_url_image(
+    downloaded: DownloadedImage,
+    file_url: str,
+    latitude: Optional[float],
+    longitude: Optional[float],
+    tier: FidelityTier,
+    regions: Tuple[RegionOfInterest, ...] = (),
+) -> UrlAssessment:
+    """Run the full assessment pipeline on a downloaded image and build the (unsaved) record"""
+    # 🔥 AI DAMAGE ASSESSMENT PIPELINE: independent stages run concurrently
+    request = url_damage_request(downloaded, file_url, latitude, longitude, tier, regions)
+    results, stage_timings = await URL_PIPELINE.run(request, ASSESSMENT_TARGETS)
+    return build_url_assessment(results, request, downloaded, file_url, stage_timings)
+
+def stream_url_assessment(
+    stream_format: str,
+    downloaded: DownloadedImage,
+    file_url: str,
+    latitude: Optional[float],
+    longitude: Optional[float],
+    tier: FidelityTier,
+    regions: Tuple[RegionOfInterest, ...] = (),
+) -> StreamingResponse:
+    """Progressive /analyze-by-url: the stored record matches the non-streaming path"""
+    request = url_damage_request(downloaded, file_url, latitude, longitude, tier, regions)
+
+    async def finish(results: Dict, stage_timings: Dict) -> DamageAssessmentResponse:
+        result = build_url_assessment(results, request, downloaded, file_url, stage_timings)
+        response = persist_assessment(result.assessment, lambda saved: result.response())
+        logger.info(f"✅ URL-based damage assessment completed - Severity: {response.severity_score}/10, "
+                    f"Priority: {response.priority_score}")
+        if result.file_path:
+            await post_process("persist_image", write_image_file, result.file_path, downloaded.data)
+        return response
+
+    return progressive_response(stream_format, URL_PIPELINE, request, finish)
+
+def build_url_assessment(
+    results: Dict,
+    request: "DamageRequest",
+    downloaded: DownloadedImage,
+    file_url: str,
+    stage_timings: Dict,
+) -> UrlAssessment:
+    """Assessment record (unsaved) from the URL pipeline's stage results"""
+    image_bytes = downloaded.data
+    file_path = request.source_path
+    image_path = file_path or file_url
+    latitude, longitude = request.latitude, request.longitude
+
+    # Generate assessment_id for tracking
+    assessment_id = str(uuid.uuid4())
+
+    cv_result, ml_result, infrastructure_impact = results["cv"], results["ml"], results["infrastructure"]
+    severity_score, resource_requirements = results["severity"], results["resources"]
+    priority_score, location_data = results["priority"], results["location"]
+
+    # 8. Generate Action Recommendations
+    recommendations = generate_action_recommendations(
+        severity_score, resource_requirements, infrastructure_impact
+    )
+
+    # Compile comprehensive assessment data
+    analysis_data = {
+        "file_info": {
+            "filename": os.path.basename(image_path),
+            "assessment_id": assessment_id,
+            "file_path": file_path,
+            "source_url": file_url,
+            "file_size": len(image_bytes),
+            "download_cached": downloaded.from_cache
+        },
+        "cache": results["cache"],
+        "stage_timings": stage_timings,
+        "damage_analysis": {
+            "severity_score": severity_score,
+            "damage_level": get_damage_level(severity_score),
+            "confidence_score": max(cv_result.get("confidence_score", 0), ml_result.get("confidence_score", 0)),
+            "assessment_timestamp": datetime.utcnow().isoformat()
+        },
+        "computer_vision": cv_result,
+        "machine_learning": ml_result,
+        "infrastructure_impact": infrastructure_impact,
+        "resource_requirements": resource_requirements,
+        "priority_assessment": {
+            "priority_score": priority_score,
+            "urgency_level": get_urgency_level(priority_score),
+            "estimated_response_time": calculate_response_time(priority_score)
+        },
+        "location_data": {
+            "latitude": latitude,
+            "longitude": longitude,
+            "geospatial_analysis": location_data
+        }
+    }
+    if request.regions:
+        analysis_data["regions"] = region_results(request, cv_result, ml_result, infrastructure_impact)
+
+    # Convert the entire analysis_data to ensure no numpy types remain
+    analysis_data = convert_numpy_types(analysis_data)
+
+    assessment = DamageAssessmentModel(
+        image_path=image_path,
+        image_filename=os.path.basename(image_path),
+        damage_level=get_damage_level(severity_score),
+        severity_score=severity_score,
+        confidence_score=float(analysis_data["damage_analysis"]["confidence_score"]),
+        priority_score=priority_score,
+        urgency_level=get_urgency_level(priority_score),
+        analysis_data=analysis_data,
+        processing_time=0,  # Will be calculated
+        location_data={"latitude": latitude, "longitude": longitude} if latitude and longitude else None,
+        disaster_type=None,  # URL-based analysis doesn't specify disaster type
+        status="completed",
+        created_at=datetime.utcnow()
+    )
+    return UrlAssessment(
+        assessment=assessment,
+        assessment_id=assessment_id,
+        file_path=file_path,
+        resource_requirements=resource_requirements,
+        infrastructure_impact=infrastructure_impact,
+        recommendations=recommendations,
+    )
+
+async def load_image_context(source: Union[str, bytes], tier: Optional[FidelityTier] = None,
+                             source_path: Optional[str] = None) -> ImageAnalysisContext:
+    """
+    Decode a stored image (path) or in-memory image bytes once within the
+    pixel budget, no larger than the tier's stages need; raises 413 above the
+    decode limit and 400 if it cannot be decoded
+    """
+    min_size = tier.min_decode_size if tier is not None else None
+    try:
+        if isinstance(source, str):
+            return await asyncio.to_thread(ImageAnalysisContext.from_path, source, None, None, min_size)
+        return await asyncio.to_thread(ImageAnalysisContext.from_bytes, source, None, None, min_size, source_path)
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (FileNotFoundError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not decode image: {str(e)}")
+
+async def load_tiled_image(file_path: str) -> TiledImage:
+    """Open a large stored image for tiled analysis; raises 400 if it cannot be read"""
+    try:
+        return await asyncio.to_thread(TiledImage.open, file_path, settings.tiled_max_megapixels)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Could not open image for tiled analysis: {str(e)}")
+
+def analysis_cache_variant(tier: FidelityTier, disaster_type: Optional[str] = None, tiled: bool = False,
+                           regions: str = "") -> str:
+    """Request options that change stage 1-3 results; cached results are only shared within a variant"""
+    variant = f"{tier.name}|{'tiled' if tiled else 'whole'}|{disaster_type or ''}"
+    return f"{variant}|roi:{regions}" if regions else variant
+
+@dataclass
+class CacheLookup:
+    """Result-cache lookup for one image; ``results`` is set on a hit"""
+    results: Optional[Tuple[Dict, Dict, Dict]]
+    cache_info: Dict
+    content_hash: Optional[str] = None
+    perceptual_hash: Optional[int] = None
+    image_ctx: Optional[ImageAnalysisContext] = None
+
+async def lookup_cached_analysis(
+    source: Union[str, bytes],
+    load_context: Callable[[], Awaitable[ImageAnalysisContext]],
+    variant: str,
+) -> CacheLookup:
+    """
+    Find stage 1-3 results for the same image (identical bytes) or a
+    near-duplicate (perceptual hash). On a miss the decoded context is kept
+    on the lookup so the caller does not decode again.
+    """
+    cache = get_result_cache()
+    if cache is None:
+        return CacheLookup(None, {"hit": False, "enabled": False})
+
+    if isinstance(source, str):
+        content_hash = await asyncio.to_thread(file_sha256, source)
+    else:
+        content_hash = await asyncio.to_thread(bytes_sha256, source)
+    cached = cache.get_exact(content_hash, variant)
+    image_ctx = perceptual_hash = None
+    if cached is None:
+        image_ctx = await load_context()
+        perceptual_hash = await asyncio.to_thread(difference_hash, image_ctx.image)
+        cached = cache.get_similar(perceptual_hash, variant)
+
+    if cached is not None:
+        results, cache_info = cached
+        label = os.path.basename(source) if isinstance(source, str) else f"{len(source)}-byte upload"
+        logger.info(f"Analysis result cache {cache_info['match']} hit for {label}")
+        return CacheLookup(results, {**cache_info, "content_hash": content_hash}, content_hash)
+
+    return CacheLookup(None, {"hit": False, "content_hash": content_hash, "perceptual_hash": f"{perceptual_hash:016x}"},
+                       content_hash, perceptual_hash, image_ctx)
+
+def store_cached_analysis(lookup: CacheLookup, results: Tuple[Dict, Dict, Dict], variant: str) -> None:
+    """Cache freshly computed stage 1-3 results after a lookup miss"""
+    cache = get_result_cache()
+    # Fallback results from a failed stage are not worth replaying
+    if cache is not None and lookup.content_hash is not None and not any("error" in result for result in results):
+        cv_result, ml_result, infrastructure_impact = results
+        # The heatmap is a file of the analyzed upload, not part of the reusable result
+        cv_result = {key: value for key, value in cv_result.items() if key != "heatmap_path"}
+        cache.put(lookup.content_hash, lookup.perceptual_hash, (cv_result, ml_result, infrastructure_impact), variant)
+
+@dataclass
+class DamageRequest:
+    """Inputs shared by the stages of one damage analysis"""
+    source: Union[str, bytes]  # image bytes, or the stored file in tiled mode
+    tier: FidelityTier
+    source_path: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    disaster_type: Optional[str] = None
+    tiled: bool = False
+    regions: Tuple[RegionOfInterest, ...] = ()
+    image_ctx: Optional[ImageAnalysisContext] = None
+    tiled_image: Optional[TiledImage] = None
+
+    @property
+    def variant(self) -> str:
+        return analysis_cache_variant(self.tier, self.disaster_type, self.tiled, regions_key(self.regions))
+
+async def load_request_context(request: DamageRequest) -> ImageAnalysisContext:
+    """Decode the request's image once and share it across all pipeline stages"""
+    if request.image_ctx is None:
+        if request.tiled:
+            # Full-resolution tiles feed the CV detectors; the other stages use an overview
+            request.tiled_image = await load_tiled_image(request.source)
+            overview = await asyncio.to_thread(request.tiled_image.overview, 2048)
+            request.image_ctx = ImageAnalysisContext(overview, source_path=request.source)
+        else:
+            # Regions are cut from a full-resolution decode so small ones keep their detail
+            request.image_ctx = await load_image_context(request.source, None if request.regions else request.tier,
+                                                         source_path=request.source_path)
+    return request.image_ctx
+
+async def region_crops(request: DamageRequest, image: ImageAnalysisContext) -> List[ImageAnalysisContext]:
+    """The request's regions cut from the decoded image; raises 400 for regions outside it"""
+    try:
+        return [await asyncio.to_thread(crop_region, image, region) for region in request.regions]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def combine_region_results(results: List[Dict], damage: Callable[[Dict], float]) -> Dict:
+    """
+    One stage result for a request with regions: the most damaged region's
+    result at the top level and every region's under ``regions``, in request order
+    """
+    results = [convert_numpy_types(result) for result in results]
+    worst = max(range(len(results)), key=lambda i: damage(results[i]))
+    combined = {**results[worst], "region_index": worst, "regions": results}
+    errors = [result["error"] for result in results if "error" in result]
+    if errors:
+        combined["error"] = errors[0]
+    return combined
+
+def region_results(request: DamageRequest, cv_result: Dict, ml_result: Dict, infrastructure_impact: Dict) -> List[Dict]:
+    """Each region's shape and its own severity, from the per-region stage 1-3 results"""
+    source_dimensions = request.image_ctx.source_dimensions if request.image_ctx is not None else None
+    summaries = []
+    for region, cv_region, ml_region, infrastructure_region in zip(
+        request.regions, cv_result["regions"], ml_result["regions"], infrastructure_impact["regions"]
+    ):
+        severity_score = calculate_severity_score(cv_region, ml_region, infrastructure_region)
+        summaries.append({
+            **region.describe(source_dimensions),
+            "severity_score": severity_score,
+            "damage_level": get_damage_level(severity_score),
+            "confidence_score": max(cv_region.get("confidence_score", 0), ml_region.get("confidence_score", 0)),
+        })
+    return summaries
+
+async def lookup_stage(request: DamageRequest) -> CacheLookup:
+    # Stages 1-3 are reused for re-submitted images
+    return await lookup_cached_analysis(request.source, lambda: load_request_context(request), request.variant)
+
+async def image_stage(request: DamageRequest, lookup: CacheLookup) -> Optional[ImageAnalysisContext]:
+    if lookup.results is not None:
+        return None
+    return await load_request_context(request)
+
+async def cv_stage(request: DamageRequest, lookup: CacheLookup, image: Optional[ImageAnalysisContext]) -> Dict:
+    """1. Computer Vision Analysis"""
+    if lookup.results is not None:
+        cv_result = lookup.results[0]
+        if request.tiled and "severity_grid" in cv_result:
+            # Cached results carry no heatmap; draw the cached grid over this upload
+            cv_result = {**cv_result, "heatmap_path": await cv_service.render_tile_heatmap(request.source, cv_result)}
+        return cv_result
+    if request.regions:
+        crops = await region_crops(request, image)
+        results = await asyncio.gather(*(cv_service.analyze_damage(crop, fidelity=request.tier.name) for crop in crops))
+        return combine_region_results(results, lambda result: result.get("damage_score", 0))
+    if request.tiled:
+        cv_result = await cv_service.analyze_tiled(request.tiled_image, heatmap=True)
+    else:
+        cv_result = await cv_service.analyze_damage(image, fidelity=request.tier.name)
+    return convert_numpy_types(cv_result)
+
+async def coarse_stage(request: DamageRequest, lookup: CacheLookup, image: Optional[ImageAnalysisContext]) -> Dict:
+    """0. Coarse estimate for progressive results (never stored)"""
+    if lookup.results is not None:
+        # The cached CV result is already the refined one
+        return coarse_estimate(lookup.results[0], cached=True)
+    if request.regions:
+        crops = await region_crops(request, image)
+        results = await asyncio.gather(*(cv_service.coarse_damage(crop) for crop in crops))
+        return coarse_estimate(combine_region_results(results, lambda result: result.get("damage_score", 0)))
+    return coarse_estimate(convert_numpy_types(await cv_service.coarse_damage(image)))
+
+def coarse_estimate(cv_result: Dict, cached: bool = False) -> Dict:
+    """Severity estimate from a CV result alone, standing in for the ML score with neutral infrastructure"""
+    severity_score = calculate_severity_score(cv_result, cv_result, {})
+    return {
+        "severity_score": severity_score,
+        "damage_level": get_damage_level(severity_score),
+        "confidence_score": cv_result.get("confidence_score", 0),
+        "cached": cached,
+        "computer_vision": cv_result,
+    }
+
+async def ml_stage(request: DamageRequest, lookup: CacheLookup, image: Optional[ImageAnalysisContext]) -> Dict:
+    """2. Machine Learning Damage Classification"""
+    if lookup.results is not None:
+        return lookup.results[1]
+    if request.regions:
+        results = await ml_service.classify_damage_batch(await region_crops(request, image), request.disaster_type)
+        return combine_region_results(results, lambda result: result.get("damage_score", 0))
+    return convert_numpy_types(await ml_service.classify_damage(image, request.disaster_type))
+
+async def infrastructure_stage(request: DamageRequest, lookup: CacheLookup,
+                               image: Optional[ImageAnalysisContext], cv: Dict) -> Dict:
+    """
+    3. Infrastructure Impact Assessment. Runs after the CV stage so it reads
+    the detector scores CV memoized (or seeded from the process pool)
+    instead of computing them a second time.
+    """
+    if lookup.results is not None:
+        return lookup.results[2]
+    if request.regions:
+        crops = await region_crops(request, image)
+        results = await asyncio.gather(*(
+            cv_service.assess_infrastructure_damage(crop, fidelity=request.tier.name) for crop in crops
+        ))
+        # Lower infrastructure scores mean more damage
+        return combine_region_results(results, lambda result: -result.get("overall_infrastructure_score", 10))
+    return convert_numpy_types(await cv_service.assess_infrastructure_damage(image, fidelity=request.tier.name))
+
+async def cache_stage(request: DamageRequest, lookup: CacheLookup, cv: Dict, ml: Dict, infrastructure: Dict) -> Dict:
+    """Cache fresh stage 1-3 results; returns the cache metadata for analysis_data"""
+    if lookup.results is None:
+        store_cached_analysis(lookup, (cv, ml, infrastructure), request.variant)
+    return lookup.cache_info
+
+async def severity_stage(request: DamageRequest, cv: Dict, ml: Dict, infrastructure: Dict) -> float:
+    """4. Severity Scoring (1-10 scale); with regions, the most severe region's score"""
+    if request.regions:
+        return float(max(region["severity_score"] for region in region_results(request, cv, ml, infrastructure)))
+    return float(calculate_severity_score(cv, ml, infrastructure))
+
+async def resources_stage(request: DamageRequest, severity: float, infrastructure: Dict) -> Dict:
+    """5. Resource Requirement Prediction"""
+    return convert_numpy_types(await ml_service.predict_resource_requirements(
+        severity, infrastructure, request.disaster_type
+    ))
+
+async def priority_stage(request: DamageRequest, severity: float, resources: Dict) -> float:
+    """6. Priority Assessment"""
+    return float(await ml_service.calculate_priority_score(
+        severity, resources, request.latitude, request.longitude
+    ))
+
+async def location_risk(latitude: Optional[float], longitude: Optional[float]) -> Optional[Dict]:
+    """7. Geospatial Analysis for uploads (if coordinates provided)"""
+    geospatial_data = None
+    if latitude and longitude:
+        geospatial_data = await geo_service.analyze_location_risk(latitude, longitude)
+        if geospatial_data:
+            geospatial_data = convert_numpy_types(geospatial_data)
+    return geospatial_data
+
+async def location_risk_stage(request: DamageRequest) -> Optional[Dict]:
+    return await location_risk(request.latitude, request.longitude)
+
+async def location_info_stage(request: DamageRequest) -> Optional[Dict]:
+    """7. Geospatial Analysis for URL images (if coordinates provided)"""
+    location_data = None
+    if request.latitude is not None and request.longitude is not None:
+        location_data = await geo_service.get_location_info(request.latitude, request.longitude)
+        if location_data:
+            location_data = convert_numpy_types(location_data)
+    return location_data
+
+def derivative_sizes() -> Dict[str, int]:
+    """Longest side of each image derivative, by name"""
+    return {"thumbnail": settings.image_thumbnail_size, "preview": settings.image_preview_size}
+
+async def derivatives_stage(request: DamageRequest, lookup: CacheLookup,
+                            image: Optional[ImageAnalysisContext]) -> Optional[List[str]]:
+    """9. Thumbnail and preview of the stored image, encoded by the post-processing workers"""
+    if not settings.image_derivatives_enabled or request.source_path is None:
+        return None
+    sizes = derivative_sizes()
+    source = None
+    if image is not None:
+        # Only the preview-sized pixels are queued, not the full decode
+        source = await asyncio.to_thread(derivative_source, image, sizes)
+    await post_process("derivatives", write_derivatives, source or request.source, request.source_path,
+                       sizes, settings.image_derivative_quality)
+    return list(sizes)
+
+def damage_pipeline(location: Callable[[DamageRequest], Awaitable[Optional[Dict]]]) -> StageGraph:
+    """
+    Stage graph for one image: CV and ML share the decoded image and run
+    concurrently with the location lookup; infrastructure follows CV, whose
+    detector scores it reuses. Scoring stages start as soon as their inputs
+    are ready. The coarse stage only runs when
+    requested (progressive results).
+    """
+    return StageGraph([
+        PipelineStage("lookup", lookup_stage),
+        PipelineStage("image", image_stage, ("lookup",)),
+        PipelineStage("coarse", coarse_stage, ("lookup", "image")),
+        PipelineStage("cv", cv_stage, ("lookup", "image")),
+        PipelineStage("ml", ml_stage, ("lookup", "image")),
+        PipelineStage("infrastructure", infrastructure_stage, ("lookup", "image", "cv")),
+        PipelineStage("cache", cache_stage, ("lookup", "cv", "ml", "infrastructure")),
+        PipelineStage("location", location),
+        PipelineStage("severity", severity_stage, ("cv", "ml", "infrastructure")),
+        PipelineStage("resources", resources_stage, ("severity", "infrastructure")),
+        PipelineStage("priority", priority_stage, ("severity", "resources")),
+        PipelineStage("derivatives", derivatives_stage, ("lookup", "image")),
+    ])
+
+UPLOAD_PIPELINE = damage_pipeline(location_risk_stage)
+URL_PIPELINE = damage_pipeline(location_info_stage)
+ASSESSMENT_TARGETS = ("cache", "location", "priority", "derivatives")  # everything an assessment record needs
+PROGRESSIVE_TARGETS = ("coarse",) + ASSESSMENT_TARGETS
+
+# ---------- Progressive results: coarse estimate first, refined stages as they finish ----------
+
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+# Event payload for each stage streamed to the client, keyed like analysis_data
+PROGRESS_EVENTS: Dict[str, Callable[[Any], Dict]] = {
+    "coarse": lambda coarse: coarse,
+    "cv": lambda cv: {"computer_vision": cv},
+    "ml": lambda ml: {"machine_learning": ml},
+    "infrastructure": lambda infrastructure: {"infrastructure_impact": infrastructure},
+    "location": lambda location: {"geospatial_analysis": location},
+    "severity": lambda severity: {"severity_score": severity, "damage_level": get_damage_level(severity)},
+    "resources": lambda resources: {"resource_requirements": resources},
+    "priority": lambda priority: {
+        "priority_score": priority,
+        "urgency_level": get_urgency_level(priority),
+        "estimated_response_time": calculate_response_time(priority),
+    },
+}
+
+def get_stream_format(stream: Optional[str]) -> Optional[str]:
+    """Validate the requested progressive stream format; raises 400 for unknown formats"""
+    if stream is None:
+        return None
+    stream_format = stream.strip().lower()
+    if stream_format not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown stream format '{stream}'. Supported: {', '.join(STREAM_FORMATS)}")
+    return stream_format
+
+def get_regions(rois: Union[None, str, List[Dict[str, Any]]]) -> Tuple[RegionOfInterest, ...]:
+    """Parse requested regions of interest (JSON text or decoded JSON); raises 400 for invalid regions"""
+    try:
+        if isinstance(rois, str):
+            rois = json.loads(rois)
+        return parse_regions(rois, settings.roi_max_regions)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid rois: {str(e)}")
+
+def progress_event(stream_format: str, event: str, data: Dict) -> str:
+    if stream_format == "sse":
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({"event": event, "data": data}) + "\n"
+
+def progressive_response(
+    stream_format: str,
+    pipeline: StageGraph,
+    request: DamageRequest,
+    finish: Callable[[Dict, Dict], Awaitable[DamageAssessmentResponse]],
+) -> StreamingResponse:
+    """
+    Stream an assessment as it is computed: a ``coarse`` event from the quick
+    downscaled pass, one event per refined stage as it finishes, then
+    ``result`` with the same response the non-streaming endpoint returns
+    (``error`` if the analysis fails). ``finish(results, stage_timings)``
+    builds and stores the record exactly as the non-streaming path does.
+    """
+    started = time.perf_counter()
+    updates: asyncio.Queue = asyncio.Queue()
+
+    def on_result(name: str, result: Any) -> None:
+        if name in PROGRESS_EVENTS:
+            updates.put_nowait((name, {**PROGRESS_EVENTS[name](result), "elapsed_ms": elapsed_ms(started)}))
+
+    async def run() -> None:
+        try:
+            results, stage_timings = await pipeline.run(request, PROGRESSIVE_TARGETS, on_result=on_result)
+            del stage_timings["coarse"]  # not part of the stored record
+            response = await finish(results, stage_timings)
+            updates.put_nowait(("result", {**response.model_dump(mode="json"), "elapsed_ms": elapsed_ms(started)}))
+        except Exception as e:
+            detail = str(getattr(e, "detail", e))
+            logger.error(f"Progressive damage assessment failed: {detail}")
+            updates.put_nowait(("error", {"detail": f"Analysis failed: {detail}"}))
+        finally:
+            updates.put_nowait(None)
+
+    async def events():
+        task = asyncio.create_task(run())
+        try:
+            while (update := await updates.get()) is not None:
+                yield progress_event(stream_format, *update)
+        finally:
+            task.cancel()  # client went away
+
+    return StreamingResponse(events(), media_type=STREAM_FORMATS[stream_format],
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def get_fidelity_tier(fidelity: Optional[str]) -> FidelityTier:
+    """Resolve the requested fidelity tier; raises 400 for unknown tiers"""
+    try:
+        return resolve_fidelity(fidelity)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 def convert_numpy_types(obj):
     """Convert numpy types to native Python types for JSON serialization"""
@@ -203,12 +859,40 @@ def convert_numpy_types(obj):
     else:
         return obj
 
+def check_upload(file: UploadFile, max_file_size: int) -> None:
+    """Validate an uploaded image's name, extension and size; raises 400"""
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file provided")
+
+    ext = file.filename.split('.')[-1].lower()
+    if ext not in settings.allowed_extensions:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File type not allowed. Supported: {settings.allowed_extensions}"
+        )
+
+    if file.size > max_file_size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File too large. Maximum size: {max_file_size / (1024*1024):.1f}MB"
+        )
+
+def new_upload_path(filename: str) -> Tuple[str, str]:
+    """Fresh file id and its path in the upload directory, keeping the original extension"""
+    file_id = str(uuid.uuid4())
+    file_extension = filename.split('.')[-1].lower()
+    return file_id, os.path.join(settings.upload_directory, f"{file_id}.{file_extension}")
+
 @router.post("/assess-damage", response_model=DamageAssessmentResponse)
 async def assess_damage(
     file: UploadFile = File(...),
     latitude: Optional[float] = None,
     longitude: Optional[float] = None,
     disaster_type: Optional[str] = None,
+    fidelity: Optional[str] = None,
+    tiled: bool = False,
+    stream: Optional[str] = None,
+    rois: Optional[str] = None,
     db: Session = Depends(get_database)
 ):
     """
@@ -218,157 +902,394 @@ async def assess_damage(
     - **latitude**: Location latitude (optional)
     - **longitude**: Location longitude (optional)
     - **disaster_type**: Type of disaster (earthquake, flood, fire, etc.)
+    - **fidelity**: Speed/accuracy tier: fast, balanced or full (defaults to settings)
+    - **tiled**: Analyze large aerial/drone images tile by tile at full resolution
+    - **stream**: ndjson or sse to stream results progressively: a coarse estimate
+      within moments, then each refined stage as it finishes, then the full result
+    - **rois**: JSON list of regions of interest in image pixels, each
+      ``{"bbox": [x, y, width, height]}`` or ``{"polygon": [[x, y], ...]}`` with an
+      optional ``label``. Only those regions are analyzed; each gets its own result
 
     Returns comprehensive damage assessment with severity scoring and resource predictions
     """
     try:
         # Validate file
-        if not file.filename:
-            raise HTTPException(status_code=400, detail="No file provided")
-
-        ext = file.filename.split('.')[-1].lower()
-        if ext not in settings.allowed_extensions:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File type not allowed. Supported: {settings.allowed_extensions}"
-            )
-
-        if file.size > settings.max_file_size:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File too large. Maximum size: {settings.max_file_size / (1024*1024):.1f}MB"
-            )
+        check_upload(file, settings.tiled_max_file_size if tiled else settings.max_file_size)
+        tier = get_fidelity_tier(fidelity)
+        stream_format = get_stream_format(stream)
+        regions = get_regions(rois)
+        if regions and tiled:
+            raise HTTPException(status_code=400, detail="rois cannot be combined with tiled analysis")
 
         # Create unique filename and save file
-        file_id = str(uuid.uuid4())
-        file_extension = file.filename.split('.')[-1].lower()
-        saved_filename = f"{file_id}.{file_extension}"
-        file_path = os.path.join(settings.upload_directory, saved_filename)
+        file_id, file_path = new_upload_path(file.filename)
 
         # Ensure upload directory exists
         os.makedirs(settings.upload_directory, exist_ok=True)
 
-        # Save uploaded file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        image_bytes = None
+        if tiled:
+            # Tiles are read lazily from the stored file, so large aerial images are saved first
+            with open(file_path, "wb") as buffer:
+                shutil.copyfileobj(file.file, buffer)
+            logger.info(f"File saved: {file_path}")
+        else:
+            # Analyzed straight from memory; the stored copy is written by the post-processing workers
+            image_bytes = await file.read()
+
+        file_info = {
+            "filename": file.filename,
+            "file_id": file_id,
+            "file_path": file_path,
+            "file_size": file.size
+        }
+        if stream_format:
+            return stream_upload_assessment(stream_format, file_path if tiled else image_bytes, file_info,
+                                            latitude, longitude, disaster_type, tier, tiled, regions)
+        damage_assessment, assessment_data = await analyze_upload(
+            file_path if tiled else image_bytes, file_info, latitude, longitude, disaster_type, tier, tiled, regions
+        )
+        severity_score = damage_assessment.severity_score
+        priority_score = damage_assessment.priority_score
 
-        logger.info(f"File saved: {file_path}")
+        # Save to database
+        db.add(damage_assessment)
+        db.commit()
+        db.refresh(damage_assessment)
 
-        # 🔥 AI DAMAGE ASSESSMENT PIPELINE
+        logger.info(f"✅ Damage assessment completed - Severity: {severity_score}/10, Priority: {priority_score}")
 
-        # 1. Computer Vision Analysis
-        cv_result = await cv_service.analyze_damage(file_path)
-        cv_result = convert_numpy_types(cv_result)  # Convert numpy types
+        if image_bytes is not None:
+            await post_process("persist_image", write_image_file, file_path, image_bytes)
 
-        # 2. Machine Learning Damage Classification
-        ml_result = await ml_service.classify_damage(file_path, disaster_type)
-        ml_result = convert_numpy_types(ml_result)  # Convert numpy types
+        return upload_response(damage_assessment, assessment_data, file_id)
 
-        # 3. Infrastructure Impact Assessment
-        infrastructure_impact = await cv_service.assess_infrastructure_damage(file_path)
-        infrastructure_impact = convert_numpy_types(infrastructure_impact)  # Convert numpy types
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Damage assessment failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
-        # 4. Severity Scoring (1-10 scale)
-        severity_score = calculate_severity_score(cv_result, ml_result, infrastructure_impact)
-        severity_score = float(severity_score)  # Ensure it's a Python float
+@dataclass
+class BatchItem:
+    """One image of a batch upload and its progress through the pipeline"""
+    filename: str
+    data: Optional[bytes]
+    error: Optional[str] = None
+    file_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    file_path: Optional[str] = None
+    results: Dict = field(default_factory=dict)
+    stage_timings: Dict = field(default_factory=dict)
+    ml_input: Optional[ImageAnalysisContext] = None
+    assessment: Optional[DamageAssessmentModel] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+
+def read_batch_uploads(files: List[UploadFile]) -> List[BatchItem]:
+    """
+    Expand uploaded files and ZIP archives into batch items. Archive members
+    are read one at a time from the upload stream, never extracted to disk.
+    Blocking; run in a worker thread.
+    """
+    items: List[BatchItem] = []
+
+    def add(item: BatchItem) -> None:
+        items.append(item)
+        if len(items) > settings.batch_max_files:
+            raise HTTPException(status_code=400, detail=f"At most {settings.batch_max_files} images per batch")
+
+    max_size_error = f"File too large. Maximum size: {settings.max_file_size / (1024*1024):.1f}MB"
+    for upload in files:
+        filename = upload.filename or ""
+        if is_zip_upload(filename, upload.content_type):
+            try:
+                for name, data, error in iter_zip_images(upload.file, settings.allowed_extensions,
+                                                          settings.max_file_size):
+                    add(BatchItem(f"{filename}/{name}", data, error))
+            except ValueError as e:
+                add(BatchItem(filename, None, str(e)))
+        elif not filename:
+            add(BatchItem(filename, None, "No file provided"))
+        elif filename.split('.')[-1].lower() not in settings.allowed_extensions:
+            add(BatchItem(filename, None, f"File type not allowed. Supported: {settings.allowed_extensions}"))
+        elif upload.size is not None and upload.size > settings.max_file_size:
+            add(BatchItem(filename, None, max_size_error))
+        else:
+            add(BatchItem(filename, upload.file.read()))
+    return items
+
+def elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+@router.post("/assess-damage/batch")
+async def assess_damage_batch(
+    files: List[UploadFile] = File(...),
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    disaster_type: Optional[str] = None,
+    fidelity: Optional[str] = None,
+    db: Session = Depends(get_database)
+):
+    """
+    Assess several images in one request
 
-        # 5. Resource Requirement Prediction
-        resource_requirements = await ml_service.predict_resource_requirements(
-            severity_score, infrastructure_impact, disaster_type
-        )
-        resource_requirements = convert_numpy_types(resource_requirements)  # Convert numpy types
+    - **files**: Images and/or ZIP archives of images
+    - **latitude**, **longitude**, **disaster_type**, **fidelity**: As for /assess-damage, applied to every image
 
-        # 6. Priority Assessment
-        priority_score = await ml_service.calculate_priority_score(
-            severity_score, resource_requirements, latitude, longitude
-        )
-        priority_score = float(priority_score)  # Ensure it's a Python float
-
-        # 7. Geospatial Analysis (if coordinates provided)
-        geospatial_data = None
-        if latitude and longitude:
-            geospatial_data = await geo_service.analyze_location_risk(latitude, longitude)
-            if geospatial_data:
-                geospatial_data = convert_numpy_types(geospatial_data)
-
-        # Compile comprehensive assessment
-        assessment_data = {
-            "file_info": {
-                "filename": file.filename,
-                "file_id": file_id,
-                "file_path": file_path,
-                "file_size": file.size
-            },
-            "damage_analysis": {
-                "severity_score": severity_score,
-                "damage_level": get_damage_level(severity_score),
-                "confidence_score": max(cv_result.get("confidence_score", 0), ml_result.get("confidence_score", 0)),
-                "assessment_timestamp": datetime.utcnow().isoformat()
-            },
-            "computer_vision": cv_result,
-            "machine_learning": ml_result,
-            "infrastructure_impact": infrastructure_impact,
-            "resource_requirements": resource_requirements,
-            "priority_assessment": {
-                "priority_score": priority_score,
-                "urgency_level": get_urgency_level(priority_score),
-                "estimated_response_time": calculate_response_time(priority_score)
-            },
-            "location_data": {
-                "latitude": latitude,
-                "longitude": longitude,
-                "geospatial_analysis": geospatial_data
+    Images are analyzed in parallel, ML features are extracted and classified
+    as one batch, and all assessments are saved in a single commit. Returns
+    per-file results (in upload order) with timings; a failed file does not
+    fail the batch. Full records are available from /assessment/{id}.
+    """
+    try:
+        started = time.perf_counter()
+        tier = get_fidelity_tier(fidelity)
+
+        items = await asyncio.to_thread(read_batch_uploads, files)
+        if not items:
+            raise HTTPException(status_code=400, detail="No images found in upload")
+        read_ms = elapsed_ms(started)
+
+        os.makedirs(settings.upload_directory, exist_ok=True)
+        for item in items:
+            if item.error is None:
+                ext = item.filename.split('.')[-1].lower()
+                item.file_path = os.path.join(settings.upload_directory, f"{item.file_id}.{ext}")
+
+        # 1 & 3. Cache lookup, decode, CV and infrastructure analysis, a few images at a time
+        workers = asyncio.Semaphore(settings.batch_analysis_workers)
+
+        def batch_request(item: BatchItem) -> DamageRequest:
+            return DamageRequest(item.data, tier, item.file_path, latitude, longitude, disaster_type)
+
+        async def analyze(item: BatchItem) -> None:
+            item_started = time.perf_counter()
+            try:
+                async with workers:
+                    item.results, item.stage_timings = await UPLOAD_PIPELINE.run(
+                        batch_request(item), ("cv", "infrastructure", "derivatives"))
+                    lookup = item.results["lookup"]
+                    if lookup.results is not None:
+                        item.results["ml"] = lookup.results[1]
+                    else:
+                        # Only the small ML input is kept until the batched classification
+                        item.ml_input = await asyncio.to_thread(item.results["image"].resized, ML_INPUT_SIZE)
+                    item.results["image"] = lookup.image_ctx = None
+            except HTTPException as e:
+                item.error = e.detail
+            except Exception as e:
+                logger.error(f"Batch analysis failed for {item.filename}: {str(e)}")
+                item.error = f"Analysis failed: {str(e)}"
+            item.timings["analysis_ms"] = elapsed_ms(item_started)
+
+        analysis_started = time.perf_counter()
+        await asyncio.gather(*(analyze(item) for item in items if item.error is None))
+        analysis_ms = elapsed_ms(analysis_started)
+
+        # 2. Machine Learning Damage Classification for every uncached image at once
+        ml_started = time.perf_counter()
+        pending = [item for item in items if item.ml_input is not None and item.error is None]
+        ml_results = await ml_service.classify_damage_batch([item.ml_input for item in pending], disaster_type)
+        for item, ml_result in zip(pending, ml_results):
+            item.results["ml"] = convert_numpy_types(ml_result)
+            item.ml_input = None
+        ml_batch_ms = elapsed_ms(ml_started)
+
+        # 7. Geospatial Analysis, shared by every image in the batch
+        geospatial_data = await location_risk(latitude, longitude)
+
+        # 4-8. Remaining stages (cache store, scoring) and assessment records
+        scoring_started = time.perf_counter()
+        analyzed = [item for item in items if item.error is None]
+        for item in analyzed:
+            item_started = time.perf_counter()
+            request = batch_request(item)
+            file_info = {
+                "filename": item.filename,
+                "file_id": item.file_id,
+                "file_path": item.file_path,
+                "file_size": len(item.data)
+            }
+            results, stage_timings = await UPLOAD_PIPELINE.run(
+                request, ASSESSMENT_TARGETS, provided={**item.results, "location": geospatial_data})
+            item.assessment, _ = build_upload_assessment(
+                results, request, file_info, {**item.stage_timings, **stage_timings})
+            item.timings["scoring_ms"] = elapsed_ms(item_started)
+        scoring_ms = elapsed_ms(scoring_started)
+
+        # One bulk write for the whole batch
+        db_started = time.perf_counter()
+        results, saved = [], {}
+        if analyzed:
+            db.add_all([item.assessment for item in analyzed])
+            db.flush()  # assigns ids; read before commit expires the rows
+            saved = {id(item): bulk_result_fields(item.assessment, item.file_id) for item in analyzed}
+            db.commit()
+        db_ms = elapsed_ms(db_started)
+
+        for index, item in enumerate(items):
+            result = {"index": index, "filename": item.filename}
+            if item.error is not None:
+                result.update(status="failed", error=item.error)
+            else:
+                result.update(status="completed", **saved[id(item)])
+                await post_process("persist_image", write_image_file, item.file_path, item.data)
+            result["timings"] = item.timings
+            results.append(result)
+
+        completed = len(analyzed)
+        logger.info(f"✅ Batch damage assessment completed - {completed}/{len(items)} images")
+        return {
+            "results": results,
+            "summary": {
+                "total": len(items),
+                "completed": completed,
+                "failed": len(items) - completed,
+                "timings": {
+                    "read_ms": read_ms,
+                    "analysis_ms": analysis_ms,
+                    "ml_batch_ms": ml_batch_ms,
+                    "scoring_ms": scoring_ms,
+                    "db_ms": db_ms,
+                    "total_ms": elapsed_ms(started),
+                },
             },
-            "recommendations": generate_action_recommendations(
-                severity_score, resource_requirements, infrastructure_impact
-            )
         }
 
-        # Convert the entire assessment_data to ensure no numpy types remain
-        assessment_data = convert_numpy_types(assessment_data)
-
-        # Save to database
-        damage_assessment = DamageAssessmentModel(
-            image_path=file_path,
-            image_filename=file.filename,
-            damage_level=get_damage_level(severity_score),
-            severity_score=severity_score,
-            confidence_score=float(assessment_data["damage_analysis"]["confidence_score"]),
-            priority_score=priority_score,
-            urgency_level=get_urgency_level(priority_score),
-            analysis_data=assessment_data,
-            processing_time=0,  # Will be calculated
-            location_data={"latitude": latitude, "longitude": longitude} if latitude and longitude else None,
-            disaster_type=disaster_type,
-            status="completed",
-            created_at=datetime.utcnow()
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Batch damage assessment failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch analysis failed: {str(e)}")
+
+async def analyze_upload(
+    source: Union[str, bytes],
+    file_info: Dict,
+    latitude: Optional[float],
+    longitude: Optional[float],
+    disaster_type: Optional[str],
+    tier: FidelityTier,
+    tiled: bool = False,
+    regions: Tuple[RegionOfInterest, ...] = (),
+) -> Tuple[DamageAssessmentModel, Dict]:
+    """
+    Full pipeline (stages 1-8) for an uploaded image: in-memory bytes, or the
+    stored file path in tiled mode. Returns the unsaved record and its analysis data.
+    """
+    # 🔥 AI DAMAGE ASSESSMENT PIPELINE: independent stages run concurrently
+    request = DamageRequest(source, tier, file_info["file_path"], latitude, longitude, disaster_type, tiled, regions)
+    results, stage_timings = await UPLOAD_PIPELINE.run(request, ASSESSMENT_TARGETS)
+    return build_upload_assessment(results, request, file_info, stage_timings)
+
+def stream_upload_assessment(
+    stream_format: str,
+    source: Union[str, bytes],
+    file_info: Dict,
+    latitude: Optional[float],
+    longitude: Optional[float],
+    disaster_type: Optional[str],
+    tier: FidelityTier,
+    tiled: bool = False,
+    regions: Tuple[RegionOfInterest, ...] = (),
+) -> StreamingResponse:
+    """Progressive /assess-damage: the stored record matches the non-streaming path"""
+    request = DamageRequest(source, tier, file_info["file_path"], latitude, longitude, disaster_type, tiled, regions)
+
+    async def finish(results: Dict, stage_timings: Dict) -> DamageAssessmentResponse:
+        damage_assessment, assessment_data = build_upload_assessment(results, request, file_info, stage_timings)
+        response = persist_assessment(
+            damage_assessment, lambda saved: upload_response(saved, assessment_data, file_info["file_id"])
         )
+        logger.info(f"✅ Damage assessment completed - Severity: {response.severity_score}/10, "
+                    f"Priority: {response.priority_score}")
+        if not tiled:
+            await post_process("persist_image", write_image_file, file_info["file_path"], source)
+        return response
+
+    return progressive_response(stream_format, UPLOAD_PIPELINE, request, finish)
+
+def upload_response(damage_assessment: DamageAssessmentModel, assessment_data: Dict,
+                    file_id: str) -> DamageAssessmentResponse:
+    """Response for a saved upload assessment"""
+    return DamageAssessmentResponse(
+        id=damage_assessment.id,
+        assessment_id=file_id,
+        severity_score=damage_assessment.severity_score,
+        damage_level=get_damage_level(damage_assessment.severity_score),
+        confidence_score=float(assessment_data["damage_analysis"]["confidence_score"]),
+        priority_score=damage_assessment.priority_score,
+        urgency_level=get_urgency_level(damage_assessment.priority_score),
+        resource_requirements=assessment_data["resource_requirements"],
+        infrastructure_impact=assessment_data["infrastructure_impact"],
+        analysis_data=assessment_data,
+        recommendations=assessment_data["recommendations"],
+        status="completed",
+        created_at=damage_assessment.created_at
+    )
 
-        db.add(damage_assessment)
-        db.commit()
-        db.refresh(damage_assessment)
-
-        logger.info(f"✅ Damage assessment completed - Severity: {severity_score}/10, Priority: {priority_score}")
-
-        return DamageAssessmentResponse(
-            id=damage_assessment.id,
-            assessment_id=file_id,
-            severity_score=severity_score,
-            damage_level=get_damage_level(severity_score),
-            confidence_score=float(assessment_data["damage_analysis"]["confidence_score"]),
-            priority_score=priority_score,
-            urgency_level=get_urgency_level(priority_score),
-            resource_requirements=resource_requirements,
-            infrastructure_impact=infrastructure_impact,
-            analysis_data=assessment_data,
-            recommendations=assessment_data["recommendations"],
-            status="completed",
-            created_at=damage_assessment.created_at
+def build_upload_assessment(
+    results: Dict,
+    request: DamageRequest,
+    file_info: Dict,
+    stage_timings: Dict,
+) -> Tuple[DamageAssessmentModel, Dict]:
+    """Assessment record (unsaved) and its analysis data from the upload pipeline's stage results"""
+    cv_result, ml_result, infrastructure_impact = results["cv"], results["ml"], results["infrastructure"]
+    severity_score, resource_requirements = results["severity"], results["resources"]
+    priority_score = results["priority"]
+    latitude, longitude, disaster_type = request.latitude, request.longitude, request.disaster_type
+
+    # Compile comprehensive assessment
+    assessment_data = {
+        "file_info": file_info,
+        "cache": results["cache"],
+        "stage_timings": stage_timings,
+        "damage_analysis": {
+            "severity_score": severity_score,
+            "damage_level": get_damage_level(severity_score),
+            "confidence_score": max(cv_result.get("confidence_score", 0), ml_result.get("confidence_score", 0)),
+            "assessment_timestamp": datetime.utcnow().isoformat()
+        },
+        "computer_vision": cv_result,
+        "machine_learning": ml_result,
+        "infrastructure_impact": infrastructure_impact,
+        "resource_requirements": resource_requirements,
+        "priority_assessment": {
+            "priority_score": priority_score,
+            "urgency_level": get_urgency_level(priority_score),
+            "estimated_response_time": calculate_response_time(priority_score)
+        },
+        "location_data": {
+            "latitude": latitude,
+            "longitude": longitude,
+            "geospatial_analysis": results["location"]
+        },
+        "recommendations": generate_action_recommendations(
+            severity_score, resource_requirements, infrastructure_impact
         )
-
-    except Exception as e:
-        logger.error(f"Damage assessment failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+    }
+    if request.regions:
+        assessment_data["regions"] = region_results(request, cv_result, ml_result, infrastructure_impact)
+
+    # Convert the entire assessment_data to ensure no numpy types remain
+    assessment_data = convert_numpy_types(assessment_data)
+
+    damage_assessment = DamageAssessmentModel(
+        image_path=file_info["file_path"],
+        image_filename=file_info["filename"],
+        damage_level=get_damage_level(severity_score),
+        severity_score=severity_score,
+        confidence_score=float(assessment_data["damage_analysis"]["confidence_score"]),
+        priority_score=priority_score,
+        urgency_level=get_urgency_level(priority_score),
+        analysis_data=assessment_data,
+        processing_time=0,  # Will be calculated
+        location_data={"latitude": latitude, "longitude": longitude} if latitude and longitude else None,
+        disaster_type=disaster_type,
+        status="completed",
+        created_at=datetime.utcnow()
+    )
+    return damage_assessment, assessment_data
 
 def calculate_severity_score(cv_result: Dict, ml_result: Dict, infrastructure_impact: Dict) -> float:
     """Calculate severity score (1-10 scale) based on all analysis results"""
@@ -487,10 +1408,128 @@ async def analyze_damage(
     file: UploadFile = File(...),
     latitude: Optional[float] = None,
     longitude: Optional[float] = None,
+    fidelity: Optional[str] = None,
     db: Session = Depends(get_database)
 ):
     """Legacy endpoint - redirects to assess-damage"""
-    return await assess_damage(file, latitude, longitude, None, db)
+    return await assess_damage(file, latitude, longitude, None, fidelity=fidelity, db=db)
+
+# ---------- Job mode: submit now, poll or stream the result later ----------
+
+def job_response(job: Dict) -> Dict:
+    """Job state with the URLs for polling and for the event stream"""
+    status_url = f"{router.prefix}/jobs/{job['job_id']}"
+    return {**job, "status_url": status_url, "events_url": f"{status_url}/events"}
+
+async def submit_job(kind: str, payload: Dict, data: Optional[bytes] = None) -> Dict:
+    try:
+        job = await get_job_queue().submit(kind, payload, data)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    logger.info(f"Queued {kind} job {job['job_id']}")
+    return job_response(job)
+
+def save_job_assessment(assessment: DamageAssessmentModel, assessment_id: str) -> Dict:
+    """Store a finished job's assessment; the job result is its summary and URL"""
+    result = persist_assessment(assessment, lambda saved: bulk_result_fields(saved, assessment_id))
+    return {**result, "assessment_url": f"{router.prefix}/assessment/{result['id']}"}
+
+@router.post("/jobs", status_code=202)
+async def submit_assess_damage_job(
+    file: UploadFile = File(...),
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    disaster_type: Optional[str] = None,
+    fidelity: Optional[str] = None,
+    rois: Optional[str] = None,
+):
+    """
+    Queue an /assess-damage analysis and return its job immediately
+
+    Takes the same parameters as /assess-damage (tiled mode excepted). Poll
+    **status_url** or subscribe to **events_url** (server-sent events) for
+    the result; the finished assessment is stored like any other.
+    """
+    check_upload(file, settings.max_file_size)
+    get_fidelity_tier(fidelity)  # reject unknown tiers and bad regions now rather than failing the job
+    get_regions(rois)
+    file_id, file_path = new_upload_path(file.filename)
+    payload = {
+        "file_info": {
+            "filename": file.filename,
+            "file_id": file_id,
+            "file_path": file_path,
+            "file_size": file.size
+        },
+        "latitude": latitude,
+        "longitude": longitude,
+        "disaster_type": disaster_type,
+        "fidelity": fidelity,
+        "rois": rois,
+    }
+    return await submit_job("assess-damage", payload, await file.read())
+
+@router.post("/jobs/by-url", status_code=202)
+async def submit_analyze_by_url_job(payload: AnalyzeByUrlPayload):
+    """Queue an /analyze-by-url analysis and return its job immediately"""
+    if not payload.fileUrl:
+        raise HTTPException(status_code=400, detail="fileUrl is required")
+    get_fidelity_tier(payload.fidelity)
+    get_regions(payload.rois)
+    return await submit_job("analyze-by-url", payload.model_dump())
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Current state of an analysis job"""
+    job = await get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_response(job)
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Server-sent events for an analysis job: one event per status change
+    (the event name is the status), ending after completed or failed
+    """
+    queue = get_job_queue()
+    if await queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        async for job in queue.events(job_id):
+            if job is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"id: {job['version']}\nevent: {job['status']}\ndata: {json.dumps(job_response(job))}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@job_handler("assess-damage")
+async def run_assess_damage_job(payload: Dict, data: Optional[bytes]) -> Dict:
+    file_info = payload["file_info"]
+    damage_assessment, _ = await analyze_upload(
+        data, file_info, payload["latitude"], payload["longitude"], payload["disaster_type"],
+        get_fidelity_tier(payload["fidelity"]), regions=get_regions(payload.get("rois")),
+    )
+    result = save_job_assessment(damage_assessment, file_info["file_id"])
+    await post_process("persist_image", write_image_file, file_info["file_path"], data)
+    logger.info(f"✅ Damage assessment job completed - Severity: {result['severity_score']}/10")
+    return result
+
+@job_handler("analyze-by-url")
+async def run_analyze_by_url_job(payload: Dict, data: Optional[bytes]) -> Dict:
+    downloaded = await download_url_image(payload["fileUrl"])
+    assessment = await assess_url_image(
+        downloaded, payload["fileUrl"], payload["latitude"], payload["longitude"],
+        get_fidelity_tier(payload["fidelity"]), get_regions(payload.get("rois")),
+    )
+    result = save_job_assessment(assessment.assessment, assessment.assessment_id)
+    if assessment.file_path:
+        await post_process("persist_image", write_image_file, assessment.file_path, downloaded.data)
+    logger.info(f"✅ URL-based damage assessment job completed - Severity: {result['severity_score']}/10")
+    return result
 
 @router.get("/assessment/{assessment_id}")
 async def get_assessment(assessment_id: str, db: Session = Depends(get_database)):
@@ -504,6 +1543,71 @@ async def get_assessment(assessment_id: str, db: Session = Depends(get_database)
 
     return assessment
 
+# Derivatives never change once written: clients and CDNs may keep them for a year
+DERIVATIVE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def derivative_format(requested: Optional[str], accept: str) -> str:
+    """Explicitly requested format, else WebP for clients that accept it; raises 400 for unknown formats"""
+    if requested is not None:
+        image_format = requested.strip().lower().replace("jpg", "jpeg")
+        if image_format not in DERIVATIVE_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unknown image format '{requested}'. Supported: {', '.join(DERIVATIVE_FORMATS)}")
+        return image_format
+    return "webp" if "image/webp" in accept else "jpeg"
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+@router.get("/assessment/{assessment_id}/image/{variant}")
+async def get_assessment_image(
+    assessment_id: str,
+    variant: str,
+    request: Request,
+    image_format: Optional[str] = Query(default=None, alias="format"),
+    db: Session = Depends(get_database)
+):
+    """
+    Thumbnail or preview of an assessment's stored image
+
+    - **variant**: thumbnail or preview (longest side set by settings)
+    - **format**: jpeg or webp; by default WebP when the Accept header allows it
+
+    Served with a content-hash ETag and an immutable Cache-Control, and
+    revalidated with If-None-Match (304). Derivatives missing for images
+    stored before they were introduced are rendered on first request.
+    """
+    sizes = derivative_sizes()
+    if variant not in sizes:
+        raise HTTPException(status_code=404, detail=f"Unknown image variant '{variant}'. Supported: {', '.join(sizes)}")
+    image_format = derivative_format(image_format, request.headers.get("accept", ""))
+
+    assessment = db.query(DamageAssessmentModel).filter(
+        DamageAssessmentModel.id == assessment_id
+    ).first()
+    if not assessment:
+        raise HTTPException(status_code=404, detail="Assessment not found")
+
+    original_path = assessment.image_path
+    path = derivative_path(original_path, variant, image_format)
+    if not os.path.isfile(path):
+        if not os.path.isfile(original_path):
+            raise HTTPException(status_code=404, detail="Image not available")
+        try:
+            await asyncio.to_thread(write_derivatives, original_path, original_path,
+                                    sizes, settings.image_derivative_quality)
+        except Exception as e:
+            logger.error(f"Rendering image derivatives failed for {original_path}: {str(e)}")
+            raise HTTPException(status_code=404, detail="Image not available")
+
+    etag = f'"{(await asyncio.to_thread(file_sha256, path))[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": DERIVATIVE_CACHE_CONTROL, "Vary": "Accept"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=DERIVATIVE_FORMATS[image_format][1], headers=headers)
+
 @router.get("/assessments")
 async def list_assessments(
     skip: int = 0,
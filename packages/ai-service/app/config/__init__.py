@@ -1,5 +1,7 @@
 """Configuration package"""
 from .settings import get_settings, Settings
+from .fidelity import FidelityTier, FIDELITY_TIERS, resolve_fidelity
 from .database import get_database, engine,init_database
 
-__all__ = ["get_settings", "Settings", "get_database", "engine","init_database"]
+__all__ = ["get_settings", "Settings", "get_database", "engine","init_database",
+           "FidelityTier", "FIDELITY_TIERS", "resolve_fidelity"]
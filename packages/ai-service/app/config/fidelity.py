@@ -0,0 +1,84 @@
+"""
+Analysis Fidelity Tiers
+Named speed/accuracy presets for the damage assessment pipeline.
+
+Each tier picks the resolution the CV detectors run at, which detectors
+run, and how many k-means restarts the dominant color extraction uses.
+Measured on five synthetic 12 MP scenes, single vCPU
+(scripts/benchmark_fidelity.py, see PERFORMANCE.md):
+
+    tier       max side   detectors                      k-means   CV latency   max |score - full|
+    fast       640 px     color, edge, debris, deform.   1         ~0.23 s      0.16
+    balanced   1280 px    all                            3         ~0.38 s      0.12
+    full       decoded    all                            10        ~1.3 s       0 (reference)
+
+"full" runs at the decoded size, which is capped by the MAX_IMAGE_MEGAPIXELS
+pixel budget (4.2 MP by default), so photos above the budget are analyzed
+downscaled. Edge, line and debris detectors use pixel-count thresholds, so
+scores shift with resolution. Assessments stored before the budget existed
+were computed at the original size; to compare against them, use "full"
+with MAX_IMAGE_MEGAPIXELS=0 (no budget).
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from .settings import get_settings
+
+ALL_DETECTORS: Tuple[str, ...] = ("color", "texture", "edge", "debris", "deformation")
+
+# Fixed (width, height) inputs of the feature extraction and ML stages
+PREPROCESS_SIZE: Tuple[int, int] = (512, 512)
+ML_INPUT_SIZE: Tuple[int, int] = (224, 224)
+
+
+@dataclass(frozen=True)
+class FidelityTier:
+    """Speed/accuracy preset for one analysis request"""
+    name: str
+    max_dimension: Optional[int]  # longest side the detectors see; None = decoded size (pixel budget only)
+    detectors: Tuple[str, ...]
+    kmeans_attempts: int
+
+    @property
+    def min_decode_size(self) -> Optional[Tuple[int, int]]:
+        """
+        Smallest image (longest side, shortest side) that still covers every
+        stage of this tier: the detectors at max_dimension and the square
+        preprocessing/ML inputs. None when the detectors need the whole decode.
+        """
+        if self.max_dimension is None:
+            return None
+        square = max(PREPROCESS_SIZE + ML_INPUT_SIZE)
+        return max(self.max_dimension, square), square
+
+
+FIDELITY_TIERS: Dict[str, FidelityTier] = {
+    "fast": FidelityTier(
+        name="fast",
+        max_dimension=640,
+        detectors=("color", "edge", "debris", "deformation"),
+        kmeans_attempts=1,
+    ),
+    "balanced": FidelityTier(
+        name="balanced",
+        max_dimension=1280,
+        detectors=ALL_DETECTORS,
+        kmeans_attempts=3,
+    ),
+    "full": FidelityTier(
+        name="full",
+        max_dimension=None,
+        detectors=ALL_DETECTORS,
+        kmeans_attempts=10,
+    ),
+}
+
+
+def resolve_fidelity(name: Optional[str] = None) -> FidelityTier:
+    """Look up a tier by name, falling back to the configured default"""
+    key = (name or get_settings().analysis_fidelity).strip().lower()
+    if key not in FIDELITY_TIERS:
+        raise ValueError(
+            f"Unknown fidelity '{name}'. Supported: {', '.join(FIDELITY_TIERS)}"
+        )
+    return FIDELITY_TIERS[key]
@@ -3,7 +3,7 @@ Application Settings Configuration
 """
 from pydantic_settings import BaseSettings
 from pydantic import Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 import os
 
 class Settings(BaseSettings):
@@ -44,6 +44,74 @@ class Settings(BaseSettings):
     max_file_size: int = 10 * 1024 * 1024  # 10MB
     allowed_extensions: List[str] = ["jpg", "jpeg", "png", "bmp", "tiff"]
     upload_directory: str = "uploads"
+    persist_url_images: bool = Field(
+        default=True,
+        description="Store images analyzed by URL in the upload directory (written in the background after the response)"
+    )
+    download_max_connections: int = Field(
+        default=32,
+        description="Connection pool size shared by all image downloads"
+    )
+    download_per_host_limit: int = Field(
+        default=6,
+        description="Concurrent image downloads allowed per host"
+    )
+    download_timeout_seconds: float = Field(
+        default=30.0,
+        description="Timeout for each image download"
+    )
+    download_cache_max_bytes: int = Field(
+        default=256 * 1024 * 1024,
+        description="Memory for downloaded images kept for ETag/Last-Modified revalidation"
+    )
+    bulk_max_items: int = Field(
+        default=1000,
+        description="Most URLs accepted by one bulk analysis request"
+    )
+    bulk_download_concurrency: int = Field(
+        default=16,
+        description="Concurrent downloads in a bulk analysis request"
+    )
+    bulk_analysis_workers: int = Field(
+        default=2,
+        description="Images analyzed concurrently in a bulk analysis request"
+    )
+    bulk_db_batch_size: int = Field(
+        default=25,
+        description="Assessments inserted per database commit in bulk analysis"
+    )
+    batch_max_files: int = Field(
+        default=50,
+        description="Most images (files plus ZIP archive members) accepted by one batch upload"
+    )
+    batch_analysis_workers: int = Field(
+        default=2,
+        description="Images decoded and analyzed concurrently in a batch upload"
+    )
+    max_image_megapixels: float = Field(
+        default=4.2,
+        description="Pixel budget for analysis at every fidelity tier, including full: larger images are reduced to this many megapixels while decoding (0 = no limit, original-size analysis)"
+    )
+    max_decode_megapixels: float = Field(
+        default=100.0,
+        description="Images whose header claims more megapixels are rejected before decoding (decompression bomb protection; 0 = no limit)"
+    )
+    image_derivatives_enabled: bool = Field(
+        default=True,
+        description="Render thumbnail and preview images (JPEG and WebP) next to each stored image at ingest"
+    )
+    image_thumbnail_size: int = Field(
+        default=256,
+        description="Longest side in pixels of the thumbnail derivative"
+    )
+    image_preview_size: int = Field(
+        default=1024,
+        description="Longest side in pixels of the preview derivative"
+    )
+    image_derivative_quality: int = Field(
+        default=80,
+        description="JPEG/WebP quality (1-100) of the thumbnail and preview derivatives"
+    )
 
     # Model settings
     model_directory: str = "ml_models"
@@ -51,6 +119,134 @@ class Settings(BaseSettings):
     priority_scorer_path: str = "ml_models/priority_scorer/model.pkl"
     demand_predictor_path: str = "ml_models/demand_predictor/model.pkl"
 
+    # Computer vision execution settings
+    cv_detector_workers: int = Field(
+        default=4,
+        description="Thread pool size for running independent CV detectors concurrently (1 = sequential)"
+    )
+    cv_execution_backend: str = Field(
+        default="thread",
+        description="Where CV/ML feature extraction runs: 'thread' (in-process) or 'process' (warm process pool)"
+    )
+    cv_process_workers: int = Field(
+        default=0,
+        description="Process pool size when cv_execution_backend is 'process' (0 = CPU count)"
+    )
+    color_damage_ranges: Dict[str, List[List[int]]] = Field(
+        default={
+            "rust": [[10, 50, 50], [25, 255, 200]],
+            "dark": [[0, 0, 0], [180, 30, 100]],
+            "red": [[160, 50, 50], [180, 255, 255]],
+        },
+        description="Damage color ranges as name -> [[h, s, v] lower, [h, s, v] upper] (OpenCV HSV, inclusive, max 8)"
+    )
+    dominant_color_method: str = Field(
+        default="kmeans",
+        description="Dominant color extraction: 'kmeans' (all pixels), 'subsample' (k-means on a fixed-seed sample) or 'histogram' (quantized 3D histogram)"
+    )
+    cv_tile_size: int = Field(
+        default=1024,
+        description="Tile edge length in pixels for tiled analysis of large aerial/drone images"
+    )
+    cv_tile_workers: int = Field(
+        default=2,
+        description="Tiles analyzed concurrently in tiled mode; also bounds how many tiles are held in memory"
+    )
+    tiled_max_megapixels: float = Field(
+        default=500.0,
+        description="Largest image (in megapixels) accepted for tiled analysis"
+    )
+    tiled_max_file_size: int = Field(
+        default=200 * 1024 * 1024,
+        description="Maximum upload size in bytes for tiled analysis"
+    )
+    analysis_fidelity: str = Field(
+        default="full",
+        description="Default analysis fidelity tier when a request does not specify one: 'fast', 'balanced' or 'full'"
+    )
+    cv_detector_cascade: bool = Field(
+        default=False,
+        description="Run detectors cheapest-first and stop as soon as cheap bounds prove the image is minimal damage"
+    )
+    coarse_max_dimension: int = Field(
+        default=320,
+        description="Longest side of the downscaled image the coarse first result of a streamed assessment is computed on"
+    )
+    roi_max_regions: int = Field(
+        default=20,
+        description="Maximum number of regions of interest per analyzed image"
+    )
+
+    # Analysis result cache settings
+    result_cache_enabled: bool = Field(
+        default=True,
+        description="Reuse CV/ML results for re-submitted images (exact bytes or near-duplicate copies)"
+    )
+    result_cache_max_entries: int = Field(
+        default=512,
+        description="Result cache size (least recently used entries are evicted)"
+    )
+    result_cache_ttl_seconds: float = Field(
+        default=3600.0,
+        description="Result cache entry lifetime in seconds (0 = no expiry)"
+    )
+    result_cache_max_hash_distance: int = Field(
+        default=6,
+        description="Max Hamming distance between 64-bit perceptual hashes for a near-duplicate hit (0 = exact only)"
+    )
+
+    # Job queue settings
+    job_queue_backend: str = Field(
+        default="memory",
+        description="Broker for asynchronous analysis jobs: 'memory' (in-process) or 'redis' (shared by replicas)"
+    )
+    redis_url: str = Field(
+        default="redis://localhost:6379",
+        description="Redis connection URL for the 'redis' job queue backend"
+    )
+    job_workers: int = Field(
+        default=2,
+        description="Worker tasks processing analysis jobs in each service process"
+    )
+    job_max_pending: int = Field(
+        default=1000,
+        description="Jobs allowed to wait in the queue before submissions are refused with 503 (0 = no limit)"
+    )
+    job_max_retained: int = Field(
+        default=10000,
+        description="Finished jobs kept for status queries by the in-memory backend"
+    )
+    job_ttl_seconds: int = Field(
+        default=86400,
+        description="Lifetime of job state and payloads in Redis"
+    )
+    job_lease_seconds: float = Field(
+        default=60.0,
+        description="Lease on a Redis job while a worker runs it (renewed every third of it); jobs whose worker stops renewing are re-queued"
+    )
+
+    # Post-processing settings (image persistence, debug overlays)
+    post_processing_workers: int = Field(
+        default=2,
+        description="Worker threads running post-processing tasks after the analysis"
+    )
+    post_processing_max_pending: int = Field(
+        default=200,
+        description="Queued post-processing tasks before requests run new ones themselves"
+    )
+    post_processing_max_attempts: int = Field(
+        default=3,
+        description="Attempts per post-processing task before it is logged as failed"
+    )
+    post_processing_retry_backoff_seconds: float = Field(
+        default=0.5,
+        description="Delay before the first retry of a failed post-processing task; doubles per attempt"
+    )
+    post_processing_drain_seconds: float = Field(
+        default=30.0,
+        description="How long shutdown waits for queued post-processing tasks to finish"
+    )
+
     # Weather API settings
     openweather_api_key: str = Field(
         default="79a6afdcad1281c44a183bf14e00e538",  # Added the API key you mentioned
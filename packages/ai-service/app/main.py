@@ -5,6 +5,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import os
 
@@ -12,6 +13,7 @@ import os
 from app.config.settings import get_settings
 from app.config.database import init_database, engine
 from app.api import damage_assessment, priority_scoring, analytics, charts, weather
+from app.utils.metrics import metrics as service_metrics
 from sqlalchemy import text
 
 # Configure logging
@@ -87,6 +89,13 @@ async def lifespan(app: FastAPI):
 
         logger.info("✅ Required directories created")
 
+        if settings.cv_execution_backend == "process":
+            from app.services.process_pool import get_process_backend
+            await asyncio.to_thread(get_process_backend().warm_up)
+
+        from app.services.job_queue import get_job_queue
+        get_job_queue().start()
+
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
         if not settings.debug:
@@ -96,6 +105,14 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("Application shutting down...")
+    from app.services.process_pool import shutdown_process_backend
+    shutdown_process_backend()
+    from app.services.image_downloader import close_image_downloader
+    await close_image_downloader()
+    from app.services.job_queue import close_job_queue
+    await close_job_queue()
+    from app.services.post_processing import close_post_processing_queue
+    await close_post_processing_queue()
 
 # Create FastAPI app with lifespan
 app = FastAPI(
@@ -142,7 +159,13 @@ app.include_router(_legacy_router)
 
 @app.get("/metrics")
 async def metrics():
-    return {"service": "ai-service", "status": "ok"}
+    snapshot = service_metrics.snapshot()
+    counters = snapshot["counters"]
+    cascade_runs = counters.get("cv_cascade_runs_total", 0)
+    snapshot["gauges"]["cv_cascade_skip_rate"] = (
+        counters.get("cv_cascade_minimal_total", 0) / cascade_runs if cascade_runs else 0.0
+    )
+    return {"service": "ai-service", "status": "ok", **snapshot}
 
 # Root endpoint
 @app.get("/")
@@ -1,16 +1,60 @@
 import asyncio
 import logging
 import os
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import Dict, List, Tuple, Optional, Union
 
 import cv2
 import numpy as np
-from PIL import Image
 
+from ..config.fidelity import ALL_DETECTORS, PREPROCESS_SIZE, FidelityTier, resolve_fidelity
 from ..config.settings import get_settings
+from .detector_scheduler import AnalysisNode, DetectorScheduler
+from .post_processing import post_process
+from .process_pool import get_process_backend, process_backend_enabled
+from ..utils.color_classifier import HSVRangeClassifier
+from ..utils.color_features import dominant_colors
+from ..utils.contour_features import contour_areas_and_perimeters
+from ..utils.image_context import ImageAnalysisContext, as_image_context, context_cached
+from ..utils.image_tiles import TiledImage, TileWindow
+from ..utils.metrics import metrics
+from ..utils.texture_features import (
+    GLCM_LEVELS,
+    HARALICK_FEATURES,
+    compute_glcm,
+    glcm_offsets,
+    haralick_features,
+    histogram_entropy,
+    lbp_histogram,
+    lbp_n_bins,
+    local_binary_pattern,
+    quantize_gray,
+)
 
 logger = logging.getLogger(__name__)
 
+DETECTORS = ALL_DETECTORS
+
+# Weight of each detector in the combined damage score, with the indicator
+# flag/score keys it reports under
+DETECTOR_WEIGHTS = {"color": 0.25, "texture": 0.25, "edge": 0.20, "debris": 0.20, "deformation": 0.10}
+DETECTOR_FLAGS = {
+    "color": "color_based",
+    "texture": "texture_based",
+    "edge": "edge_based",
+    "debris": "debris_present",
+    "deformation": "structural_deformation",
+}
+DETECTOR_THRESHOLDS = {"color": 0.5, "texture": 0.5, "edge": 0.4, "debris": 0.5, "deformation": 0.5}
+
+# An image whose detector scores are all below this is reported as minimal damage
+MINIMAL_SCORE = 0.2
+HOUGH_VOTE_THRESHOLD = 100
+# Cascade order: cheapest detectors first; texture (LBP) is the most expensive
+# but has a cheap upper bound, so it is bounded early and computed last
+CASCADE_ORDER = ("edge", "deformation", "texture", "debris", "color")
+
 
 class CVService:
     """Computer Vision service for disaster image analysis"""
@@ -18,40 +62,56 @@ class CVService:
     def __init__(self):
         self.settings = get_settings()
         self.damage_classes = ["Minimal", "Minor", "Moderate", "Severe", "Critical"]
-
-    async def analyze_damage(self, image_path: str, debug: bool = False) -> Dict:
-        """Comprehensive damage analysis using computer vision"""
+        # Horizontal distance-1 offset first so the legacy energy/contrast values are preserved
+        self.glcm_offsets = glcm_offsets()
+        self.color_classifier = HSVRangeClassifier(self.settings.color_damage_ranges)
+        self.detector_scheduler = DetectorScheduler(
+            self._analysis_nodes(), max_workers=self.settings.cv_detector_workers
+        )
+
+    def _analysis_nodes(self) -> List[AnalysisNode]:
+        """Derived planes and detectors with the inputs each one reads"""
+        return [
+            AnalysisNode("gray", lambda ctx: ctx.gray),
+            AnalysisNode("hsv", lambda ctx: ctx.hsv),
+            AnalysisNode("canny", self._edges, ("gray",)),
+            AnalysisNode("hough_lines", self._hough_lines, ("canny",)),
+            AnalysisNode("debris_mask", self._debris_mask, ("gray",)),
+            AnalysisNode("color_labels", self._color_labels, ("hsv",)),
+            AnalysisNode("color", self._detect_color_anomalies, ("color_labels",)),
+            AnalysisNode("texture", self._detect_texture_anomalies, ("gray",)),
+            AnalysisNode("edge", self._detect_edge_anomalies, ("canny", "hough_lines")),
+            AnalysisNode("debris", self._detect_debris, ("debris_mask",)),
+            AnalysisNode("deformation", self._detect_structural_deformation, ("hough_lines",)),
+        ]
+
+    async def analyze_damage(self, image: Union[str, ImageAnalysisContext], debug: bool = False,
+                             fidelity: Optional[str] = None) -> Dict:
+        """
+        Comprehensive damage analysis using computer vision (accepts path or decoded context).
+        ``fidelity`` selects a speed/accuracy tier (fast, balanced, full); defaults to settings.
+        """
         try:
-            abs_path = os.path.abspath(image_path)
-            cwd = os.getcwd()
-            if not os.path.exists(image_path):
-                logger.error(f"Image not found at {image_path} (absolute: {abs_path}, cwd: {cwd})")
-                raise FileNotFoundError(f"Image not found at {image_path} (absolute: {abs_path}, cwd: {cwd})")
-
-            image_cv = await asyncio.to_thread(cv2.imread, image_path)
-            if image_cv is None:
-                logger.error(f"cv2.imread failed to load image at {image_path} (absolute: {abs_path})")
-                # Try PIL for diagnostics
-                try:
-                    with Image.open(image_path) as img:
-                        img.verify()
-                    logger.error("PIL can open the image, but OpenCV cannot. Check image format compatibility.")
-                except Exception as pil_e:
-                    logger.error(f"PIL also failed to open image: {pil_e}")
-                raise ValueError(f"Could not load image from {image_path} (absolute: {abs_path})")
-
-            preprocessing_result = await self.preprocess_image(image_path)
-            # Use ndarray to avoid re-reading from disk
-            damage_indicators = await asyncio.to_thread(self._detect_damage_indicators, image_cv)
+            tier = resolve_fidelity(fidelity)
+            ctx = await asyncio.to_thread(as_image_context, image)
+            analysis_ctx = await asyncio.to_thread(ctx.fit_within, tier.max_dimension)
+            if process_backend_enabled():
+                await self._analyze_in_process_pool(ctx, analysis_ctx, tier)
+
+            preprocessing_result = await self.preprocess_image(ctx, kmeans_attempts=tier.kmeans_attempts)
+            damage_indicators = await asyncio.to_thread(
+                self._detect_damage_indicators, analysis_ctx, tier.detectors
+            )
             damage_score = self._calculate_damage_score(damage_indicators)
             damage_level = self._classify_damage_level(damage_score)
             confidence = self._calculate_confidence(damage_indicators)
 
             debug_image_path = None
             if debug:
-                debug_image_path = await asyncio.to_thread(
-                    self._generate_debug_visualization, image_path, damage_indicators
-                )
+                # Rendered and written by the post-processing workers; the path is known now
+                debug_image_path = self.debug_image_path(analysis_ctx.source_path)
+                await post_process("debug_overlay", self.write_debug_overlay,
+                                   analysis_ctx, damage_indicators, debug_image_path)
 
             return {
                 "damage_level": damage_level,
@@ -61,6 +121,8 @@ class CVService:
                 "preprocessing": preprocessing_result,
                 "analysis_method": "computer_vision",
                 "debug_image_path": debug_image_path,
+                "fidelity": tier.name,
+                "analysis_dimensions": analysis_ctx.dimensions,
             }
 
         except Exception as e:
@@ -72,25 +134,187 @@ class CVService:
                 "error": str(e),
             }
 
-    async def assess_infrastructure_damage(self, image_path: str) -> Dict:
-        """Assess infrastructure-specific damage indicators"""
+    async def coarse_damage(self, image: Union[str, ImageAnalysisContext], max_dimension: Optional[int] = None) -> Dict:
+        """
+        Quick first estimate for progressive results: the fast tier's
+        detectors on a small downscale (settings.coarse_max_dimension), no
+        preprocessing. Superseded by analyze_damage.
+        """
+        try:
+            tier = resolve_fidelity("fast")
+            ctx = await asyncio.to_thread(as_image_context, image)
+            coarse_ctx = await asyncio.to_thread(ctx.fit_within, max_dimension or self.settings.coarse_max_dimension)
+            damage_indicators = await asyncio.to_thread(
+                self._detect_damage_indicators, coarse_ctx, tier.detectors
+            )
+            damage_score = self._calculate_damage_score(damage_indicators)
+            return {
+                "damage_level": self._classify_damage_level(damage_score),
+                "damage_score": float(damage_score),
+                "confidence_score": float(self._calculate_confidence(damage_indicators)),
+                "indicators": damage_indicators,
+                "analysis_method": "computer_vision_coarse",
+                "analysis_dimensions": coarse_ctx.dimensions,
+            }
+
+        except Exception as e:
+            logger.error(f"Coarse CV damage analysis failed: {str(e)}")
+            return {
+                "damage_level": "Minimal",
+                "damage_score": 0.0,
+                "confidence_score": 0.0,
+                "error": str(e),
+            }
+
+    async def _analyze_in_process_pool(self, ctx: ImageAnalysisContext, analysis_ctx: ImageAnalysisContext,
+                                       tier: FidelityTier) -> None:
+        """Run the CPU-heavy detector and feature passes in a warm worker and seed the context cache"""
+        remote = await get_process_backend().analyze_cv(
+            analysis_ctx.image, tier.detectors, tier.kmeans_attempts
+        )
+        for name, score in remote["scores"].items():
+            analysis_ctx.seed(f"score:{name}", score)
+        analysis_ctx.seed(self._indicators_key(tier.detectors), remote["indicators"])
+        processed = await asyncio.to_thread(ctx.resized, PREPROCESS_SIZE)
+        processed.seed(self._features_key(tier.kmeans_attempts), remote["features"])
+
+    async def analyze_tiled(self, image: Union[str, np.ndarray, TiledImage], tile_size: Optional[int] = None,
+                            heatmap: bool = False) -> Dict:
+        """
+        Tile-by-tile damage analysis for images too large to analyze whole
+        (drone orthophotos, satellite crops). Tiles keep full resolution, run
+        in parallel and are held in memory only while being scored.
+        """
+        try:
+            tiled = await asyncio.to_thread(self._as_tiled_image, image)
+            result = await asyncio.to_thread(
+                self._analyze_tiles, tiled, tile_size or self.settings.cv_tile_size
+            )
+            if heatmap:
+                result["heatmap_path"] = await asyncio.to_thread(self._render_tile_heatmap, tiled, result)
+            return result
+
+        except Exception as e:
+            logger.error(f"Tiled damage analysis failed: {str(e)}")
+            return {
+                "damage_level": "Minimal",
+                "damage_score": 0.0,
+                "confidence_score": 0.0,
+                "error": str(e),
+            }
+
+    async def render_tile_heatmap(self, image: Union[str, np.ndarray, TiledImage], result: Dict) -> str:
+        """Heatmap of a tiled result's severity grid over ``image`` (e.g. a re-upload of a cached image)"""
+        tiled = await asyncio.to_thread(self._as_tiled_image, image)
+        return await asyncio.to_thread(self._render_tile_heatmap, tiled, result)
+
+    def _as_tiled_image(self, image: Union[str, np.ndarray, TiledImage]) -> TiledImage:
+        if isinstance(image, TiledImage):
+            return image
+        if isinstance(image, str):
+            return TiledImage.open(image, self.settings.tiled_max_megapixels)
+        return TiledImage.from_array(image)
+
+    def _score_tile(self, tiled: TiledImage, window: TileWindow) -> Tuple[TileWindow, Dict, float]:
+        ctx = ImageAnalysisContext(tiled.read_tile(window))
+        indicators = self._detect_damage_indicators(ctx)
+        return window, indicators, self._calculate_damage_score(indicators)
+
+    def _analyze_tiles(self, tiled: TiledImage, tile_size: int) -> Dict:
+        windows = tiled.tiles(tile_size)
+        rows = windows[-1].row + 1
+        cols = windows[-1].col + 1
+        grid = [[0.0] * cols for _ in range(rows)]
+        detector_totals = dict.fromkeys(DETECTORS, 0.0)
+        weighted_score = 0.0
+        max_tile_score = 0.0
+        damaged_tiles = 0
+
+        def collect(window: TileWindow, indicators: Dict, score: float) -> None:
+            nonlocal weighted_score, max_tile_score, damaged_tiles
+            grid[window.row][window.col] = round(score, 4)
+            weighted_score += score * window.area
+            max_tile_score = max(max_tile_score, score)
+            damaged_tiles += score >= 0.4
+            for name in DETECTORS:
+                detector_totals[name] += indicators.get(f"{name}_score", 0.0) * window.area
+
+        # Submitting at most `workers` tiles at a time bounds the decoded tiles held in memory
+        workers = max(1, self.settings.cv_tile_workers)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cv-tile") as executor:
+            running = set()
+            for window in windows:
+                if len(running) >= workers:
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(*future.result())
+                running.add(executor.submit(self._score_tile, tiled, window))
+            for future in wait(running).done:
+                collect(*future.result())
+
+        total_area = float(tiled.width * tiled.height)
+        indicators = self._empty_indicators()
+        for name, total in detector_totals.items():
+            score = total / total_area
+            indicators[DETECTOR_FLAGS[name]] = score > DETECTOR_THRESHOLDS[name]
+            indicators[f"{name}_score"] = float(score)
+
+        damage_score = weighted_score / total_area
+        return {
+            "damage_level": self._classify_damage_level(damage_score),
+            "damage_score": float(damage_score),
+            "confidence_score": self._calculate_confidence(indicators),
+            "indicators": indicators,
+            "analysis_method": "computer_vision_tiled",
+            "tiling": {
+                "tile_size": tile_size,
+                "rows": rows,
+                "cols": cols,
+                "tile_count": len(windows),
+                "image_dimensions": tiled.dimensions,
+            },
+            "severity_grid": grid,
+            "max_tile_score": float(max_tile_score),
+            "damaged_tile_fraction": damaged_tiles / len(windows),
+        }
+
+    def _render_tile_heatmap(self, tiled: TiledImage, result: Dict, max_dimension: int = 1024) -> str:
+        """Overlay the per-tile severity grid on a downscaled copy of the image"""
         try:
-            abs_path = os.path.abspath(image_path)
-            cwd = os.getcwd()
+            preview = tiled.overview(max_dimension)
+            grid = np.asarray(result["severity_grid"], dtype=np.float32)
+            tile_size = result["tiling"]["tile_size"]
+            # Map every preview pixel back to the tile it came from
+            rows = (np.arange(preview.shape[0]) * (tiled.height / preview.shape[0]) // tile_size).astype(int)
+            cols = (np.arange(preview.shape[1]) * (tiled.width / preview.shape[1]) // tile_size).astype(int)
+            cells = grid[np.ix_(np.minimum(rows, grid.shape[0] - 1), np.minimum(cols, grid.shape[1] - 1))]
+            colored = cv2.applyColorMap((np.clip(cells, 0.0, 1.0) * 255).astype(np.uint8), cv2.COLORMAP_JET)
+            output = cv2.addWeighted(preview, 0.6, colored, 0.4, 0)
+
+            if tiled.source_path:
+                heatmap_path = os.path.splitext(tiled.source_path)[0] + "_heatmap.png"
+            else:
+                os.makedirs(self.settings.upload_directory, exist_ok=True)
+                heatmap_path = os.path.join(self.settings.upload_directory, f"{uuid.uuid4()}_heatmap.png")
+            cv2.imwrite(heatmap_path, output)
+            return heatmap_path
 
-            if not os.path.exists(image_path):
-                logger.error(f"Image not found at {image_path} (absolute: {abs_path}, cwd: {cwd})")
-                raise FileNotFoundError(f"Image not found at {image_path} (absolute: {abs_path}, cwd: {cwd})")
+        except Exception as e:
+            logger.error(f"Tile heatmap rendering failed: {str(e)}")
+            return ""
 
-            image = await asyncio.to_thread(cv2.imread, image_path)
-            if image is None:
-                logger.error(f"Could not load image from {image_path} (absolute: {abs_path}, cwd: {cwd})")
-                raise ValueError(f"Could not load image from {image_path} (absolute: {abs_path}, cwd: {cwd})")
+    async def assess_infrastructure_damage(self, image: Union[str, ImageAnalysisContext],
+                                           fidelity: Optional[str] = None) -> Dict:
+        """Assess infrastructure-specific damage indicators (accepts path or decoded context)"""
+        try:
+            tier = resolve_fidelity(fidelity)
+            ctx = await asyncio.to_thread(as_image_context, image)
+            ctx = await asyncio.to_thread(ctx.fit_within, tier.max_dimension)
 
-            structural_analysis = await asyncio.to_thread(self._analyze_structural_integrity, image)
-            safety_analysis = await asyncio.to_thread(self._assess_safety_conditions, image)
-            accessibility_analysis = await asyncio.to_thread(self._check_accessibility, image)
-            utilities_analysis = await asyncio.to_thread(self._assess_utilities_damage, image)
+            structural_analysis = await asyncio.to_thread(self._analyze_structural_integrity, ctx)
+            safety_analysis = await asyncio.to_thread(self._assess_safety_conditions, ctx, tier.detectors)
+            accessibility_analysis = await asyncio.to_thread(self._check_accessibility, ctx)
+            utilities_analysis = await asyncio.to_thread(self._assess_utilities_damage, ctx)
 
             return {
                 "structural_integrity": structural_analysis["status"],
@@ -148,10 +372,10 @@ class CVService:
                 "error": str(e),
             }
 
-    async def analyze_infrastructure(self, image_path: str, damage_data: Dict) -> Dict:
+    async def analyze_infrastructure(self, image: Union[str, ImageAnalysisContext], damage_data: Dict) -> Dict:
         """Analyze infrastructure impact (for API compatibility)"""
         try:
-            infrastructure_result = await self.assess_infrastructure_damage(image_path)
+            infrastructure_result = await self.assess_infrastructure_damage(image)
             combined_analysis = {
                 **infrastructure_result,
                 "damage_context": damage_data,
@@ -188,22 +412,19 @@ class CVService:
 
         return recommendations
 
-    async def preprocess_image(self, image_path: str) -> Dict:
-        """Preprocess image for analysis"""
+    async def preprocess_image(self, image: Union[str, ImageAnalysisContext], kmeans_attempts: int = 10) -> Dict:
+        """Preprocess image for analysis (accepts path or decoded context)"""
         try:
-            image = await asyncio.to_thread(cv2.imread, image_path)
-            if image is None:
-                abs_path = os.path.abspath(image_path)
-                raise ValueError(f"Could not load image from {image_path} (absolute: {abs_path})")
+            ctx = await asyncio.to_thread(as_image_context, image)
 
-            original_height, original_width = image.shape[:2]
-            processed_image = await asyncio.to_thread(cv2.resize, image, (512, 512))
-            enhanced_image = await asyncio.to_thread(self._enhance_image, processed_image)
-            features = await asyncio.to_thread(self._extract_features, enhanced_image)
+            # The uploaded image's size; ctx.dimensions is the (possibly reduced) decode
+            original_width, original_height = ctx.source_dimensions
+            processed = await asyncio.to_thread(ctx.resized, PREPROCESS_SIZE)
+            features = await asyncio.to_thread(self._enhanced_features, processed, kmeans_attempts)
 
             return {
                 "original_dimensions": (original_width, original_height),
-                "processed_dimensions": (512, 512),
+                "processed_dimensions": PREPROCESS_SIZE,
                 "features": features,
                 "enhancement_applied": True,
                 "status": "success",
@@ -213,90 +434,209 @@ class CVService:
             logger.error(f"Image preprocessing failed: {str(e)}")
             return {"status": "error", "error": str(e)}
 
-    def _generate_debug_visualization(self, image_path: str, indicators: Dict) -> str:
+    def _enhanced_features(self, image: Union[np.ndarray, ImageAnalysisContext], kmeans_attempts: int = 10) -> Dict:
+        """Features of the contrast-enhanced image, computed once per resized context"""
+        ctx = as_image_context(image)
+        return ctx.memoize(
+            self._features_key(kmeans_attempts),
+            lambda: self._extract_features(self._enhance_image(ctx.image), kmeans_attempts),
+        )
+
+    @staticmethod
+    def _features_key(kmeans_attempts: int) -> str:
+        return "enhanced_features" if kmeans_attempts == 10 else f"enhanced_features:k{kmeans_attempts}"
+
+    def _generate_debug_visualization(self, image: Union[str, ImageAnalysisContext], indicators: Dict) -> str:
         """Generate annotated debug image showing detection areas"""
         try:
-            image = cv2.imread(image_path)
-            if image is None:
-                raise ValueError(f"Could not load image from {image_path}")
-
-            output = image.copy()
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            edges = cv2.Canny(gray, 50, 150)
-            output[edges > 0] = (0, 0, 255)  # red for cracks
-
-            debris_mask = self._create_debris_mask(gray)
-            output[debris_mask > 0] = (0, 255, 255)  # yellow for debris
-
-            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-            damage_colors = [([10, 50, 50], [25, 255, 200]), ([0, 0, 50], [180, 30, 150])]
-            for lower, upper in damage_colors:
-                mask = cv2.inRange(hsv, np.array(lower), np.array(upper))
-                output[mask > 0] = (255, 0, 0)  # blue for color anomalies
-
-            cv2.putText(output, f"ColorScore: {indicators['color_score']:.2f}", (10, 30),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-            cv2.putText(output, f"TextureScore: {indicators['texture_score']:.2f}", (10, 60),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-            cv2.putText(output, f"EdgeScore: {indicators['edge_score']:.2f}", (10, 90),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-
-            debug_path = os.path.splitext(image_path)[0] + "_debug.jpg"
-            cv2.imwrite(debug_path, output)
-            return debug_path
+            ctx = as_image_context(image)
+            return self.write_debug_overlay(ctx, indicators, self.debug_image_path(ctx.source_path))
 
         except Exception as e:
             logger.error(f"Debug visualization failed: {str(e)}")
             return ""
 
+    def debug_image_path(self, source_path: Optional[str]) -> str:
+        """Debug overlay location: next to the stored image, or a new file in the upload directory"""
+        if source_path:
+            return os.path.splitext(source_path)[0] + "_debug.jpg"
+        return os.path.join(self.settings.upload_directory, f"{uuid.uuid4()}_debug.jpg")
+
+    def write_debug_overlay(self, image: Union[str, ImageAnalysisContext], indicators: Dict, debug_path: str) -> str:
+        """Draw the detection areas and scores over the image and write it to ``debug_path``; raises on failure"""
+        ctx = as_image_context(image)
+
+        output = ctx.image.copy()
+        output[self._edges(ctx) > 0] = (0, 0, 255)  # red for cracks
+        output[self._debris_mask(ctx) > 0] = (0, 255, 255)  # yellow for debris
+
+        output[self._color_labels(ctx) > 0] = (255, 0, 0)  # blue for color anomalies
+
+        cv2.putText(output, f"ColorScore: {indicators.get('color_score', 0.0):.2f}", (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        cv2.putText(output, f"TextureScore: {indicators.get('texture_score', 0.0):.2f}", (10, 60),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        cv2.putText(output, f"EdgeScore: {indicators.get('edge_score', 0.0):.2f}", (10, 90),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+        os.makedirs(os.path.dirname(debug_path) or ".", exist_ok=True)
+        if not cv2.imwrite(debug_path, output):
+            raise OSError(f"Could not write debug overlay to {debug_path}")
+        return debug_path
+
     # -------- detection helpers --------
 
-    def _detect_damage_indicators(self, image_or_path: Union[str, np.ndarray]) -> Dict:
-        """Detect damage indicators (accepts path or ndarray)."""
+    def _detect_damage_indicators(self, image_or_path: Union[str, np.ndarray, ImageAnalysisContext],
+                                  detectors: Tuple[str, ...] = DETECTORS) -> Dict:
+        """
+        Detect damage indicators (accepts path, ndarray or context). Detectors
+        left out of ``detectors`` report zero and are listed under ``skipped_detectors``.
+        """
+        skipped = [name for name in DETECTORS if name not in detectors]
         try:
-            if isinstance(image_or_path, str):
-                image = cv2.imread(image_or_path)
-            else:
-                image = image_or_path
-
-            if image is None:
-                raise ValueError("Could not load image.")
-
-            color_damage = self._detect_color_anomalies(image)
-            texture_damage = self._detect_texture_anomalies(image)
-            edge_damage = self._detect_edge_anomalies(image)
-            debris_detected = self._detect_debris(image)
-            deformation = self._detect_structural_deformation(image)
-
-            if (color_damage < 0.2 and texture_damage < 0.2 and edge_damage < 0.2 and
-                debris_detected < 0.2 and deformation < 0.2):
-                return {
-                    "color_based": False, "texture_based": False, "edge_based": False,
-                    "debris_present": False, "structural_deformation": False,
-                    "color_score": 0.0, "texture_score": 0.0, "edge_score": 0.0,
-                    "debris_score": 0.0, "deformation_score": 0.0,
-                }
-
-            return {
-                "color_based": color_damage > 0.5,
-                "texture_based": texture_damage > 0.5,
-                "edge_based": edge_damage > 0.4,
-                "debris_present": debris_detected > 0.5,
-                "structural_deformation": deformation > 0.5,
-                "color_score": float(color_damage),
-                "texture_score": float(texture_damage),
-                "edge_score": float(edge_damage),
-                "debris_score": float(debris_detected),
-                "deformation_score": float(deformation),
-            }
+            ctx = as_image_context(image_or_path)
+            return dict(ctx.memoize(
+                self._indicators_key(detectors),
+                lambda: self._compute_damage_indicators(ctx, detectors),
+            ))
         except Exception as e:
             logger.error(f"Damage indicator detection failed: {str(e)}")
-            return {
-                "color_based": False, "texture_based": False, "edge_based": False,
-                "debris_present": False, "structural_deformation": False,
-                "color_score": 0.0, "texture_score": 0.0, "edge_score": 0.0,
-                "debris_score": 0.0, "deformation_score": 0.0,
-            }
+            return self._empty_indicators(skipped)
+
+    @staticmethod
+    def _indicators_key(detectors: Tuple[str, ...]) -> str:
+        if set(detectors) == set(DETECTORS):
+            return "indicators"
+        return "indicators:" + ",".join(name for name in DETECTORS if name in detectors)
+
+    def _compute_damage_indicators(self, ctx: ImageAnalysisContext, detectors: Tuple[str, ...] = DETECTORS) -> Dict:
+        cascade = None
+        if self.settings.cv_detector_cascade:
+            cascade = self._run_cascade(ctx, detectors)
+            if cascade["minimal"]:
+                indicators = self._empty_indicators([name for name in DETECTORS if name not in detectors])
+                indicators["cascade"] = cascade
+                return indicators
+
+        # Detectors the cascade already scored are memoized on the context
+        scores = self.detector_scheduler.run(ctx, [name for name in DETECTORS if name in detectors])
+        skipped = [name for name in DETECTORS if name not in scores]
+
+        indicators = self._empty_indicators(skipped)
+        if not all(score < MINIMAL_SCORE for score in scores.values()):
+            for name, score in scores.items():
+                indicators[DETECTOR_FLAGS[name]] = score > DETECTOR_THRESHOLDS[name]
+                indicators[f"{name}_score"] = float(score)
+        if cascade is not None:
+            indicators["cascade"] = cascade
+        return indicators
+
+    def _run_cascade(self, ctx: ImageAnalysisContext, detectors: Tuple[str, ...] = DETECTORS) -> Dict:
+        """
+        Walk the detectors cheapest-first looking for proof that the image is
+        minimal damage. A detector whose cheap upper bound is below
+        MINIMAL_SCORE is never run; otherwise it is scored exactly, and the
+        first score at or above MINIMAL_SCORE ends the cascade (the remaining
+        detectors then run as usual). The bounds are conservative, so the
+        outcome always matches a full run.
+        """
+        bounds = {
+            "edge": self._edge_score_bound,
+            "deformation": self._deformation_score_bound,
+            "texture": self._texture_score_bound,
+        }
+        stages = [name for name in CASCADE_ORDER if name in detectors]
+        bypassed = []
+        exit_stage, minimal = None, True
+        for name in stages:
+            exit_stage = name
+            bound = bounds.get(name)
+            if bound is not None and bound(ctx) < MINIMAL_SCORE:
+                bypassed.append(name)
+                continue
+            if self.detector_scheduler.nodes[name].compute(ctx) >= MINIMAL_SCORE:
+                minimal = False
+                break
+
+        metrics.increment("cv_cascade_runs_total")
+        metrics.increment(f"cv_cascade_exit_total:{exit_stage}" + (":minimal" if minimal else ""))
+        metrics.increment("cv_cascade_detectors_total", len(stages))
+        if minimal:
+            metrics.increment("cv_cascade_minimal_total")
+            metrics.increment("cv_cascade_detectors_skipped_total", len(bypassed))
+        return {"exit_stage": exit_stage, "minimal": minimal, "bypassed_detectors": bypassed if minimal else []}
+
+    def _edge_score_bound(self, ctx: ImageAnalysisContext) -> float:
+        """
+        Exact edge score when there are too few edge pixels for any Hough line
+        to reach the vote threshold (so the line transform can be skipped),
+        otherwise an upper bound assuming the maximum line score
+        """
+        edges = self._edges(ctx)
+        edge_pixels = cv2.countNonZero(edges)
+        edge_score = min(1.0, edge_pixels / max(edges.size, 1) * 10)
+        if edge_pixels < HOUGH_VOTE_THRESHOLD:
+            return edge_score / 2
+        return (edge_score + 1.0) / 2
+
+    def _deformation_score_bound(self, ctx: ImageAnalysisContext) -> float:
+        """Zero when no Hough line can reach the vote threshold, otherwise 1.0"""
+        return 0.0 if cv2.countNonZero(self._edges(ctx)) < HOUGH_VOTE_THRESHOLD else 1.0
+
+    @context_cached("bound:texture")
+    def _texture_score_bound(self, ctx: ImageAnalysisContext) -> float:
+        """
+        Upper bound on the LBP entropy score without computing the LBP. An
+        interior pixel no brighter than any of its 8 neighbours always gets
+        code 255 and the one-pixel border is left at code 0; in the worst case
+        the remaining pixels spread evenly over all 256 codes.
+        """
+        gray = ctx.gray
+        height, width = gray.shape[:2]
+        if height < 3 or width < 3:
+            return 1.0
+        total = height * width
+        interior = gray[1:-1, 1:-1]
+        neighbourhood_min = cv2.erode(gray, np.ones((3, 3), np.uint8))[1:-1, 1:-1]
+        code_255 = cv2.countNonZero(cv2.compare(neighbourhood_min, interior, cv2.CMP_EQ))
+        border = total - interior.size
+        rest = total - code_255 - border
+
+        masses = np.array([code_255, border, rest], dtype=np.float64) / total
+        masses = masses[masses > 0]
+        entropy = float(-(masses * np.log2(masses)).sum()) + 8.0 * rest / total
+        return min(1.0, entropy / 8.0)
+
+    @staticmethod
+    def _empty_indicators(skipped: Optional[List[str]] = None) -> Dict:
+        indicators = {
+            "color_based": False, "texture_based": False, "edge_based": False,
+            "debris_present": False, "structural_deformation": False,
+            "color_score": 0.0, "texture_score": 0.0, "edge_score": 0.0,
+            "debris_score": 0.0, "deformation_score": 0.0,
+        }
+        if skipped:
+            indicators["skipped_detectors"] = list(skipped)
+        return indicators
+
+    # -------- shared derived planes (computed once per image) --------
+
+    @context_cached("canny")
+    def _edges(self, ctx: ImageAnalysisContext) -> np.ndarray:
+        return cv2.Canny(ctx.gray, 50, 150, apertureSize=3)
+
+    @context_cached("hough_lines")
+    def _hough_lines(self, ctx: ImageAnalysisContext) -> Optional[np.ndarray]:
+        return cv2.HoughLines(self._edges(ctx), 1, np.pi / 180, threshold=HOUGH_VOTE_THRESHOLD)
+
+    @context_cached("debris_mask")
+    def _debris_mask(self, ctx: ImageAnalysisContext) -> np.ndarray:
+        return self._create_debris_mask(ctx.gray)
+
+    @context_cached("color_labels")
+    def _color_labels(self, ctx: ImageAnalysisContext) -> np.ndarray:
+        """Per-pixel bitmask of the damage color ranges each pixel falls in"""
+        return self.color_classifier.classify(ctx.hsv)
 
     def _create_debris_mask(self, gray_image: np.ndarray) -> np.ndarray:
         try:
@@ -311,67 +651,45 @@ class CVService:
             logger.error(f"Debris mask creation failed: {str(e)}")
             return np.zeros_like(gray_image)
 
-    def _detect_color_anomalies(self, image: np.ndarray) -> float:
+    @context_cached("score:color")
+    def _detect_color_anomalies(self, ctx: ImageAnalysisContext) -> float:
         try:
-            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-            damage_colors = [
-                ([10, 50, 50], [25, 255, 200]),   # rust/brown
-                ([0, 0, 0], [180, 30, 100]),      # dark/smoke
-                ([160, 50, 50], [180, 255, 255])  # red
-            ]
-            total_damage_pixels = 0
-            total_pixels = image.shape[0] * image.shape[1]
-            for lower, upper in damage_colors:
-                mask = cv2.inRange(hsv, np.array(lower), np.array(upper))
-                total_damage_pixels += int(np.count_nonzero(mask))
+            total_damage_pixels = self.color_classifier.count(self._color_labels(ctx))
+            total_pixels = ctx.height * ctx.width
             return min(1.0, total_damage_pixels / (total_pixels * 0.3))
         except Exception as e:
             logger.error(f"Color anomaly detection failed: {str(e)}")
             return 0.0
 
-    def _detect_texture_anomalies(self, image: np.ndarray) -> float:
+    @context_cached("score:texture")
+    def _detect_texture_anomalies(self, ctx: ImageAnalysisContext) -> float:
         try:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            lbp = self._calculate_lbp(gray)
-            hist = cv2.calcHist([lbp], [0], None, [256], [0, 256]).flatten()
-            hist = hist / (np.sum(hist) + 1e-10)
-            entropy = -np.sum(hist * np.log2(hist + 1e-12))
+            lbp = self._calculate_lbp(ctx.gray)
+            hist = lbp_histogram(lbp, lbp_n_bins(8))
+            entropy = histogram_entropy(hist)
             max_entropy = 8.0
             return min(1.0, entropy / max_entropy)
         except Exception as e:
             logger.error(f"Texture anomaly detection failed: {str(e)}")
             return 0.0
 
-    def _calculate_lbp(self, gray: np.ndarray, radius: int = 1, n_points: int = 8) -> np.ndarray:
+    def _calculate_lbp(self, gray: np.ndarray, radius: int = 1, n_points: int = 8,
+                       method: str = "default") -> np.ndarray:
         try:
-            h, w = gray.shape
-            lbp = np.zeros((h, w), dtype=np.uint8)
-            for i in range(radius, h - radius):
-                for j in range(radius, w - radius):
-                    center = gray[i, j]
-                    code = 0
-                    for p in range(n_points):
-                        angle = 2 * np.pi * p / n_points
-                        x = int(round(i + radius * np.cos(angle)))
-                        y = int(round(j + radius * np.sin(angle)))
-                        if 0 <= x < h and 0 <= y < w:
-                            if gray[x, y] >= center:
-                                code |= (1 << p)
-                    lbp[i, j] = code
-            return lbp
+            return local_binary_pattern(gray, radius, n_points, method)
         except Exception as e:
             logger.error(f"LBP calculation failed: {str(e)}")
             return np.zeros_like(gray)
 
-    def _detect_edge_anomalies(self, image: np.ndarray) -> float:
+    @context_cached("score:edge")
+    def _detect_edge_anomalies(self, ctx: ImageAnalysisContext) -> float:
         try:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            edges = cv2.Canny(gray, 50, 150, apertureSize=3)
+            edges = self._edges(ctx)
             edge_pixels = int(np.count_nonzero(edges))
             total_pixels = edges.shape[0] * edges.shape[1]
             edge_density = edge_pixels / max(total_pixels, 1)
 
-            lines = cv2.HoughLines(edges, 1, np.pi / 180, threshold=100)
+            lines = self._hough_lines(ctx)
             line_count = len(lines) if lines is not None else 0
 
             edge_score = min(1.0, edge_density * 10)
@@ -381,23 +699,19 @@ class CVService:
             logger.error(f"Edge anomaly detection failed: {str(e)}")
             return 0.0
 
-    def _detect_debris(self, image: np.ndarray) -> float:
+    @context_cached("score:debris")
+    def _detect_debris(self, ctx: ImageAnalysisContext) -> float:
         try:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            debris_mask = self._create_debris_mask(gray)
+            debris_mask = self._debris_mask(ctx)
             contours, _ = cv2.findContours(debris_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            debris_contours = []
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                if 50 < area < 5000:
-                    perimeter = cv2.arcLength(contour, True)
-                    if perimeter > 0:
-                        circularity = 4 * np.pi * area / (perimeter * perimeter)
-                        if 0.1 < circularity < 0.9:
-                            debris_contours.append(contour)
-            debris_count = len(debris_contours)
-            total_debris_area = sum(cv2.contourArea(c) for c in debris_contours)
-            image_area = image.shape[0] * image.shape[1]
+            areas, perimeters = contour_areas_and_perimeters(contours)
+            # Irregular fragments: mid-sized and neither line-like nor round
+            with np.errstate(divide="ignore", invalid="ignore"):
+                circularity = 4 * np.pi * areas / (perimeters * perimeters)
+            debris = (areas > 50) & (areas < 5000) & (perimeters > 0) & (circularity > 0.1) & (circularity < 0.9)
+            debris_count = int(np.count_nonzero(debris))
+            total_debris_area = float(areas[debris].sum())
+            image_area = ctx.height * ctx.width
             count_score = min(1.0, debris_count / 20)
             area_score = min(1.0, total_debris_area / (image_area * 0.1))
             return (count_score + area_score) / 2
@@ -405,38 +719,33 @@ class CVService:
             logger.error(f"Debris detection failed: {str(e)}")
             return 0.0
 
-    def _detect_structural_deformation(self, image: np.ndarray) -> float:
+    @context_cached("score:deformation")
+    def _detect_structural_deformation(self, ctx: ImageAnalysisContext) -> float:
         try:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            edges = cv2.Canny(gray, 50, 150)
-            lines = cv2.HoughLines(edges, 1, np.pi / 180, threshold=100)
+            lines = self._hough_lines(ctx)
             if lines is None or len(lines) < 5:
                 return 0.0
-            angles: List[float] = []
-            for line in lines:
-                rho, theta = line[0]
-                angle = theta * 180 / np.pi
-                angles.append(angle)
-            expected_angles = [0, 45, 90, 135]
-            deformation_score = 0.0
-            for angle in angles:
-                min_dev = min(abs(angle - expected) for expected in expected_angles)
-                if min_dev > 15:
-                    deformation_score += 0.1
-            return min(1.0, deformation_score)
+            angles = lines[:, 0, 1] * 180 / np.pi
+            expected_angles = np.array([0, 45, 90, 135], dtype=angles.dtype)
+            min_dev = np.abs(angles[:, None] - expected_angles[None, :]).min(axis=1)
+            # Each line more than 15 degrees off every expected orientation adds 0.1
+            return min(1.0, 0.1 * int(np.count_nonzero(min_dev > 15)))
         except Exception as e:
             logger.error(f"Structural deformation detection failed: {str(e)}")
             return 0.0
 
     def _calculate_damage_score(self, indicators: Dict) -> float:
         try:
+            skipped = set(indicators.get("skipped_detectors", ()))
             scores = [
-                indicators.get("color_score", 0.0) * 0.25,
-                indicators.get("texture_score", 0.0) * 0.25,
-                indicators.get("edge_score", 0.0) * 0.20,
-                indicators.get("debris_score", 0.0) * 0.20,
-                indicators.get("deformation_score", 0.0) * 0.10,
+                indicators.get(f"{name}_score", 0.0) * weight
+                for name, weight in DETECTOR_WEIGHTS.items()
+                if name not in skipped
             ]
+            if skipped:
+                # Re-weight over the detectors that actually ran
+                active_weight = sum(w for name, w in DETECTOR_WEIGHTS.items() if name not in skipped)
+                return float(sum(scores) / active_weight) if active_weight else 0.0
             return float(sum(scores))
         except Exception as e:
             logger.error(f"Damage score calculation failed: {str(e)}")
@@ -456,23 +765,11 @@ class CVService:
 
     def _calculate_confidence(self, indicators: Dict) -> float:
         try:
-            detected = sum(
-                [
-                    indicators.get("color_based", False),
-                    indicators.get("texture_based", False),
-                    indicators.get("edge_based", False),
-                    indicators.get("debris_present", False),
-                    indicators.get("structural_deformation", False),
-                ]
-            )
+            skipped = set(indicators.get("skipped_detectors", ()))
+            active = [name for name in DETECTORS if name not in skipped]
+            detected = sum(indicators.get(DETECTOR_FLAGS[name], False) for name in active)
             base_conf = 0.6 + (detected * 0.08)
-            scores = [
-                indicators.get("color_score", 0.0),
-                indicators.get("texture_score", 0.0),
-                indicators.get("edge_score", 0.0),
-                indicators.get("debris_score", 0.0),
-                indicators.get("deformation_score", 0.0),
-            ]
+            scores = [indicators.get(f"{name}_score", 0.0) for name in active]
             score_std = float(np.std(scores)) if scores else 0.5
             consistency_bonus = max(0.0, 0.3 - score_std)
             return float(min(0.95, base_conf + consistency_bonus))
@@ -482,7 +779,7 @@ class CVService:
 
     # -------- infra summaries --------
 
-    def _analyze_structural_integrity(self, image: np.ndarray) -> Dict:
+    def _analyze_structural_integrity(self, image: Union[np.ndarray, ImageAnalysisContext]) -> Dict:
         try:
             damage_score = self._detect_structural_deformation(image)
             if damage_score >= 0.7:
@@ -500,12 +797,14 @@ class CVService:
             logger.error(f"Structural integrity analysis failed: {str(e)}")
             return {"status": "Unknown", "score": 5.0}
 
-    def _assess_safety_conditions(self, image: np.ndarray) -> Dict:
-        """Assess safety conditions for emergency response"""
+    def _assess_safety_conditions(self, image: Union[np.ndarray, ImageAnalysisContext],
+                                  detectors: Tuple[str, ...] = DETECTORS) -> Dict:
+        """Assess safety conditions for emergency response, with the tier's detector set"""
         try:
-            debris_score = self._detect_debris(image)
-            # FIX: analyze the already-loaded image
-            damage_indicators = self._detect_damage_indicators(image)
+            ctx = as_image_context(image)
+            debris_score = self._detect_debris(ctx)
+            # Indicators are memoized per detector set, so this reuses the tier's analysis pass
+            damage_indicators = self._detect_damage_indicators(ctx, detectors)
 
             safety_factors = [
                 (1.0 - debris_score) * 0.4,
@@ -528,7 +827,7 @@ class CVService:
             logger.error(f"Safety assessment failed: {str(e)}")
             return {"level": "Unknown", "score": 5.0}
 
-    def _check_accessibility(self, image: np.ndarray) -> Dict:
+    def _check_accessibility(self, image: Union[np.ndarray, ImageAnalysisContext]) -> Dict:
         try:
             debris_score = self._detect_debris(image)
             if debris_score >= 0.7:
@@ -546,7 +845,7 @@ class CVService:
             logger.error(f"Accessibility check failed: {str(e)}")
             return {"status": "Unknown", "score": 5.0}
 
-    def _assess_utilities_damage(self, image: np.ndarray) -> Dict:
+    def _assess_utilities_damage(self, image: Union[np.ndarray, ImageAnalysisContext]) -> Dict:
         try:
             edge_score = self._detect_edge_anomalies(image)
             affected = []
@@ -575,26 +874,25 @@ class CVService:
             logger.error(f"Image enhancement failed: {str(e)}")
             return image
 
-    def _extract_features(self, image: np.ndarray) -> Dict:
+    def _extract_features(self, image: Union[np.ndarray, ImageAnalysisContext], kmeans_attempts: int = 10) -> Dict:
         try:
+            ctx = as_image_context(image)
+            image = ctx.image
             mean_bgr = np.mean(image, axis=(0, 1)).tolist()
             std_bgr = np.std(image, axis=(0, 1)).tolist()
 
-            data = image.reshape((-1, 3)).astype(np.float32)
-            criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
-            _, labels, centers = cv2.kmeans(data, 3, None, criteria, 10, cv2.KMEANS_RANDOM_CENTERS)
-            dominant_colors = centers.astype(int).tolist()
+            centers = dominant_colors(image, self.settings.dominant_color_method, 3, kmeans_attempts)
+            dominant = centers.astype(int).tolist()
 
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            glcm = self._calculate_glcm(gray)
+            glcm = self._calculate_glcm(ctx.gray)
 
-            edges = cv2.Canny(gray, 50, 150)
+            edges = self._edges(ctx)
             edge_density = float(np.count_nonzero(edges)) / float(edges.shape[0] * edges.shape[1])
             contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
             return {
-                "color": {"mean_bgr": mean_bgr, "std_bgr": std_bgr, "dominant_colors": dominant_colors},
-                "texture": {"energy": float(glcm.get("energy", 0)), "contrast": float(glcm.get("contrast", 0))},
+                "color": {"mean_bgr": mean_bgr, "std_bgr": std_bgr, "dominant_colors": dominant},
+                "texture": glcm,
                 "edges": {"edge_density": float(edge_density), "num_contours": int(len(contours))},
             }
         except Exception as e:
@@ -602,24 +900,19 @@ class CVService:
             return {}
 
     def _calculate_glcm(self, gray: np.ndarray) -> Dict:
+        """
+        Haralick texture features. Top-level values are for the horizontal
+        distance-1 offset; ``multi_offset`` holds the mean over all offsets.
+        """
         try:
-            levels = 32
-            normalized = (gray.astype(np.float32) / 256.0 * levels).astype(np.uint8)
-            glcm = np.zeros((levels, levels), dtype=np.float32)
-            h, w = normalized.shape
-            for i in range(h):
-                row = normalized[i]
-                for j in range(w - 1):
-                    glcm[row[j], row[j + 1]] += 1.0
-            glcm_sum = np.sum(glcm)
-            if glcm_sum == 0:
-                return {"energy": 0.0, "contrast": 0.0}
-            glcm /= glcm_sum
-            energy = float(np.sum(glcm ** 2))
-            i = np.arange(levels).reshape(-1, 1)
-            j = np.arange(levels).reshape(1, -1)
-            contrast = float(np.sum(glcm * (i - j) ** 2))
-            return {"energy": energy, "contrast": contrast}
+            quantized = quantize_gray(gray, GLCM_LEVELS)
+            glcm = compute_glcm(quantized, GLCM_LEVELS, self.glcm_offsets)
+            features = haralick_features(glcm)
+            result = {name: float(values[0]) for name, values in features.items()}
+            result["multi_offset"] = {name: float(np.mean(values)) for name, values in features.items()}
+            return result
         except Exception as e:
             logger.error(f"GLCM calculation failed: {str(e)}")
-            return {"energy": 0.0, "contrast": 0.0}
+            result = {name: 0.0 for name in HARALICK_FEATURES}
+            result["multi_offset"] = {name: 0.0 for name in HARALICK_FEATURES}
+            return result
@@ -0,0 +1,99 @@
+"""
+Detector Scheduler
+Runs CV detectors and the derived planes they depend on as a small
+dependency graph on a bounded thread pool
+"""
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..utils.image_context import ImageAnalysisContext
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AnalysisNode:
+    """A derived plane or detector computed from an image context"""
+    name: str
+    compute: Callable[[ImageAnalysisContext], Any]
+    depends_on: Tuple[str, ...] = ()
+
+
+class DetectorScheduler:
+    """
+    Executes analysis nodes once all of their inputs are ready. Independent
+    nodes run concurrently (OpenCV releases the GIL for most calls); with a
+    single worker the graph runs inline in topological order.
+    """
+
+    def __init__(self, nodes: Sequence[AnalysisNode], max_workers: int = 1):
+        self.nodes: Dict[str, AnalysisNode] = {node.name: node for node in nodes}
+        for node in nodes:
+            missing = [dep for dep in node.depends_on if dep not in self.nodes]
+            if missing:
+                raise ValueError(f"Node '{node.name}' depends on unknown nodes: {missing}")
+        self.max_workers = max(1, int(max_workers))
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="cv-detector"
+            )
+        return self._executor
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def resolve(self, targets: Iterable[str]) -> List[str]:
+        """Targets plus their transitive inputs, in dependency order"""
+        order: List[str] = []
+        visiting = set()
+
+        def visit(name: str) -> None:
+            if name in order:
+                return
+            if name not in self.nodes:
+                raise ValueError(f"Unknown analysis node '{name}'")
+            if name in visiting:
+                raise ValueError(f"Dependency cycle at analysis node '{name}'")
+            visiting.add(name)
+            for dep in self.nodes[name].depends_on:
+                visit(dep)
+            visiting.discard(name)
+            order.append(name)
+
+        for target in targets:
+            visit(target)
+        return order
+
+    def run(self, ctx: ImageAnalysisContext, targets: Sequence[str]) -> Dict[str, Any]:
+        """Compute ``targets`` for ``ctx`` and return their results by name"""
+        order = self.resolve(targets)
+        if self.max_workers == 1 or len(order) == 1:
+            results = {name: self.nodes[name].compute(ctx) for name in order}
+            return {name: results[name] for name in targets}
+
+        pending = {name: set(self.nodes[name].depends_on) for name in order}
+        running: Dict[Future, str] = {}
+        results: Dict[str, Any] = {}
+
+        while pending or running:
+            ready = [name for name, deps in pending.items() if not deps]
+            for name in ready:
+                del pending[name]
+                running[self.executor.submit(self.nodes[name].compute, ctx)] = name
+
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name] = future.result()
+                for deps in pending.values():
+                    deps.discard(name)
+
+        return {name: results[name] for name in targets}
@@ -0,0 +1,221 @@
+"""
+Image Downloader
+Async image fetching for URL-based analysis: one shared httpx connection
+pool, per-host concurrency limits, bodies read into a preallocated buffer,
+and a local cache revalidated with ETag / Last-Modified so images re-sent
+from the backend's storage are not downloaded again.
+"""
+import asyncio
+import logging
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from ..config.settings import get_settings
+from ..utils.image_io import MAX_DOWNLOAD_SIZE
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "AI-Disaster-Relief-System/1.0"
+CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class DownloadedImage:
+    data: bytes
+    content_type: str
+    from_cache: bool = False
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class ImageDownloader:
+    """Shared-pool async image downloader with a conditional-request cache"""
+
+    def __init__(self, max_connections: int = 32, per_host_limit: int = 6, timeout: float = 30.0,
+                 max_size: int = MAX_DOWNLOAD_SIZE, cache_max_bytes: int = 256 * 1024 * 1024,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.max_connections = max_connections
+        self.per_host_limit = max(1, per_host_limit)
+        self.timeout = timeout
+        self.max_size = max_size
+        self.cache_max_bytes = cache_max_bytes
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._cache: "OrderedDict[str, DownloadedImage]" = OrderedDict()
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+        self.stats: Counter = Counter()
+
+    def _client_for_loop(self) -> httpx.AsyncClient:
+        """The pooled client; connections and semaphores belong to one event loop"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            if self._client is not None:
+                self._discard_client(self._client, self._loop)
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                headers={"User-Agent": USER_AGENT},
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                transport=self._transport,
+            )
+            self._loop = loop
+            self._host_limits = {}
+        return self._client
+
+    @staticmethod
+    def _discard_client(client: httpx.AsyncClient, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """
+        Release a client created on another event loop, which is the only loop
+        that can close its connections: a loop still running (in another
+        thread) closes the client itself; for a finished loop the pooled
+        sockets are closed directly.
+        """
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            return
+        pool = getattr(client._transport, "_pool", None)  # httpcore pool of the default transport
+        for connection in list(getattr(pool, "connections", ())):
+            stream = getattr(getattr(connection, "_connection", None), "_network_stream", None)
+            sock = stream.get_extra_info("socket") if stream is not None else None
+            if sock is not None:
+                # asyncio hands out a TransportSocket wrapper, which has no close()
+                getattr(sock, "_sock", sock).close()
+
+    def _host_limit(self, host: str) -> asyncio.Semaphore:
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_limits[host]
+
+    async def fetch(self, url: str) -> DownloadedImage:
+        """Download an image, or reuse the cached copy if the server confirms it is unchanged"""
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https"):
+            raise ValueError("Only HTTP and HTTPS URLs are supported")
+
+        client = self._client_for_loop()
+        cached = self._cached(url)
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        try:
+            async with self._host_limit(parsed.netloc):
+                async with client.stream("GET", url, headers=headers) as response:
+                    if response.status_code == 304 and cached is not None:
+                        self.stats["revalidated"] += 1
+                        return DownloadedImage(cached.data, cached.content_type, True,
+                                               cached.etag, cached.last_modified)
+                    response.raise_for_status()
+
+                    content_type = response.headers.get("content-type", "").lower()
+                    if not content_type.startswith("image/"):
+                        raise ValueError(f"URL does not point to an image. Content-Type: {content_type}")
+                    data = await self._read_body(response)
+                    image = DownloadedImage(
+                        data, content_type,
+                        etag=response.headers.get("etag"),
+                        last_modified=response.headers.get("last-modified"),
+                    )
+        except httpx.HTTPError as e:
+            self.stats["errors"] += 1
+            raise ValueError(f"Failed to download image from URL: {str(e)}")
+
+        self.stats["downloads"] += 1
+        self.stats["bytes_downloaded"] += len(data)
+        if image.etag or image.last_modified:
+            self._store(url, image)
+        return image
+
+    async def _read_body(self, response: httpx.Response) -> bytes:
+        """Stream the body into a buffer sized from Content-Length, enforcing max_size"""
+        declared = response.headers.get("content-length", "")
+        expected = int(declared) if declared.isdigit() else 0
+        limit_mb = self.max_size // (1024 * 1024)
+        if expected > self.max_size:
+            raise ValueError(f"Image file too large (>{limit_mb}MB)")
+
+        # Preallocated when the length is known; a longer (e.g. decompressed) body grows it
+        buffer = bytearray(expected)
+        size = 0
+        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+            end = size + len(chunk)
+            if end > self.max_size:
+                raise ValueError(f"Image file too large (>{limit_mb}MB)")
+            buffer[size:end] = chunk
+            size = end
+        del buffer[size:]
+        return bytes(buffer)
+
+    # -------- validator cache --------
+
+    def _cached(self, url: str) -> Optional[DownloadedImage]:
+        with self._lock:
+            entry = self._cache.get(url)
+            if entry is not None:
+                self._cache.move_to_end(url)
+            return entry
+
+    def _store(self, url: str, image: DownloadedImage) -> None:
+        size = len(image.data)
+        if size > self.cache_max_bytes:
+            return
+        with self._lock:
+            previous = self._cache.pop(url, None)
+            if previous is not None:
+                self._cache_bytes -= len(previous.data)
+            self._cache[url] = image
+            self._cache_bytes += size
+            while self._cache_bytes > self.cache_max_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_bytes -= len(evicted.data)
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._cache_bytes = 0
+
+    async def aclose(self) -> None:
+        client, loop = self._client, self._loop
+        self._client, self._loop = None, None
+        if client is None:
+            return
+        if loop is asyncio.get_running_loop():
+            await client.aclose()
+        else:
+            self._discard_client(client, loop)
+
+
+_downloader: Optional[ImageDownloader] = None
+
+
+def get_image_downloader() -> ImageDownloader:
+    """Shared downloader for the service"""
+    global _downloader
+    if _downloader is None:
+        settings = get_settings()
+        _downloader = ImageDownloader(
+            max_connections=settings.download_max_connections,
+            per_host_limit=settings.download_per_host_limit,
+            timeout=settings.download_timeout_seconds,
+            cache_max_bytes=settings.download_cache_max_bytes,
+        )
+    return _downloader
+
+
+async def close_image_downloader() -> None:
+    global _downloader
+    if _downloader is not None:
+        await _downloader.aclose()
+        _downloader = None
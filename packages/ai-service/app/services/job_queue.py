@@ -0,0 +1,441 @@
+"""
+Job Queue
+Asynchronous analysis jobs: submitting returns a job id at once and a pool
+of worker tasks runs the analysis from a queue. Job state uses the same
+status vocabulary as DamageAssessmentModel.status (pending, processing,
+completed, failed). The broker is in-process by default or Redis-backed so
+several replicas can share one queue.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..config.settings import get_settings
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("pending", "processing", "completed", "failed")
+TERMINAL_STATUSES = ("completed", "failed")
+
+JobHandler = Callable[[Dict[str, Any], Optional[bytes]], Awaitable[Dict[str, Any]]]
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str) -> Callable[[JobHandler], JobHandler]:
+    """Register the coroutine that runs jobs of ``kind``: handler(payload, data) -> result"""
+    def register(handler: JobHandler) -> JobHandler:
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return register
+
+
+class JobQueueFullError(RuntimeError):
+    """Too many jobs are waiting; the client should retry later"""
+
+
+class InMemoryJobBroker:
+    """Single-process broker: a deque of job ids plus job state and payloads in memory"""
+
+    # Dequeued jobs live and die with this process, so there is nothing to lease or recover
+    lease_seconds: Optional[float] = None
+
+    def __init__(self, max_retained: int = 10000):
+        self.max_retained = max(1, max_retained)
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._payloads: Dict[str, Tuple[Dict[str, Any], Optional[bytes]]] = {}
+        self._pending: deque = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queued = self._changed = None
+
+    def _events(self) -> Tuple[asyncio.Event, asyncio.Event]:
+        """Wake-up events; like any asyncio primitive they belong to one event loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queued, self._changed = asyncio.Event(), asyncio.Event()
+            if self._pending:
+                self._queued.set()
+        return self._queued, self._changed
+
+    async def depth(self) -> int:
+        return len(self._pending)
+
+    async def enqueue(self, job: Dict[str, Any], payload: Dict[str, Any], data: Optional[bytes]) -> None:
+        queued, _ = self._events()
+        self._jobs[job["job_id"]] = job
+        self._payloads[job["job_id"]] = (payload, data)
+        self._pending.append(job["job_id"])
+        queued.set()
+        self._evict()
+
+    async def dequeue(self, timeout: float) -> Optional[Tuple[str, Dict[str, Any], Optional[bytes]]]:
+        queued, _ = self._events()
+        if not self._pending:
+            queued.clear()
+            try:
+                await asyncio.wait_for(queued.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+            if not self._pending:  # another worker took it
+                return None
+        job_id = self._pending.popleft()
+        payload, data = self._payloads.pop(job_id)
+        return job_id, payload, data
+
+    async def ack(self, job_id: str) -> None:
+        pass
+
+    async def renew(self, job_id: str) -> None:
+        pass
+
+    async def recover(self) -> int:
+        return 0
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    async def save(self, job: Dict[str, Any]) -> None:
+        _, changed = self._events()
+        self._jobs[job["job_id"]] = job
+        # Wake every waiter, then start a fresh event for the next change
+        changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_for_update(self, job_id: str, version: int, timeout: float) -> None:
+        """Return once the job's version passes ``version``, or after ``timeout``"""
+        deadline = time.monotonic() + timeout
+        while self._jobs.get(job_id, {}).get("version", version + 1) <= version:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            _, changed = self._events()
+            try:
+                await asyncio.wait_for(changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
+
+    def _evict(self) -> None:
+        """Forget the oldest finished jobs beyond max_retained"""
+        excess = len(self._jobs) - self.max_retained
+        if excess <= 0:
+            return
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in TERMINAL_STATUSES]
+        for job_id in finished[:excess]:
+            del self._jobs[job_id]
+
+    async def aclose(self) -> None:
+        self._loop = self._queued = self._changed = None
+
+
+class RedisJobBroker:
+    """
+    Broker on a Redis server (the redis.yaml service), shared by every
+    replica: a list for the queue, one key per job state and per payload,
+    each expiring after ``ttl_seconds``.
+
+    Delivery is at-least-once. A dequeued job moves atomically (BLMOVE) to a
+    processing list and its worker holds a lease key that expires after
+    ``lease_seconds`` unless renewed. The job leaves the processing list
+    (and its payload is deleted) only when acknowledged; ``recover`` puts
+    jobs whose lease lapsed (their worker crashed) back on the queue.
+    ``client`` is a redis.asyncio.Redis or anything with the same
+    get/set/delete/exists/lpush/rpush/llen/lrange/lrem/blmove methods.
+    """
+
+    def __init__(self, client: Any, prefix: str = "ai-service:jobs", ttl_seconds: int = 86400,
+                 poll_seconds: float = 0.5, lease_seconds: float = 60.0, lease_grace_seconds: float = 1.0):
+        self.client = client
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.lease_grace_seconds = lease_grace_seconds
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "RedisJobBroker":
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError:
+            raise RuntimeError("JOB_QUEUE_BACKEND=redis requires the 'redis' package")
+        return cls(redis_asyncio.from_url(url), **kwargs)
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix,) + parts)
+
+    async def depth(self) -> int:
+        return int(await self.client.llen(self._key("queue")))
+
+    async def enqueue(self, job: Dict[str, Any], payload: Dict[str, Any], data: Optional[bytes]) -> None:
+        job_id = job["job_id"]
+        await self.client.set(self._key("payload", job_id), json.dumps(payload), ex=self.ttl_seconds)
+        if data is not None:
+            await self.client.set(self._key("data", job_id), data, ex=self.ttl_seconds)
+        await self.save(job)
+        await self.client.lpush(self._key("queue"), job_id)
+
+    async def dequeue(self, timeout: float) -> Optional[Tuple[str, Dict[str, Any], Optional[bytes]]]:
+        item = await self.client.blmove(self._key("queue"), self._key("processing"),
+                                        max(1, int(timeout)), "RIGHT", "LEFT")
+        if item is None:
+            return None
+        job_id = item.decode() if isinstance(item, bytes) else item
+        await self.renew(job_id)
+        payload = await self.client.get(self._key("payload", job_id))
+        data = await self.client.get(self._key("data", job_id))
+        if payload is None:
+            logger.warning(f"Payload for job {job_id} expired before it was processed")
+            await self.ack(job_id)
+            return None
+        return job_id, json.loads(payload), data
+
+    async def ack(self, job_id: str) -> None:
+        """The job is finished: drop it from the processing list along with its lease and payload"""
+        await self.client.lrem(self._key("processing"), 1, job_id)
+        await self.client.delete(self._key("lease", job_id), self._key("payload", job_id), self._key("data", job_id))
+
+    async def renew(self, job_id: str) -> None:
+        """Extend the lease of a job still being processed"""
+        await self.client.set(self._key("lease", job_id), "1", ex=max(1, int(self.lease_seconds)))
+
+    async def _unleased(self) -> List[str]:
+        job_ids = [raw.decode() if isinstance(raw, bytes) else raw
+                   for raw in await self.client.lrange(self._key("processing"), 0, -1)]
+        return [job_id for job_id in job_ids if not await self.client.exists(self._key("lease", job_id))]
+
+    async def recover(self) -> int:
+        """
+        Re-queue processing jobs whose lease has lapsed; returns how many.
+        Jobs are checked twice, ``lease_grace_seconds`` apart, so a job a
+        worker has just moved but not yet leased is left alone. Jobs that
+        already reached a terminal status are only acknowledged.
+        """
+        suspects = await self._unleased()
+        if not suspects:
+            return 0
+        await asyncio.sleep(self.lease_grace_seconds)
+        expired = set(suspects) & set(await self._unleased())
+        requeued = 0
+        for job_id in expired:
+            # Another replica may be recovering the same job; only one LREM succeeds
+            if not await self.client.lrem(self._key("processing"), 1, job_id):
+                continue
+            job = await self.get(job_id)
+            if job is None or job["status"] in TERMINAL_STATUSES:
+                await self.ack(job_id)
+                continue
+            job.update(status="pending", version=job["version"] + 1, updated_at=time.time())
+            await self.save(job)
+            await self.client.rpush(self._key("queue"), job_id)  # next in line: dequeue takes from the right
+            requeued += 1
+        if requeued:
+            logger.warning(f"Re-queued {requeued} job(s) whose worker stopped renewing its lease")
+            metrics.increment("jobs_requeued_total", requeued)
+        return requeued
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self.client.get(self._key("job", job_id))
+        return json.loads(raw) if raw is not None else None
+
+    async def save(self, job: Dict[str, Any]) -> None:
+        await self.client.set(self._key("job", job["job_id"]), json.dumps(job), ex=self.ttl_seconds)
+
+    async def wait_for_update(self, job_id: str, version: int, timeout: float) -> None:
+        # Job state is polled; updates from other replicas show up within poll_seconds
+        await asyncio.sleep(min(timeout, self.poll_seconds))
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+class JobQueue:
+    """Submits jobs to a broker and runs them on a pool of worker tasks"""
+
+    def __init__(self, broker: Any, workers: int = 2, max_pending: int = 1000):
+        self.broker = broker
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        """
+        Start the worker tasks on the running event loop (no-op if already
+        running there), plus lease recovery for brokers that lease jobs
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        self._loop = loop
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+        if self.broker.lease_seconds:
+            self._tasks.append(asyncio.create_task(self._recover()))
+        logger.info(f"Job queue started with {self.workers} worker(s)")
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        if self._loop is asyncio.get_running_loop():
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop = None
+
+    async def submit(self, kind: str, payload: Dict[str, Any], data: Optional[bytes] = None) -> Dict[str, Any]:
+        """Queue a job and return its initial state; raises JobQueueFullError when the backlog is full"""
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if self.max_pending and await self.broker.depth() >= self.max_pending:
+            raise JobQueueFullError(f"More than {self.max_pending} jobs are waiting")
+        self.start()
+        now = time.time()
+        job = {
+            "job_id": str(uuid.uuid4()),
+            "kind": kind,
+            "status": "pending",
+            "version": 0,
+            "created_at": now,
+            "updated_at": now,
+            "result": None,
+            "error": None,
+        }
+        await self.broker.enqueue(job, payload, data)
+        metrics.increment("jobs_submitted_total")
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.broker.get(job_id)
+
+    async def events(self, job_id: str, heartbeat_seconds: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Yield the job state each time it changes, ending after a terminal
+        status. Yields None when nothing changed for ``heartbeat_seconds``
+        so streaming responses can send a keep-alive.
+        """
+        version = -1
+        last_sent = time.monotonic()
+        while True:
+            job = await self.broker.get(job_id)
+            if job is None:
+                return
+            if job["version"] != version:
+                version = job["version"]
+                last_sent = time.monotonic()
+                yield job
+            elif time.monotonic() - last_sent >= heartbeat_seconds:
+                last_sent = time.monotonic()
+                yield None
+            if job["status"] in TERMINAL_STATUSES:
+                return
+            await self.broker.wait_for_update(job_id, version, heartbeat_seconds)
+
+    async def _update(self, job_id: str, **fields: Any) -> None:
+        job = await self.broker.get(job_id)
+        if job is None:
+            return
+        job.update(fields, version=job["version"] + 1, updated_at=time.time())
+        await self.broker.save(job)
+
+    async def _recover(self) -> None:
+        """Re-queue jobs orphaned by crashed workers: at startup, then once per lease period"""
+        while True:
+            try:
+                await self.broker.recover()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job recovery failed: {str(e)}")
+            await asyncio.sleep(self.broker.lease_seconds)
+
+    async def _hold_lease(self, job_id: str) -> None:
+        """Renew the job's lease while its handler runs"""
+        while True:
+            await asyncio.sleep(self.broker.lease_seconds / 3)
+            try:
+                await self.broker.renew(job_id)
+            except Exception as e:
+                logger.warning(f"Could not renew the lease of job {job_id}: {str(e)}")
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            try:
+                item = await self.broker.dequeue(timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {number} could not read the queue: {str(e)}")
+                await asyncio.sleep(1.0)
+                continue
+            if item is None:
+                continue
+
+            job_id, payload, data = item
+            try:
+                await self._process(job_id, payload, data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Broker errors; an unacknowledged job is re-queued by recover() once its lease lapses
+                logger.error(f"Job worker {number} could not process job {job_id}: {str(e)}")
+
+    async def _process(self, job_id: str, payload: Dict[str, Any], data: Optional[bytes]) -> None:
+        """Run one dequeued job, record its outcome and acknowledge it"""
+        job = await self.broker.get(job_id)
+        if job is None:
+            logger.warning(f"Job {job_id} expired before it was processed")
+            await self.broker.ack(job_id)
+            return
+        kind = job["kind"]
+        await self._update(job_id, status="processing")
+        lease = asyncio.create_task(self._hold_lease(job_id)) if self.broker.lease_seconds else None
+        try:
+            result = await JOB_HANDLERS[kind](payload, data)
+        except asyncio.CancelledError:
+            # Leased jobs stay in the processing list for recover() to re-queue;
+            # in-memory jobs cannot outlive this process
+            if not self.broker.lease_seconds:
+                await self._update(job_id, status="failed", error="Service shut down before the job finished")
+            raise
+        except Exception as e:
+            # HTTPException carries its message in ``detail``
+            error = str(getattr(e, "detail", e))
+            logger.error(f"Job {job_id} ({kind}) failed: {error}")
+            await self._update(job_id, status="failed", error=error)
+            metrics.increment("jobs_failed_total")
+        else:
+            await self._update(job_id, status="completed", result=result)
+            metrics.increment("jobs_completed_total")
+        finally:
+            if lease is not None:
+                lease.cancel()
+        await self.broker.ack(job_id)
+
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """Shared job queue for the service, with the broker chosen by settings"""
+    global _job_queue
+    if _job_queue is None:
+        settings = get_settings()
+        if settings.job_queue_backend == "redis":
+            broker = RedisJobBroker.from_url(settings.redis_url, ttl_seconds=settings.job_ttl_seconds,
+                                             lease_seconds=settings.job_lease_seconds)
+        elif settings.job_queue_backend == "memory":
+            broker = InMemoryJobBroker(max_retained=settings.job_max_retained)
+        else:
+            raise ValueError(f"Unknown job queue backend: {settings.job_queue_backend}")
+        _job_queue = JobQueue(broker, workers=settings.job_workers, max_pending=settings.job_max_pending)
+    return _job_queue
+
+
+async def close_job_queue() -> None:
+    global _job_queue
+    if _job_queue is not None:
+        await _job_queue.stop()
+        await _job_queue.broker.aclose()
+        _job_queue = None
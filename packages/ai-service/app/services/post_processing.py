@@ -0,0 +1,159 @@
+"""
+Post-Processing Queue
+Work that does not shape the response (storing uploaded images, debug
+overlays) runs on a small pool of worker threads after the request has
+finished its analysis. Failed tasks are retried with exponential backoff.
+The backlog is reported through the metrics registry.
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+
+from ..config.settings import get_settings
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PostProcessingTask:
+    """One unit of deferred work: ``func(*args)``, labelled by ``kind`` in logs and metrics"""
+    kind: str
+    func: Callable[..., Any]
+    args: Tuple[Any, ...] = ()
+
+
+class PostProcessingQueue:
+    """Bounded queue drained by worker threads, retrying failed tasks"""
+
+    def __init__(self, workers: int = 2, max_pending: int = 200, max_attempts: int = 3,
+                 retry_backoff_seconds: float = 0.5):
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self._queue: "queue.Queue[Optional[PostProcessingTask]]" = queue.Queue(maxsize=max(1, max_pending))
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._active = 0
+
+    def start(self) -> None:
+        """Start the worker threads (no-op if already running)"""
+        with self._lock:
+            if self._threads:
+                return
+            self._threads = [
+                threading.Thread(target=self._worker, name=f"post-processing-{n}", daemon=True)
+                for n in range(self.workers)
+            ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, kind: str, func: Callable[..., Any], *args: Any) -> bool:
+        """Queue ``func(*args)``; returns False, queueing nothing, when the backlog is full"""
+        self.start()
+        try:
+            self._queue.put_nowait(PostProcessingTask(kind, func, args))
+        except queue.Full:
+            metrics.increment("post_processing_overflow_total")
+            return False
+        metrics.increment("post_processing_submitted_total")
+        self._report()
+        return True
+
+    def run(self, task: PostProcessingTask) -> bool:
+        """Run a task, retrying failures with exponential backoff; returns whether it succeeded"""
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                task.func(*task.args)
+                metrics.increment("post_processing_completed_total")
+                return True
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    logger.error(f"Post-processing task {task.kind} failed after {attempt} attempts: {str(e)}")
+                    metrics.increment("post_processing_failed_total")
+                    metrics.increment(f"post_processing_failed_total:{task.kind}")
+                    return False
+                logger.warning(f"Post-processing task {task.kind} failed (attempt {attempt}), retrying: {str(e)}")
+                metrics.increment("post_processing_retries_total")
+                time.sleep(self.retry_backoff_seconds * 2 ** (attempt - 1))
+        return False
+
+    def join(self) -> None:
+        """Block until every queued task has finished"""
+        self._queue.join()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Let the workers finish the queued tasks, then stop them (waiting at most ``timeout``)"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)  # after the queued tasks, so they drain first
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        if any(thread.is_alive() for thread in threads):
+            logger.warning(f"Post-processing stopped with {self._queue.qsize()} task(s) still queued")
+
+    def _worker(self) -> None:
+        while True:
+            task = self._queue.get()
+            if task is None:
+                self._queue.task_done()
+                return
+            with self._lock:
+                self._active += 1
+            self._report()
+            try:
+                self.run(task)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                self._queue.task_done()
+                self._report()
+
+    def _report(self) -> None:
+        metrics.set_gauge("post_processing_backlog", self._queue.qsize())
+        metrics.set_gauge("post_processing_active", self._active)
+
+
+_post_processing_queue: Optional[PostProcessingQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_post_processing_queue() -> PostProcessingQueue:
+    """Shared post-processing queue for the service, sized by settings"""
+    global _post_processing_queue
+    with _queue_lock:
+        if _post_processing_queue is None:
+            settings = get_settings()
+            _post_processing_queue = PostProcessingQueue(
+                workers=settings.post_processing_workers,
+                max_pending=settings.post_processing_max_pending,
+                max_attempts=settings.post_processing_max_attempts,
+                retry_backoff_seconds=settings.post_processing_retry_backoff_seconds,
+            )
+        return _post_processing_queue
+
+
+async def post_process(kind: str, func: Callable[..., Any], *args: Any) -> None:
+    """
+    Hand ``func(*args)`` to the post-processing workers. When the backlog is
+    full it runs here instead (in a thread, with the same retries), so
+    overload slows requests down rather than dropping work.
+    """
+    post_processing = get_post_processing_queue()
+    if not post_processing.submit(kind, func, *args):
+        await asyncio.to_thread(post_processing.run, PostProcessingTask(kind, func, args))
+
+
+async def close_post_processing_queue() -> None:
+    """Drain and stop the shared queue (application shutdown)"""
+    global _post_processing_queue
+    with _queue_lock:
+        post_processing, _post_processing_queue = _post_processing_queue, None
+    if post_processing is not None:
+        await asyncio.to_thread(post_processing.stop, get_settings().post_processing_drain_seconds)
@@ -0,0 +1,200 @@
+"""
+CV Process Pool
+Optional process-pool execution backend for CPU-bound CV/ML feature extraction.
+Workers are pre-warmed with OpenCV and the ML models loaded, and images are
+handed over through shared memory instead of pickled arrays.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from ..config.fidelity import ALL_DETECTORS, PREPROCESS_SIZE
+from ..config.settings import get_settings
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Services living inside a worker process (set by the pool initializer)
+_worker_cv_service = None
+_worker_ml_service = None
+_in_worker = False
+
+
+@dataclass(frozen=True)
+class SharedImageRef:
+    """Picklable handle to an image stored in a shared memory block"""
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+def _init_worker() -> None:
+    """Load OpenCV and the CV/ML services once per worker process"""
+    global _worker_cv_service, _worker_ml_service, _in_worker
+    _in_worker = True
+
+    import cv2
+    # Parallelism comes from the pool itself; avoid oversubscribing cores
+    cv2.setNumThreads(1)
+
+    from .cv_service import CVService
+    from .ml_service import MLService
+
+    _worker_cv_service = CVService()
+    _worker_ml_service = MLService()
+
+
+def _warm_up() -> int:
+    return os.getpid()
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    Attach to a block the parent owns without registering it with the
+    resource tracker, which would otherwise unlink it (or warn about a leak)
+    when this worker exits. Before Python 3.13 attaching always registers;
+    unregistering afterwards is not an option because spawned workers share
+    the parent's tracker and would drop its registration too.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _with_shared_image(ref: SharedImageRef, func: Callable[[np.ndarray], Any]) -> Any:
+    shm = _attach_shared_memory(ref.name)
+    try:
+        image = np.ndarray(ref.shape, dtype=np.dtype(ref.dtype), buffer=shm.buf)
+        result = func(image)
+        del image
+        return result
+    finally:
+        shm.close()
+
+
+def _run_task(task: Callable[..., Any], ref: SharedImageRef, *args: Any) -> Tuple[Any, Dict[str, float]]:
+    """
+    Run ``task(ref, *args)`` and return its result with the counters it
+    incremented. A worker's registry is invisible to /metrics, so the parent
+    merges them; workers run one task at a time, so resetting here is safe.
+    """
+    metrics.reset()
+    result = task(ref, *args)
+    return result, metrics.snapshot()["counters"]
+
+
+def _cv_analysis_task(ref: SharedImageRef, detectors: Tuple[str, ...], kmeans_attempts: int) -> Dict:
+    """
+    Indicators, the detector scores they computed and enhanced 512px features
+    for one image. Indicators come first so the detector cascade decides which
+    detectors run; scores it skipped are left out.
+    """
+    from ..utils.image_context import ImageAnalysisContext
+
+    def analyze(image: np.ndarray) -> Dict:
+        ctx = ImageAnalysisContext(image)
+        cv = _worker_cv_service
+        indicators = cv._detect_damage_indicators(ctx, detectors)
+        scores = {name: ctx.cached(f"score:{name}") for name in detectors}
+        result = {
+            "scores": {name: score for name, score in scores.items() if score is not None},
+            "indicators": indicators,
+            "features": cv._enhanced_features(ctx.resized(PREPROCESS_SIZE), kmeans_attempts),
+        }
+        del ctx
+        return result
+
+    return _with_shared_image(ref, analyze)
+
+
+def _ml_features_task(ref: SharedImageRef) -> np.ndarray:
+    """ML feature vector for one image"""
+    from ..utils.image_context import ImageAnalysisContext
+
+    def extract(image: np.ndarray) -> np.ndarray:
+        ctx = ImageAnalysisContext(image)
+        features = _worker_ml_service._extract_ml_features(ctx)
+        del ctx
+        return features
+
+    return _with_shared_image(ref, extract)
+
+
+class ProcessPoolBackend:
+    """Warm process pool that runs CV/ML feature extraction off the GIL"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+
+    def warm_up(self) -> None:
+        """Start every worker and run its initializer before the first request"""
+        futures = [self._executor.submit(_warm_up) for _ in range(self.max_workers)]
+        wait(futures)
+        pids = {future.result() for future in futures}
+        logger.info(f"CV process pool ready with {len(pids)} warm worker(s)")
+
+    async def run(self, task: Callable[..., Any], image: np.ndarray, *args: Any) -> Any:
+        """Copy ``image`` into shared memory and run ``task(ref, *args)`` on it in a worker"""
+        image = np.ascontiguousarray(image)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, image.nbytes))
+        try:
+            np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)[...] = image
+            ref = SharedImageRef(shm.name, tuple(image.shape), image.dtype.str)
+            result, counters = await asyncio.wrap_future(self._executor.submit(_run_task, task, ref, *args))
+            for name, value in counters.items():
+                metrics.increment(name, value)
+            return result
+        finally:
+            shm.close()
+            shm.unlink()
+
+    async def analyze_cv(self, image: np.ndarray, detectors: Tuple[str, ...] = ALL_DETECTORS,
+                         kmeans_attempts: int = 10) -> Dict:
+        return await self.run(_cv_analysis_task, image, tuple(detectors), kmeans_attempts)
+
+    async def extract_ml_features(self, image: np.ndarray) -> np.ndarray:
+        return await self.run(_ml_features_task, image)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+_backend: Optional[ProcessPoolBackend] = None
+
+
+def process_backend_enabled() -> bool:
+    """True when CV/ML work should be dispatched to the process pool"""
+    return get_settings().cv_execution_backend == "process" and not _in_worker
+
+
+def get_process_backend() -> ProcessPoolBackend:
+    """Shared process pool, created on first use"""
+    global _backend
+    if _backend is None:
+        _backend = ProcessPoolBackend(get_settings().cv_process_workers or None)
+    return _backend
+
+
+def shutdown_process_backend() -> None:
+    global _backend
+    if _backend is not None:
+        _backend.shutdown()
+        _backend = None
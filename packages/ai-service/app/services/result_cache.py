@@ -0,0 +1,114 @@
+"""
+Analysis Result Cache
+In-process cache of image analysis results keyed by content hash (exact
+re-submissions) with a perceptual-hash fallback for resized or recompressed
+copies of the same photo. Entries are evicted LRU and expire after a TTL.
+"""
+import copy
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from ..config.settings import get_settings
+from ..utils.image_hash import hamming_distance
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    content_hash: str
+    perceptual_hash: Optional[int]
+    variant: str
+    value: Any
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class AnalysisResultCache:
+    """Thread-safe LRU/TTL cache of analysis results"""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600.0, max_distance: int = 6):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self.max_distance = max_distance
+        self._entries: "OrderedDict[Tuple[str, str], CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Counter = Counter()
+
+    def _expired(self, entry: CacheEntry, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - entry.created_at > self.ttl_seconds
+
+    def _hit(self, key: Tuple[str, str], entry: CacheEntry, match: str, distance: int) -> Tuple[Any, Dict]:
+        self._entries.move_to_end(key)
+        self.stats[f"{match}_hits"] += 1
+        info = {"hit": True, "match": match, "distance": distance,
+                "age_seconds": round(time.monotonic() - entry.created_at, 3)}
+        return copy.deepcopy(entry.value), info
+
+    def get_exact(self, content_hash: str, variant: str = "") -> Optional[Tuple[Any, Dict]]:
+        """Cached value for identical image bytes, with hit metadata"""
+        key = (content_hash, variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry, time.monotonic()):
+                del self._entries[key]
+                return None
+            return self._hit(key, entry, "exact", 0)
+
+    def get_similar(self, perceptual_hash: int, variant: str = "") -> Optional[Tuple[Any, Dict]]:
+        """Cached value for the closest perceptually similar image within ``max_distance`` bits"""
+        now = time.monotonic()
+        with self._lock:
+            best_key, best_distance = None, self.max_distance + 1
+            for key, entry in list(self._entries.items()):
+                if self._expired(entry, now):
+                    del self._entries[key]
+                    continue
+                if entry.variant != variant or entry.perceptual_hash is None:
+                    continue
+                distance = hamming_distance(entry.perceptual_hash, perceptual_hash)
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+            if best_key is None:
+                self.stats["misses"] += 1
+                return None
+            return self._hit(best_key, self._entries[best_key], "near", best_distance)
+
+    def put(self, content_hash: str, perceptual_hash: Optional[int], value: Any, variant: str = "") -> None:
+        key = (content_hash, variant)
+        with self._lock:
+            self._entries[key] = CacheEntry(content_hash, perceptual_hash, variant, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_cache: Optional[AnalysisResultCache] = None
+
+
+def get_result_cache() -> Optional[AnalysisResultCache]:
+    """Shared result cache, or None when caching is disabled"""
+    global _cache
+    settings = get_settings()
+    if not settings.result_cache_enabled:
+        return None
+    if _cache is None:
+        _cache = AnalysisResultCache(
+            max_entries=settings.result_cache_max_entries,
+            ttl_seconds=settings.result_cache_ttl_seconds,
+            max_distance=settings.result_cache_max_hash_distance,
+        )
+    return _cache
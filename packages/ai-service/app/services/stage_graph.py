@@ -0,0 +1,111 @@
+"""
+Stage Graph
+Declarative async pipeline: each stage names the stages whose results it
+needs, and runs as soon as those are ready, concurrently with every other
+ready stage. The request-level counterpart of the DetectorScheduler.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PipelineStage:
+    """
+    A pipeline step: ``run(request, **inputs)`` where ``inputs`` are the
+    results of ``depends_on`` keyed by stage name
+    """
+    name: str
+    run: Callable[..., Awaitable[Any]]
+    depends_on: Tuple[str, ...] = ()
+
+
+class StageGraph:
+    """Runs pipeline stages once all of their inputs are ready, recording per-stage timings"""
+
+    def __init__(self, stages: Sequence[PipelineStage]):
+        self.stages: Dict[str, PipelineStage] = {stage.name: stage for stage in stages}
+        for stage in stages:
+            missing = [dep for dep in stage.depends_on if dep not in self.stages]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {missing}")
+        self.resolve(self.stages)  # rejects cycles up front
+
+    def resolve(self, targets: Iterable[str], provided: Iterable[str] = ()) -> List[str]:
+        """Targets plus their transitive inputs, in dependency order, minus already-provided results"""
+        order: List[str] = []
+        provided = set(provided)
+        visiting = set()
+
+        def visit(name: str) -> None:
+            if name in order or name in provided:
+                return
+            if name not in self.stages:
+                raise ValueError(f"Unknown pipeline stage '{name}'")
+            if name in visiting:
+                raise ValueError(f"Dependency cycle at pipeline stage '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].depends_on:
+                visit(dep)
+            visiting.discard(name)
+            order.append(name)
+
+        for target in targets:
+            visit(target)
+        return order
+
+    async def run(self, request: Any, targets: Sequence[str],
+                  provided: Optional[Dict[str, Any]] = None,
+                  on_result: Optional[Callable[[str, Any], None]] = None,
+                  ) -> Tuple[Dict[str, Any], Dict[str, Dict[str, float]]]:
+        """
+        Compute ``targets`` (and what they depend on) for ``request``. Results
+        in ``provided`` are used as-is instead of running those stages, and
+        ``on_result(name, result)`` is called as each stage finishes. Returns
+        every stage result by name, and timings with each stage's start
+        offset and duration in milliseconds. The first stage error cancels
+        the stages still running and is re-raised.
+        """
+        results: Dict[str, Any] = dict(provided or {})
+        order = self.resolve(targets, results)
+        pending = {name: set(self.stages[name].depends_on) - set(results) for name in order}
+        running: Dict[asyncio.Task, str] = {}
+        timings: Dict[str, Dict[str, float]] = {}
+        started = time.perf_counter()
+
+        async def timed(stage: PipelineStage) -> Any:
+            stage_started = time.perf_counter()
+            try:
+                return await stage.run(request, **{dep: results[dep] for dep in stage.depends_on})
+            finally:
+                timings[stage.name] = {
+                    "start_ms": round((stage_started - started) * 1000, 1),
+                    "duration_ms": round((time.perf_counter() - stage_started) * 1000, 1),
+                }
+
+        try:
+            while pending or running:
+                ready = [name for name, deps in pending.items() if not deps]
+                for name in ready:
+                    del pending[name]
+                    running[asyncio.create_task(timed(self.stages[name]))] = name
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = running.pop(task)
+                    results[name] = task.result()
+                    if on_result is not None:
+                        on_result(name, results[name])
+                    for deps in pending.values():
+                        deps.discard(name)
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        return results, timings
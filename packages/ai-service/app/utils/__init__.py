@@ -3,6 +3,7 @@ from .image_processing import ImageProcessor
 from .data_preprocessing import DataPreprocessor
 from .validators import FileValidator, DataValidator
 from .image_io import decode_image_bytes  # re-export here for convenience
+from .image_context import ImageAnalysisContext
 
 __all__ = [
     "ImageProcessor",
@@ -10,4 +11,5 @@ __all__ = [
     "FileValidator",
     "DataValidator",
     "decode_image_bytes",
+    "ImageAnalysisContext",
 ]
@@ -0,0 +1,75 @@
+"""
+HSV Color Range Classifier
+Compiles a set of HSV boxes (``cv2.inRange``-style lower/upper bounds) once
+and labels every pixel with a bitmask of the ranges it falls in. The label
+plane gives both the anomaly pixel count and per-range masks, so detectors
+and the debug overlay share one result instead of allocating a mask per range.
+
+A per-channel ``cv2.LUT`` formulation was measured at about twice the cost
+of the SIMD ``inRange`` kernel on 3-channel images, so each range is tested
+with ``inRange`` into a single reused scratch buffer and OR-ed into the labels.
+"""
+from itertools import combinations
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+MAX_RANGES = 8  # one bit per range in a uint8 label
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.int64)
+
+HSVRange = Tuple[Sequence[int], Sequence[int]]
+
+
+class HSVRangeClassifier:
+    """Labels pixels against up to eight inclusive HSV ranges in one label plane"""
+
+    def __init__(self, ranges: Mapping[str, HSVRange]):
+        if not ranges:
+            raise ValueError("At least one HSV range is required")
+        if len(ranges) > MAX_RANGES:
+            raise ValueError(f"At most {MAX_RANGES} HSV ranges are supported, got {len(ranges)}")
+
+        self.labels: List[str] = list(ranges)
+        self.bounds: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for name, (lower, upper) in ranges.items():
+            lower = np.asarray(lower, dtype=np.int64)
+            upper = np.asarray(upper, dtype=np.int64)
+            if lower.shape != (3,) or upper.shape != (3,):
+                raise ValueError(f"HSV range '{name}' needs 3-element lower and upper bounds")
+            self.bounds[name] = (lower, upper)
+        self._compiled = [
+            (lower, upper, 1 << bit) for bit, (lower, upper) in enumerate(self.bounds.values())
+        ]
+        # Disjoint boxes never set two bits on one pixel, so a plain non-zero count is exact
+        self.overlapping = any(
+            np.all(np.maximum(a[0], b[0]) <= np.minimum(a[1], b[1]))
+            for a, b in combinations(self.bounds.values(), 2)
+        )
+
+    def bit(self, name: str) -> int:
+        return 1 << self.labels.index(name)
+
+    def classify(self, hsv: np.ndarray) -> np.ndarray:
+        """uint8 label image: bit i is set where the pixel lies in range i"""
+        labels = np.zeros(hsv.shape[:2], dtype=np.uint8)
+        scratch = np.empty_like(labels)
+        for lower, upper, bit in self._compiled:
+            cv2.inRange(hsv, lower, upper, dst=scratch)
+            cv2.bitwise_and(scratch, bit, dst=scratch)
+            cv2.bitwise_or(labels, scratch, dst=labels)
+        return labels
+
+    def count(self, labels: np.ndarray) -> int:
+        """
+        Total in-range pixels summed over ranges, i.e. what adding up one
+        ``inRange`` mask per range would give (overlaps counted per range)
+        """
+        if not self.overlapping:
+            return int(cv2.countNonZero(labels))
+        histogram = np.bincount(labels.ravel(), minlength=256)
+        return int(histogram @ _POPCOUNT)
+
+    def mask(self, labels: np.ndarray, name: str) -> np.ndarray:
+        """Boolean mask for one named range"""
+        return (labels & self.bit(name)) > 0
@@ -0,0 +1,107 @@
+"""
+Color Features
+Dominant color extraction: full k-means (reference), k-means on a fixed-seed
+pixel subsample, and weighted k-means over a quantized 3D color histogram
+"""
+from itertools import permutations
+from typing import Sequence
+
+import cv2
+import numpy as np
+
+DOMINANT_COLOR_METHODS = ("kmeans", "subsample", "histogram")
+HISTOGRAM_BITS = 4            # 16 levels per channel -> 4096 color bins
+SUBSAMPLE_SIZE = 8192
+SUBSAMPLE_SEED = 0
+
+
+def kmeans_dominant_colors(image: np.ndarray, k: int = 3, attempts: int = 10) -> np.ndarray:
+    """k cluster centers (BGR, float32) from k-means over every pixel"""
+    data = image.reshape((-1, 3)).astype(np.float32)
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
+    _, _, centers = cv2.kmeans(data, k, None, criteria, attempts, cv2.KMEANS_RANDOM_CENTERS)
+    return centers
+
+
+def subsample_dominant_colors(image: np.ndarray, k: int = 3, attempts: int = 3,
+                              sample_size: int = SUBSAMPLE_SIZE) -> np.ndarray:
+    """k-means on a reproducible random subsample of pixels"""
+    pixels = image.reshape((-1, 3))
+    if len(pixels) > sample_size:
+        rng = np.random.default_rng(SUBSAMPLE_SEED)
+        pixels = pixels[rng.choice(len(pixels), sample_size, replace=False)]
+    # cv2.kmeans draws its random centers from OpenCV's global RNG
+    cv2.setRNGSeed(SUBSAMPLE_SEED)
+    return kmeans_dominant_colors(pixels, k, attempts)
+
+
+def histogram_dominant_colors(image: np.ndarray, k: int = 3, bits: int = HISTOGRAM_BITS,
+                              iterations: int = 10) -> np.ndarray:
+    """
+    Weighted k-means over the occupied bins of a quantized 3D color histogram.
+    Each bin is represented by the mean color of its pixels and weighted by
+    its pixel count, so the cost depends on the number of distinct colors
+    (at most 2**(3*bits)), not on the image size. Deterministic.
+    """
+    pixels = image.reshape((-1, 3))
+    shift = 8 - bits
+    q = (pixels >> shift).astype(np.int32)
+    bins = (q[:, 0] << (2 * bits)) | (q[:, 1] << bits) | q[:, 2]
+    n_bins = 1 << (3 * bits)
+
+    counts = np.bincount(bins, minlength=n_bins)
+    occupied = np.flatnonzero(counts)
+    weights = counts[occupied].astype(np.float64)
+    sums = np.stack(
+        [np.bincount(bins, weights=pixels[:, c], minlength=n_bins)[occupied] for c in range(3)], axis=1
+    )
+    colors = sums / weights[:, None]
+
+    if len(colors) <= k:
+        centers = np.zeros((k, 3))
+        centers[:len(colors)] = colors
+        return centers.astype(np.float32)
+
+    # Deterministic k-means++ style seeding: heaviest bin, then the bin with
+    # the largest weighted distance to the centers chosen so far
+    centers = [colors[np.argmax(weights)]]
+    for _ in range(1, k):
+        d2 = np.min([np.sum((colors - c) ** 2, axis=1) for c in centers], axis=0)
+        centers.append(colors[np.argmax(d2 * weights)])
+    centers = np.array(centers)
+
+    for _ in range(iterations):
+        d2 = ((colors[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        labels = np.argmin(d2, axis=1)
+        mass = np.bincount(labels, weights=weights, minlength=k)
+        updated = np.stack(
+            [np.bincount(labels, weights=weights * colors[:, c], minlength=k) for c in range(3)], axis=1
+        )
+        updated = np.where(mass[:, None] > 0, updated / np.maximum(mass, 1e-12)[:, None], centers)
+        if np.allclose(updated, centers, atol=0.5):
+            centers = updated
+            break
+        centers = updated
+
+    return centers.astype(np.float32)
+
+
+def dominant_colors(image: np.ndarray, method: str = "kmeans", k: int = 3, attempts: int = 10) -> np.ndarray:
+    """Dominant BGR colors of ``image`` using one of DOMINANT_COLOR_METHODS"""
+    if method == "kmeans":
+        return kmeans_dominant_colors(image, k, attempts)
+    if method == "subsample":
+        return subsample_dominant_colors(image, k, attempts)
+    if method == "histogram":
+        return histogram_dominant_colors(image, k)
+    raise ValueError(f"Unknown dominant color method '{method}'. Supported: {DOMINANT_COLOR_METHODS}")
+
+
+def palette_distance(a: Sequence[Sequence[float]], b: Sequence[Sequence[float]]) -> float:
+    """Mean BGR distance between two palettes under the best one-to-one matching"""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    return min(
+        float(np.mean(np.linalg.norm(a - b[list(order)], axis=1)))
+        for order in permutations(range(len(b)))
+    )
@@ -0,0 +1,184 @@
+"""
+Image Analysis Context
+Decode-once container that carries an image (and its resized variants)
+through every CV and ML stage of a single analysis request, with a lazy
+per-image cache of derived planes and detector scores
+"""
+import functools
+import logging
+import os
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from .image_io import ImageTooLargeError, load_image
+
+logger = logging.getLogger(__name__)
+
+
+class ImageAnalysisContext:
+    """Decoded BGR image shared by all analysis stages of one request"""
+
+    def __init__(self, image: np.ndarray, source_path: Optional[str] = None):
+        if image is None or not isinstance(image, np.ndarray) or image.size == 0:
+            raise ValueError("ImageAnalysisContext requires a non-empty image array")
+        self.image = image
+        self.source_path = source_path
+        # (width, height) before any decode-time reduction
+        self.source_dimensions: Tuple[int, int] = (int(image.shape[1]), int(image.shape[0]))
+        self._cache: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self.cache_hits: Counter = Counter()
+        self.cache_misses: Counter = Counter()
+
+    @classmethod
+    def from_path(cls, image_path: str, max_pixels: Optional[int] = None,
+                  max_decode_pixels: Optional[int] = None,
+                  min_size: Optional[Tuple[int, int]] = None) -> "ImageAnalysisContext":
+        """
+        Decode an image from disk once, within the pixel budget and at the
+        smallest JPEG decode scale covering ``min_size`` (see
+        ``image_io.load_image``; limits default to the settings)
+        """
+        if not os.path.exists(image_path):
+            abs_path = os.path.abspath(image_path)
+            logger.error(f"Image not found at {image_path} (absolute: {abs_path}, cwd: {os.getcwd()})")
+            raise FileNotFoundError(f"Image not found at {image_path} (absolute: {abs_path}, cwd: {os.getcwd()})")
+
+        try:
+            image, _, source_dimensions = load_image(image_path, max_pixels, max_decode_pixels, min_size)
+        except ImageTooLargeError:
+            raise
+        except ValueError as e:
+            abs_path = os.path.abspath(image_path)
+            logger.error(f"Failed to load image at {image_path} (absolute: {abs_path}): {e}")
+            raise ValueError(f"Could not load image from {image_path} (absolute: {abs_path})")
+        ctx = cls(image, source_path=image_path)
+        ctx.source_dimensions = source_dimensions
+        return ctx
+
+    @classmethod
+    def from_bytes(cls, data: bytes, max_pixels: Optional[int] = None,
+                   max_decode_pixels: Optional[int] = None,
+                   min_size: Optional[Tuple[int, int]] = None,
+                   source_path: Optional[str] = None) -> "ImageAnalysisContext":
+        """Decode in-memory image bytes once, with the same budget rules as ``from_path``"""
+        image, _, source_dimensions = load_image(data, max_pixels, max_decode_pixels, min_size)
+        ctx = cls(image, source_path=source_path)
+        ctx.source_dimensions = source_dimensions
+        return ctx
+
+    @property
+    def height(self) -> int:
+        return int(self.image.shape[0])
+
+    @property
+    def width(self) -> int:
+        return int(self.image.shape[1])
+
+    @property
+    def dimensions(self) -> Tuple[int, int]:
+        """(width, height) of the decoded image"""
+        return self.width, self.height
+
+    def resized(self, size: Tuple[int, int]) -> "ImageAnalysisContext":
+        """Context for the image resized to ``size`` (width, height), computed once per size"""
+        size = (int(size[0]), int(size[1]))
+        if size == self.dimensions:
+            return self
+        return self.memoize(
+            f"resized:{size[0]}x{size[1]}",
+            lambda: ImageAnalysisContext(cv2.resize(self.image, size), source_path=self.source_path),
+        )
+
+    def fit_within(self, max_dimension: Optional[int]) -> "ImageAnalysisContext":
+        """
+        Context downscaled (aspect preserved) so its longest side is at most
+        ``max_dimension``; returns self when no downscale is needed.
+        """
+        if not max_dimension or max(self.dimensions) <= max_dimension:
+            return self
+        scale = max_dimension / float(max(self.dimensions))
+        size = (max(1, round(self.width * scale)), max(1, round(self.height * scale)))
+        return self.memoize(
+            f"fit:{max_dimension}",
+            lambda: ImageAnalysisContext(
+                cv2.resize(self.image, size, interpolation=cv2.INTER_AREA),
+                source_path=self.source_path,
+            ),
+        )
+
+    # -------- lazy derived planes --------
+
+    def memoize(self, key: str, compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for ``key``, computing it at most once.
+        Concurrent callers of the same key wait for the first computation.
+        """
+        with self._lock:
+            if key in self._cache:
+                self.cache_hits[key] += 1
+                return self._cache[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._cache:
+                    self.cache_hits[key] += 1
+                    return self._cache[key]
+            value = compute()
+            with self._lock:
+                self._cache[key] = value
+                self.cache_misses[key] += 1
+            return value
+
+    def seed(self, key: str, value: Any) -> None:
+        """Store a value computed elsewhere (e.g. in a worker process) unless already cached"""
+        with self._lock:
+            self._cache.setdefault(key, value)
+
+    def cached(self, key: str) -> Optional[Any]:
+        """The value cached for ``key`` without computing it, or None"""
+        with self._lock:
+            return self._cache.get(key)
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Hit/miss counters per cached key"""
+        with self._lock:
+            return {"hits": dict(self.cache_hits), "misses": dict(self.cache_misses)}
+
+    @property
+    def gray(self) -> np.ndarray:
+        return self.memoize("gray", lambda: cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def hsv(self) -> np.ndarray:
+        return self.memoize("hsv", lambda: cv2.cvtColor(self.image, cv2.COLOR_BGR2HSV))
+
+
+def as_image_context(image: Union[str, np.ndarray, ImageAnalysisContext]) -> ImageAnalysisContext:
+    """Normalize a path, ndarray or existing context into an ImageAnalysisContext"""
+    if isinstance(image, ImageAnalysisContext):
+        return image
+    if isinstance(image, str):
+        return ImageAnalysisContext.from_path(image)
+    return ImageAnalysisContext(image)
+
+
+def context_cached(key: str):
+    """
+    Decorator for service methods whose first argument is an image: the
+    argument is normalized to an ImageAnalysisContext and the result is
+    memoized on it under ``key``.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, image, *args, **kwargs):
+            ctx = as_image_context(image)
+            return ctx.memoize(key, lambda: method(self, ctx, *args, **kwargs))
+        return wrapper
+    return decorator
@@ -0,0 +1,78 @@
+"""
+Image Derivatives
+Small renditions of a stored image (a thumbnail and a preview, each as JPEG
+and WebP) so mobile clients and dashboards never download the original.
+They are rendered once, from the image the analysis already decoded, and
+written next to the original as ``<stem>_<name>.<ext>``.
+"""
+import os
+from typing import Dict, List, Optional, Tuple, Union
+
+import cv2
+
+from .image_context import ImageAnalysisContext
+
+# format -> (file extension, media type, OpenCV quality flag)
+DERIVATIVE_FORMATS: Dict[str, Tuple[str, str, int]] = {
+    "jpeg": ("jpg", "image/jpeg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": ("webp", "image/webp", cv2.IMWRITE_WEBP_QUALITY),
+}
+
+
+def derivative_path(original_path: str, name: str, image_format: str) -> str:
+    """Where the ``name`` derivative of a stored image lives, e.g. ``uploads/<id>_thumbnail.webp``"""
+    stem, _ = os.path.splitext(original_path)
+    return f"{stem}_{name}.{DERIVATIVE_FORMATS[image_format][0]}"
+
+
+def derivative_source(image: ImageAnalysisContext, sizes: Dict[str, int]) -> Optional[ImageAnalysisContext]:
+    """
+    The decoded image reduced to the largest derivative size, or None when it
+    was decoded too small to render that size (reduced decodes of the fast
+    tier); the caller then renders from the original instead
+    """
+    largest = max(sizes.values())
+    if max(image.dimensions) < min(largest, max(image.source_dimensions)):
+        return None
+    return image.fit_within(largest)
+
+
+def render_derivatives(image: ImageAnalysisContext, sizes: Dict[str, int],
+                       quality: int) -> Dict[Tuple[str, str], bytes]:
+    """Encoded derivatives keyed by (name, format); each fits within its size (longest side)"""
+    rendered = {}
+    for name, max_dimension in sizes.items():
+        pixels = image.fit_within(max_dimension).image
+        for image_format, (extension, _, quality_flag) in DERIVATIVE_FORMATS.items():
+            ok, encoded = cv2.imencode(f".{extension}", pixels, [quality_flag, quality])
+            if not ok:
+                raise ValueError(f"Could not encode {name} as {image_format}")
+            rendered[(name, image_format)] = encoded.tobytes()
+    return rendered
+
+
+def write_derivatives(source: Union[ImageAnalysisContext, bytes, str], original_path: str,
+                      sizes: Dict[str, int], quality: int) -> List[str]:
+    """
+    Render and store every derivative of ``original_path`` from a decoded
+    image, or from the original's bytes or path (decoded just large enough).
+    Files are replaced atomically, so readers never see a partial image.
+    Returns the written paths.
+    """
+    if not isinstance(source, ImageAnalysisContext):
+        min_size = (max(sizes.values()), 0)
+        if isinstance(source, str):
+            source = ImageAnalysisContext.from_path(source, min_size=min_size)
+        else:
+            source = ImageAnalysisContext.from_bytes(source, min_size=min_size)
+
+    written = []
+    for (name, image_format), data in render_derivatives(source, sizes, quality).items():
+        path = derivative_path(original_path, name, image_format)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        partial = f"{path}.partial"
+        with open(partial, "wb") as f:
+            f.write(data)
+        os.replace(partial, path)
+        written.append(path)
+    return written
@@ -0,0 +1,42 @@
+"""
+Image Hashing
+Content hashes (exact match) and perceptual hashes (near-duplicate match)
+for uploaded and downloaded images
+"""
+import hashlib
+
+import cv2
+import numpy as np
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file's bytes, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def bytes_sha256(data: bytes) -> str:
+    """SHA-256 of in-memory image bytes (same digest as ``file_sha256`` of the stored file)"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def difference_hash(image: np.ndarray, hash_size: int = 8) -> int:
+    """
+    64-bit difference hash (dHash) of a BGR or grayscale image. Robust to
+    resizing and recompression: it only encodes whether each cell of a tiny
+    grayscale thumbnail is brighter than its right-hand neighbour.
+    """
+    small = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
@@ -1,150 +1,280 @@
 # app/utils/image_io.py
 import io
+import math
 import os
-import uuid
-from typing import Tuple
+import zipfile
+from typing import BinaryIO, Iterable, Iterator, Optional, Tuple, Union
 import numpy as np
-from PIL import Image
+from PIL import ExifTags, Image, ImageOps
 import cv2
-import requests
 from urllib.parse import urlparse
 
+from ..config.settings import get_settings
 
-def decode_image_bytes(data: bytes) -> Tuple[np.ndarray, str]:
+
+def megapixels_to_pixels(megapixels: Optional[float]) -> Optional[int]:
+    """Pixel count for a megapixel setting; None when the limit is disabled (0 or unset)"""
+    if not megapixels or megapixels <= 0:
+        return None
+    return int(megapixels * 1_000_000)
+
+
+def fit_pixel_budget(width: int, height: int, max_pixels: Optional[int]) -> Tuple[int, int]:
+    """Largest aspect-preserving (width, height) with at most ``max_pixels`` pixels"""
+    if not max_pixels or width * height <= max_pixels:
+        return width, height
+    scale = math.sqrt(max_pixels / float(width * height))
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+# Formats with reduced-size decoding (libjpeg DCT scaling) and the scales it offers
+REDUCED_DECODE_FORMATS = ("JPEG",)
+REDUCED_DECODE_SCALES = (8, 4, 2)
+_CV2_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+class ImageTooLargeError(ValueError):
+    """Image exceeds the decode pixel limit (decompression bomb protection)"""
+
+
+def check_decode_limit(width: int, height: int, max_decode_pixels: Optional[int]) -> None:
+    """Reject images whose header claims more pixels than we are willing to decode"""
+    if max_decode_pixels and width * height > max_decode_pixels:
+        raise ImageTooLargeError(
+            f"Image is {width}x{height} ({width * height / 1e6:.1f} MP), above the "
+            f"{max_decode_pixels / 1e6:.1f} MP decode limit"
+        )
+
+
+def _resolve_limits(max_pixels: Optional[int], max_decode_pixels: Optional[int]) -> Tuple[Optional[int], Optional[int]]:
+    """Fill unspecified limits from settings; 0 disables a limit explicitly"""
+    settings = get_settings()
+    if max_pixels is None:
+        max_pixels = megapixels_to_pixels(settings.max_image_megapixels)
+    if max_decode_pixels is None:
+        max_decode_pixels = megapixels_to_pixels(settings.max_decode_megapixels)
+    return max_pixels or None, max_decode_pixels or None
+
+
+def _resize_to(image: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+    """Downscale to ``size``; area averaging only matters from a 2x reduction up"""
+    if (image.shape[1], image.shape[0]) == size:
+        return image
+    factor = image.shape[1] / float(size[0])
+    interpolation = cv2.INTER_AREA if factor >= 2 else cv2.INTER_LINEAR
+    return cv2.resize(image, size, interpolation=interpolation)
+
+
+def _open(source: Union[str, bytes]) -> Image.Image:
+    """Lazily open a path or raw bytes with PIL (reads the header only)"""
+    return Image.open(io.BytesIO(source) if isinstance(source, (bytes, bytearray, memoryview)) else source)
+
+
+def _oriented_size(im: Image.Image) -> Tuple[Tuple[int, int], int]:
+    """(width, height) after applying the EXIF orientation, and the orientation tag"""
+    orientation = im.getexif().get(ExifTags.Base.Orientation, 1)
+    if orientation in (5, 6, 7, 8):  # rotated by 90 degrees
+        return (im.size[1], im.size[0]), orientation
+    return im.size, orientation
+
+
+def decode_scale(width: int, height: int, max_pixels: Optional[int] = None,
+                 min_size: Optional[Tuple[int, int]] = None) -> int:
     """
-    Decode raw image bytes to an OpenCV BGR ndarray and return the detected
-    PIL format string (e.g., 'PNG', 'JPEG', 'WEBP'). Raises ValueError on failure.
+    Largest reduced-decode denominator (8, 4, 2, else 1) whose output still
+    covers what is needed: the pixel-budget size, or ``min_size`` (longest
+    side, shortest side) when that is smaller.
+    """
+    need = fit_pixel_budget(width, height, max_pixels)
+    need_long, need_short = max(need), min(need)
+    if min_size is not None:
+        need_long, need_short = min(need_long, min_size[0]), min(need_short, min_size[1])
+    for scale in REDUCED_DECODE_SCALES:
+        # libjpeg rounds scaled dimensions up
+        scaled_w, scaled_h = -(-width // scale), -(-height // scale)
+        if max(scaled_w, scaled_h) >= need_long and min(scaled_w, scaled_h) >= need_short:
+            return scale
+    return 1
+
+
+def _decode_pil(im: Image.Image, scale: int = 1) -> np.ndarray:
+    """Decode an opened PIL image to an upright BGR array, at 1/scale size where the format allows"""
+    if scale > 1:
+        im.draft("RGB", (-(-im.size[0] // scale), -(-im.size[1] // scale)))
+    # Match cv2.imread, which applies the EXIF orientation
+    if im.getexif().get(ExifTags.Base.Orientation, 1) != 1:
+        im = ImageOps.exif_transpose(im)
+    # Normalize color space for OpenCV
+    if im.mode not in ("RGB", "RGBA"):
+        im = im.convert("RGB")
+    arr = np.array(im)
+    if arr.shape[2] == 4:  # drop alpha
+        arr = arr[:, :, :3]
+    return cv2.cvtColor(arr, cv2.COLOR_RGB2BGR)
+
+
+def _decode_cv2(source: Union[str, bytes], scale: int = 1) -> Optional[np.ndarray]:
+    flags = _CV2_REDUCED_FLAGS[scale]
+    if isinstance(source, str):
+        return cv2.imread(source, flags)
+    return cv2.imdecode(np.frombuffer(source, dtype=np.uint8), flags)
+
+
+def _fit_budget(image: np.ndarray, original: Tuple[int, int], max_pixels: Optional[int]) -> np.ndarray:
+    """Resize a (possibly reduced) decode down to the budget size if it is still larger"""
+    target = fit_pixel_budget(*original, max_pixels)
+    if image.shape[0] * image.shape[1] <= target[0] * target[1]:
+        return image
+    return _resize_to(image, target)
+
+
+def load_image(source: Union[str, bytes], max_pixels: Optional[int] = None,
+               max_decode_pixels: Optional[int] = None,
+               min_size: Optional[Tuple[int, int]] = None) -> Tuple[np.ndarray, str, Tuple[int, int]]:
     """
-    # Try PIL first (handles more formats than some OpenCV builds)
+    Decode an image file path or raw bytes to an OpenCV BGR ndarray within the
+    pixel budget. Returns (image, PIL format string, original (width, height)).
+
+    The header is read first: images above ``max_decode_pixels`` are rejected
+    before any pixel data is decoded. JPEGs are decoded at the smallest
+    1/2, 1/4 or 1/8 scale that still covers the budget size, or ``min_size``
+    (longest side, shortest side the enabled stages need) when that is
+    smaller, using OpenCV IMREAD_REDUCED_* with PIL draft mode as fallback.
+    Other formats have no reduced decoding and are resized after the decode.
+    Limits default to the MAX_IMAGE_MEGAPIXELS / MAX_DECODE_MEGAPIXELS
+    settings. Raises ValueError on failure (ImageTooLargeError above the
+    decode limit).
+    """
+    max_pixels, max_decode_pixels = _resolve_limits(max_pixels, max_decode_pixels)
+
+    fmt = None
     try:
-        with Image.open(io.BytesIO(data)) as im:
+        with _open(source) as im:
             fmt = (im.format or "").upper()
-            # Normalize color space for OpenCV
-            if im.mode not in ("RGB", "RGBA"):
-                im = im.convert("RGB")
-            arr = np.array(im)
-            if arr.ndim == 2:
-                arr = np.stack([arr] * 3, axis=-1)
-            if arr.shape[2] == 4:  # drop alpha
-                arr = arr[:, :, :3]
-            bgr = cv2.cvtColor(arr, cv2.COLOR_RGB2BGR)
-            return bgr, fmt
+            check_decode_limit(*im.size, max_decode_pixels)
+            if fmt in REDUCED_DECODE_FORMATS:
+                original, _ = _oriented_size(im)
+                scale = decode_scale(*original, max_pixels, min_size)
+                image = _decode_cv2(source, scale)
+                if image is None:
+                    image = _decode_pil(im, scale)
+                return _fit_budget(image, original, max_pixels), fmt, original
+    except ImageTooLargeError:
+        raise
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(str(e))
     except Exception:
-        pass
+        pass  # unreadable header or failed decode; let OpenCV try the whole file
 
-    # Fallback to OpenCV imdecode
-    nparr = np.frombuffer(data, dtype=np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    if img is None:
+    # OpenCV decodes PNG/TIFF/BMP faster than PIL and applies the EXIF orientation
+    image = _decode_cv2(source)
+    if image is None and fmt:
+        # A format PIL understands but this OpenCV build does not
+        try:
+            with _open(source) as im:
+                image = _decode_pil(im)
+        except Exception:
+            image = None
+    if image is None:
         raise ValueError("Not a valid image or unsupported/corrupt format.")
-    return img, "UNKNOWN"
 
+    original = (image.shape[1], image.shape[0])
+    # Only enforced here when PIL could not read the header; OpenCV caps decodes at CV_IO_MAX_IMAGE_PIXELS
+    check_decode_limit(*original, max_decode_pixels)
+    return _fit_budget(image, original, max_pixels), fmt or "UNKNOWN", original
 
-def download_and_normalize_image(file_url: str, upload_directory: str) -> str:
+
+def decode_image_bytes(data: bytes, max_pixels: Optional[int] = None,
+                       max_decode_pixels: Optional[int] = None) -> Tuple[np.ndarray, str]:
     """
-    Download image from URL, normalize it, and save to local directory.
-    Returns the local file path.
+    Decode raw image bytes to an OpenCV BGR ndarray and return the detected
+    PIL format string (e.g., 'PNG', 'JPEG', 'WEBP'). The pixel budget of
+    ``load_image`` applies. Raises ValueError on failure.
     """
+    image, fmt, _ = load_image(data, max_pixels, max_decode_pixels)
+    return image, fmt
+
+
+MAX_DOWNLOAD_SIZE = 50 * 1024 * 1024  # 50MB, enforced by services.image_downloader
+SUPPORTED_EXTENSIONS = ['jpg', 'jpeg', 'png', 'webp', 'bmp', 'tiff']
+CONTENT_TYPE_EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/jpg': 'jpg',
+    'image/png': 'png',
+    'image/webp': 'webp',
+    'image/bmp': 'bmp',
+    'image/tiff': 'tiff'
+}
+
+
+def image_file_extension(file_url: str, content_type: str = "") -> str:
+    """File extension for a downloaded image, from the URL path or else the content type"""
+    url_path = urlparse(file_url).path
+    if url_path and '.' in url_path:
+        file_extension = url_path.split('.')[-1].lower()
+    else:
+        file_extension = CONTENT_TYPE_EXTENSIONS.get(content_type, 'jpg')
+
+    # Ensure supported extension
+    if file_extension not in SUPPORTED_EXTENSIONS:
+        file_extension = 'jpg'  # Default to JPEG
+    return file_extension
+
+
+ZIP_CONTENT_TYPES = ("application/zip", "application/x-zip-compressed")
+
+
+def write_image_file(file_path: str, data: bytes) -> None:
+    """Store image bytes as-is (no re-encode), creating the directory if needed"""
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    with open(file_path, "wb") as f:
+        f.write(data)
+
+
+def is_zip_upload(filename: str, content_type: Optional[str] = None) -> bool:
+    return filename.lower().endswith(".zip") or content_type in ZIP_CONTENT_TYPES
+
+
+def iter_zip_images(fileobj: BinaryIO, allowed_extensions: Iterable[str],
+                    max_member_size: int) -> Iterator[Tuple[str, Optional[bytes], Optional[str]]]:
+    """
+    Yield ``(name, data, error)`` for each image in a ZIP archive, reading one
+    member at a time into memory (nothing is extracted to disk). Members that
+    are not images are skipped; oversized ones are reported with an error.
+    """
+    allowed = {ext.lower() for ext in allowed_extensions}
     try:
-        # Validate URL
-        parsed_url = urlparse(file_url)
-        if not parsed_url.scheme in ['http', 'https']:
-            raise ValueError("Only HTTP and HTTPS URLs are supported")
-
-        # Download image with timeout and size limits
-        headers = {
-            'User-Agent': 'AI-Disaster-Relief-System/1.0'
-        }
-
-        response = requests.get(file_url, headers=headers, timeout=30, stream=True)
-        response.raise_for_status()
-
-        # Check content type
-        content_type = response.headers.get('content-type', '').lower()
-        if not content_type.startswith('image/'):
-            raise ValueError(f"URL does not point to an image. Content-Type: {content_type}")
-
-        # Check file size (limit to 50MB)
-        content_length = response.headers.get('content-length')
-        if content_length and int(content_length) > 50 * 1024 * 1024:
-            raise ValueError("Image file too large (>50MB)")
-
-        # Read image data with size limit
-        image_data = b""
-        downloaded_size = 0
-        max_size = 50 * 1024 * 1024  # 50MB limit
-
-        for chunk in response.iter_content(chunk_size=8192):
-            downloaded_size += len(chunk)
-            if downloaded_size > max_size:
-                raise ValueError("Image file too large (>50MB)")
-            image_data += chunk
-
-        # Decode and validate image
-        image_array, format_detected = decode_image_bytes(image_data)
-
-        # Normalize image dimensions (resize if too large)
-        height, width = image_array.shape[:2]
-        max_dimension = 2048
-
-        if max(height, width) > max_dimension:
-            if height > width:
-                new_height = max_dimension
-                new_width = int(width * (max_dimension / height))
-            else:
-                new_width = max_dimension
-                new_height = int(height * (max_dimension / width))
-
-            image_array = cv2.resize(image_array, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4)
-
-        # Generate unique filename
-        file_id = str(uuid.uuid4())
-
-        # Determine file extension from URL or content type
-        url_path = parsed_url.path
-        if url_path and '.' in url_path:
-            file_extension = url_path.split('.')[-1].lower()
-        else:
-            # Map content type to extension
-            extension_map = {
-                'image/jpeg': 'jpg',
-                'image/jpg': 'jpg',
-                'image/png': 'png',
-                'image/webp': 'webp',
-                'image/bmp': 'bmp',
-                'image/tiff': 'tiff'
-            }
-            file_extension = extension_map.get(content_type, 'jpg')
-
-        # Ensure supported extension
-        supported_extensions = ['jpg', 'jpeg', 'png', 'webp', 'bmp', 'tiff']
-        if file_extension not in supported_extensions:
-            file_extension = 'jpg'  # Default to JPEG
-
-        saved_filename = f"{file_id}.{file_extension}"
-
-        # Ensure upload directory exists
-        os.makedirs(upload_directory, exist_ok=True)
-
-        # Save normalized image
-        file_path = os.path.join(upload_directory, saved_filename)
-
-        # Save based on extension
-        if file_extension.lower() in ['jpg', 'jpeg']:
-            cv2.imwrite(file_path, image_array, [cv2.IMWRITE_JPEG_QUALITY, 90])
-        elif file_extension.lower() == 'png':
-            cv2.imwrite(file_path, image_array, [cv2.IMWRITE_PNG_COMPRESSION, 6])
-        elif file_extension.lower() == 'webp':
-            cv2.imwrite(file_path, image_array, [cv2.IMWRITE_WEBP_QUALITY, 90])
-        else:
-            cv2.imwrite(file_path, image_array)
-
-        return file_path
-
-    except requests.RequestException as e:
-        raise ValueError(f"Failed to download image from URL: {str(e)}")
-    except Exception as e:
-        raise ValueError(f"Failed to process image: {str(e)}")
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Invalid ZIP archive: {str(e)}")
+
+    with archive:
+        for info in archive.infolist():
+            name = info.filename
+            base = os.path.basename(name)
+            if info.is_dir() or not base or base.startswith(".") or name.startswith("__MACOSX/"):
+                continue
+            if base.rsplit(".", 1)[-1].lower() not in allowed:
+                continue
+            if info.file_size > max_member_size:
+                yield name, None, f"File too large. Maximum size: {max_member_size / (1024*1024):.1f}MB"
+                continue
+            try:
+                with archive.open(info) as member:
+                    # Bounded read: the declared size in the archive header is not trusted
+                    data = member.read(max_member_size + 1)
+            except (zipfile.BadZipFile, OSError, RuntimeError) as e:
+                yield name, None, f"Could not read archive member: {str(e)}"
+                continue
+            if len(data) > max_member_size:
+                yield name, None, f"File too large. Maximum size: {max_member_size / (1024*1024):.1f}MB"
+                continue
+            yield name, data, None
 
 
 def validate_image_file(file_path: str) -> bool:
@@ -0,0 +1,130 @@
+"""
+Image Regions of Interest
+Client-supplied rectangles and polygons that restrict analysis to part of a
+frame (one damaged building in a street scene). Regions are given in pixels
+of the original image and cut from the decoded context, so the detectors
+and ML features only ever see the region's pixels.
+"""
+import hashlib
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from .image_context import ImageAnalysisContext
+
+# Regions smaller than this (in decoded pixels) carry too little texture to analyze
+MIN_REGION_SIZE = 16
+
+
+@dataclass(frozen=True)
+class RegionOfInterest:
+    """Rectangle or polygon in original-image pixel coordinates"""
+    shape: str  # "bbox" or "polygon"
+    points: Tuple[Tuple[float, float], ...]  # polygon vertices; a bbox is its four corners
+    label: Optional[str] = None
+
+    @classmethod
+    def bbox(cls, x: float, y: float, width: float, height: float, label: Optional[str] = None) -> "RegionOfInterest":
+        if width <= 0 or height <= 0:
+            raise ValueError("bbox width and height must be positive")
+        corners = ((x, y), (x + width, y), (x + width, y + height), (x, y + height))
+        return cls("bbox", tuple((float(px), float(py)) for px, py in corners), label)
+
+    @classmethod
+    def polygon(cls, points: Sequence[Sequence[float]], label: Optional[str] = None) -> "RegionOfInterest":
+        if len(points) < 3 or any(len(point) != 2 for point in points):
+            raise ValueError("polygon needs at least three [x, y] points")
+        return cls("polygon", tuple((float(px), float(py)) for px, py in points), label)
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """(x, y, width, height) of the bounding box"""
+        xs, ys = [p[0] for p in self.points], [p[1] for p in self.points]
+        return min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)
+
+    @property
+    def area(self) -> float:
+        """Enclosed area (shoelace formula)"""
+        pts = self.points
+        return abs(sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(pts, pts[1:] + pts[:1]))) / 2.0
+
+    @property
+    def key(self) -> str:
+        return f"{self.shape}:" + ";".join(f"{x:g},{y:g}" for x, y in self.points)
+
+    def describe(self, source_dimensions: Optional[Tuple[int, int]] = None) -> Dict:
+        """JSON summary: label, shape, bounding box and the share of the frame it covers"""
+        summary = {"label": self.label, "shape": self.shape, "bounds": list(self.bounds)}
+        if source_dimensions:
+            summary["area_fraction"] = round(self.area / float(source_dimensions[0] * source_dimensions[1]), 4)
+        return summary
+
+
+def parse_regions(raw: Optional[Iterable[Dict[str, Any]]], max_regions: int) -> Tuple[RegionOfInterest, ...]:
+    """
+    Regions from request JSON: ``{"bbox": [x, y, width, height]}`` or
+    ``{"polygon": [[x, y], ...]}``, each with an optional ``label``.
+    Raises ValueError for malformed regions or more than ``max_regions``.
+    """
+    if not raw:
+        return ()
+    items = list(raw)
+    if len(items) > max_regions:
+        raise ValueError(f"At most {max_regions} regions per image")
+    regions = []
+    for index, item in enumerate(items):
+        try:
+            label = item.get("label")
+            if ("bbox" in item) == ("polygon" in item):
+                raise ValueError("give exactly one of bbox or polygon")
+            if "bbox" in item:
+                if len(item["bbox"]) != 4:
+                    raise ValueError("bbox must be [x, y, width, height]")
+                regions.append(RegionOfInterest.bbox(*item["bbox"], label=label))
+            else:
+                regions.append(RegionOfInterest.polygon(item["polygon"], label=label))
+        except (AttributeError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid region {index}: {e}")
+    return tuple(regions)
+
+
+def regions_key(regions: Sequence[RegionOfInterest]) -> str:
+    """Short stable digest of a region list, for cache keys"""
+    if not regions:
+        return ""
+    return hashlib.sha1("|".join(region.key for region in regions).encode()).hexdigest()[:16]
+
+
+def crop_region(ctx: ImageAnalysisContext, region: RegionOfInterest) -> ImageAnalysisContext:
+    """
+    Context holding just the region's pixels, computed once per region. A
+    polygon is cropped to its bounding box and the pixels outside it are
+    filled with the polygon's mean colour, so they read as flat background
+    to the detectors. Raises ValueError if the region misses the image.
+    """
+    return ctx.memoize(f"roi:{region.key}", lambda: _crop_region(ctx, region))
+
+
+def _crop_region(ctx: ImageAnalysisContext, region: RegionOfInterest) -> ImageAnalysisContext:
+    # Regions are in original pixels; the context may have been decoded smaller
+    scale_x = ctx.width / float(ctx.source_dimensions[0])
+    scale_y = ctx.height / float(ctx.source_dimensions[1])
+    points = np.array([(x * scale_x, y * scale_y) for x, y in region.points], dtype=np.float32)
+
+    x0, y0 = max(0, math.floor(points[:, 0].min())), max(0, math.floor(points[:, 1].min()))
+    x1, y1 = min(ctx.width, math.ceil(points[:, 0].max())), min(ctx.height, math.ceil(points[:, 1].max()))
+    if x1 - x0 < MIN_REGION_SIZE or y1 - y0 < MIN_REGION_SIZE:
+        name = f"'{region.label}'" if region.label else f"at {list(region.bounds)}"
+        raise ValueError(f"Region {name} lies outside the image or is smaller than {MIN_REGION_SIZE}px")
+
+    crop = ctx.image[y0:y1, x0:x1].copy()
+    if region.shape == "polygon":
+        mask = np.zeros(crop.shape[:2], dtype=np.uint8)
+        cv2.fillPoly(mask, [np.round(points - (x0, y0)).astype(np.int32)], 255)
+        if mask.any():
+            crop[mask == 0] = cv2.mean(crop, mask=mask)[:crop.shape[2]]
+    return ImageAnalysisContext(crop, source_path=ctx.source_path)
+
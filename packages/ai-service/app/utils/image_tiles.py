@@ -0,0 +1,166 @@
+"""
+Image Tiles
+Tile grid and read-only tile access for images too large to analyze in one
+piece (drone orthophotos, satellite crops). Tiles are materialized one at a
+time, so derived planes never exist at full-frame size.
+"""
+import logging
+import math
+import struct
+import threading
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TileWindow:
+    """Position of one tile in the grid and its pixel box in the source image"""
+    row: int
+    col: int
+    x: int
+    y: int
+    width: int
+    height: int
+
+    @property
+    def area(self) -> int:
+        return self.width * self.height
+
+
+def tile_grid(width: int, height: int, tile_size: int) -> List[TileWindow]:
+    """Row-major grid of ``tile_size`` tiles covering the image; edge tiles are clipped"""
+    if tile_size <= 0:
+        raise ValueError("tile_size must be positive")
+    rows = math.ceil(height / tile_size)
+    cols = math.ceil(width / tile_size)
+    return [
+        TileWindow(
+            row=r, col=c, x=c * tile_size, y=r * tile_size,
+            width=min(tile_size, width - c * tile_size),
+            height=min(tile_size, height - r * tile_size),
+        )
+        for r in range(rows)
+        for c in range(cols)
+    ]
+
+
+def _open_without_bomb_check(image_path: str) -> Image.Image:
+    """
+    ``Image.open`` minus PIL's decompression-bomb check, which compares
+    against the process-wide ``Image.MAX_IMAGE_PIXELS`` (far below tiled
+    image sizes) that ``load_image`` relies on for every other upload. The
+    caller applies its own megapixel budget instead.
+    """
+    Image.init()
+    with open(image_path, "rb") as f:
+        prefix = f.read(16)
+    for format_id in Image.ID:
+        factory, accept = Image.OPEN[format_id]
+        accepted = not accept or accept(prefix)
+        if not accepted or isinstance(accepted, str):  # a string is a rejection with a reason
+            continue
+        try:
+            return factory(image_path)
+        except (SyntaxError, IndexError, TypeError, struct.error):
+            continue
+    raise Image.UnidentifiedImageError(f"cannot identify image file {image_path!r}")
+
+
+class TiledImage:
+    """
+    Read-only tile access to a large image. Backed either by an in-memory
+    BGR array (tiles are views) or by a lazily decoded image file (tiles are
+    cropped on demand from a single decoded buffer, never copied whole).
+    """
+
+    def __init__(self, width: int, height: int, read: Callable[[TileWindow], np.ndarray],
+                 overview: Callable[[int], np.ndarray], source_path: Optional[str] = None):
+        self.width = int(width)
+        self.height = int(height)
+        self._read = read
+        self._overview = overview
+        self.source_path = source_path
+
+    @property
+    def dimensions(self) -> Tuple[int, int]:
+        """(width, height) of the full-resolution image"""
+        return self.width, self.height
+
+    @property
+    def megapixels(self) -> float:
+        return self.width * self.height / 1_000_000
+
+    @classmethod
+    def from_array(cls, image: np.ndarray, source_path: Optional[str] = None) -> "TiledImage":
+        if image is None or image.size == 0:
+            raise ValueError("TiledImage requires a non-empty image array")
+
+        def read(window: TileWindow) -> np.ndarray:
+            return image[window.y:window.y + window.height, window.x:window.x + window.width]
+
+        def overview(max_dimension: int) -> np.ndarray:
+            scale = min(1.0, max_dimension / float(max(image.shape[:2])))
+            size = (max(1, round(image.shape[1] * scale)), max(1, round(image.shape[0] * scale)))
+            return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+        return cls(image.shape[1], image.shape[0], read, overview, source_path)
+
+    @classmethod
+    def open(cls, image_path: str, max_megapixels: Optional[float] = None) -> "TiledImage":
+        """
+        Open an image file for tiled reads. Only the header is read here; the
+        pixel data is decoded once, on the first tile request.
+        """
+        try:
+            # The budget below replaces PIL's own (much lower) decompression-bomb limit
+            pil_image = _open_without_bomb_check(image_path)
+        except (OSError, Image.UnidentifiedImageError) as e:
+            raise ValueError(f"Could not open image {image_path}: {str(e)}")
+
+        megapixels = pil_image.width * pil_image.height / 1_000_000
+        if max_megapixels and megapixels > max_megapixels:
+            pil_image.close()
+            raise ValueError(
+                f"Image is {megapixels:.0f} MP, above the {max_megapixels} MP tiled analysis budget"
+            )
+
+        lock = threading.Lock()
+
+        def read(window: TileWindow) -> np.ndarray:
+            box = (window.x, window.y, window.x + window.width, window.y + window.height)
+            # PIL images are not safe for concurrent decoding/cropping
+            with lock:
+                tile = pil_image.crop(box)
+            return cv2.cvtColor(np.asarray(tile.convert("RGB")), cv2.COLOR_RGB2BGR)
+
+        def overview(max_dimension: int) -> np.ndarray:
+            # reduce() allocates only the reduced image, never a second full-size copy
+            factor = max(1, max(pil_image.size) // max_dimension)
+            with lock:
+                preview = pil_image.reduce(factor) if factor > 1 else pil_image.copy()
+            preview = preview.convert("RGB")
+            preview.thumbnail((max_dimension, max_dimension), Image.Resampling.BOX)
+            return cv2.cvtColor(np.asarray(preview), cv2.COLOR_RGB2BGR)
+
+        return cls(pil_image.width, pil_image.height, read, overview, image_path)
+
+    def tiles(self, tile_size: int) -> List[TileWindow]:
+        return tile_grid(self.width, self.height, tile_size)
+
+    def read_tile(self, window: TileWindow) -> np.ndarray:
+        """BGR pixels for one tile"""
+        return self._read(window)
+
+    def iter_tiles(self, tile_size: int) -> Iterator[Tuple[TileWindow, np.ndarray]]:
+        for window in self.tiles(tile_size):
+            yield window, self.read_tile(window)
+
+    def overview(self, max_dimension: int) -> np.ndarray:
+        """Downscaled BGR copy whose longest side is at most ``max_dimension``"""
+        return self._overview(max_dimension)
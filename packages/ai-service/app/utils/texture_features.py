@@ -0,0 +1,251 @@
+"""
+Texture Feature Utilities
+Vectorized Local Binary Pattern (LBP) and GLCM/Haralick descriptors for texture analysis
+"""
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple, Union
+
+import numpy as np
+
+LBP_METHODS = ("default", "ror", "uniform")
+
+# (radius, n_points) pairs used for multi-scale texture descriptors
+DEFAULT_LBP_CONFIGS: Tuple[Tuple[int, int], ...] = ((1, 8), (2, 16), (3, 24))
+
+GLCM_LEVELS = 32
+DEFAULT_GLCM_DISTANCES: Tuple[int, ...] = (1,)
+DEFAULT_GLCM_ANGLES: Tuple[int, ...] = (0, 45, 90, 135)  # degrees
+HARALICK_FEATURES = ("energy", "contrast", "homogeneity", "correlation", "entropy", "dissimilarity")
+
+# Rotation-invariant lookup tables are enumerated over every code, so they are only
+# built up to this many points; larger neighbourhoods are mapped code by code
+_MAX_LUT_POINTS = 16
+
+
+def _sampling_deltas(radius: int, n_points: int) -> List[Tuple[float, float]]:
+    """(row, col) offsets of the circular neighbourhood, before rounding."""
+    deltas = []
+    for p in range(n_points):
+        angle = 2 * np.pi * p / n_points
+        deltas.append((radius * np.cos(angle), radius * np.sin(angle)))
+    return deltas
+
+
+def _sample_index(start: int, stop: int, delta: float) -> Union[slice, np.ndarray]:
+    """
+    Neighbour coordinates for centres ``start..stop-1``, rounded from the
+    absolute position (half to even) like the original per-pixel code. Where
+    that lands on a half pixel the offset alternates with the centre's
+    parity, so a plain slice is only returned when the offset is constant.
+    """
+    centres = np.arange(start, stop)
+    index = np.round(centres + delta).astype(np.int64)
+    offset = index - centres
+    if np.all(offset == offset[0]):
+        return slice(start + int(offset[0]), stop + int(offset[0]))
+    return index
+
+
+def _bit_counts(codes: np.ndarray, n_points: int) -> np.ndarray:
+    counts = np.zeros(codes.shape, dtype=np.int64)
+    for p in range(n_points):
+        counts += (codes >> p) & 1
+    return counts
+
+
+def _rotate_right(codes: np.ndarray, shift: int, n_points: int) -> np.ndarray:
+    mask = (1 << n_points) - 1
+    return ((codes >> shift) | (codes << (n_points - shift))) & mask
+
+
+def _ror_codes(codes: np.ndarray, n_points: int) -> np.ndarray:
+    """Map each code to the minimum over its circular bit rotations."""
+    codes = codes.astype(np.int64)
+    best = codes.copy()
+    for shift in range(1, n_points):
+        np.minimum(best, _rotate_right(codes, shift, n_points), out=best)
+    return best
+
+
+def _uniform_codes(codes: np.ndarray, n_points: int) -> np.ndarray:
+    """Rotation-invariant uniform mapping: popcount for uniform codes, n_points + 1 otherwise."""
+    codes = codes.astype(np.int64)
+    transitions = _bit_counts(codes ^ _rotate_right(codes, 1, n_points), n_points)
+    ones = _bit_counts(codes, n_points)
+    return np.where(transitions <= 2, ones, n_points + 1)
+
+
+@lru_cache(maxsize=None)
+def _ror_lut(n_points: int) -> np.ndarray:
+    return _ror_codes(np.arange(1 << n_points), n_points).astype(np.uint32)
+
+
+@lru_cache(maxsize=None)
+def _uniform_lut(n_points: int) -> np.ndarray:
+    return _uniform_codes(np.arange(1 << n_points), n_points).astype(np.uint32)
+
+
+def lbp_n_bins(n_points: int, method: str = "default") -> int:
+    """Number of histogram bins needed for an LBP image of the given configuration."""
+    if method == "uniform":
+        return n_points + 2
+    return 1 << n_points
+
+
+def local_binary_pattern(gray: np.ndarray, radius: int = 1, n_points: int = 8,
+                         method: str = "default") -> np.ndarray:
+    """
+    Compute the LBP code image with whole-array shifts and comparisons.
+
+    Neighbours are sampled on the circle of the given radius, each
+    coordinate rounded from the absolute position as the original per-pixel
+    implementation did (so half-pixel offsets round to even), and the
+    ``radius``-wide border is left at zero; the codes match that
+    implementation. ``method`` is one of ``default``, ``ror`` (rotation
+    invariant) or ``uniform`` (rotation invariant uniform patterns).
+    """
+    if method not in LBP_METHODS:
+        raise ValueError(f"Unknown LBP method '{method}'. Supported: {LBP_METHODS}")
+    if radius < 1 or n_points < 1:
+        raise ValueError("radius and n_points must be positive")
+
+    gray = np.asarray(gray)
+    h, w = gray.shape
+    code_dtype = np.uint8 if n_points <= 8 else np.uint32
+    lbp = np.zeros((h, w), dtype=code_dtype)
+    if h <= 2 * radius or w <= 2 * radius:
+        return lbp
+
+    center = gray[radius:h - radius, radius:w - radius]
+    codes = np.zeros(center.shape, dtype=code_dtype)
+    for p, (dy, dx) in enumerate(_sampling_deltas(radius, n_points)):
+        rows = _sample_index(radius, h - radius, dy)
+        cols = _sample_index(radius, w - radius, dx)
+        if isinstance(rows, slice) and isinstance(cols, slice):
+            neighbour = gray[rows, cols]
+        else:
+            neighbour = gray[rows][:, cols]
+        codes |= (neighbour >= center).astype(code_dtype) << code_dtype(p)
+
+    if method == "ror":
+        mapped = _ror_lut(n_points)[codes] if n_points <= _MAX_LUT_POINTS else _ror_codes(codes, n_points)
+        codes = mapped.astype(code_dtype)
+    elif method == "uniform":
+        mapped = _uniform_lut(n_points)[codes] if n_points <= _MAX_LUT_POINTS else _uniform_codes(codes, n_points)
+        codes = mapped.astype(code_dtype)
+
+    lbp[radius:h - radius, radius:w - radius] = codes
+    return lbp
+
+
+def lbp_histogram(lbp: np.ndarray, n_bins: int, normalize: bool = True) -> np.ndarray:
+    """Histogram of LBP codes over the full image (border pixels included)."""
+    hist = np.bincount(lbp.ravel(), minlength=n_bins)[:n_bins].astype(np.float64)
+    if normalize:
+        hist /= hist.sum() + 1e-10
+    return hist
+
+
+def histogram_entropy(hist: np.ndarray) -> float:
+    """Shannon entropy (bits) of a normalized histogram."""
+    return float(-np.sum(hist * np.log2(hist + 1e-12)))
+
+
+def multiscale_lbp_histograms(
+    gray: np.ndarray,
+    configs: Iterable[Tuple[int, int]] = DEFAULT_LBP_CONFIGS,
+    method: str = "uniform",
+) -> Dict[str, np.ndarray]:
+    """Normalized LBP histograms keyed by ``"r{radius}_p{n_points}"``."""
+    histograms: Dict[str, np.ndarray] = {}
+    for radius, n_points in configs:
+        lbp = local_binary_pattern(gray, radius, n_points, method)
+        histograms[f"r{radius}_p{n_points}"] = lbp_histogram(lbp, lbp_n_bins(n_points, method))
+    return histograms
+
+
+# -------- GLCM / Haralick --------
+
+def quantize_gray(gray: np.ndarray, levels: int = GLCM_LEVELS) -> np.ndarray:
+    """Quantize 8-bit gray values into ``levels`` bins."""
+    return (np.asarray(gray).astype(np.float32) / 256.0 * levels).astype(np.uint8)
+
+
+def glcm_offsets(distances: Iterable[int] = DEFAULT_GLCM_DISTANCES,
+                 angles: Iterable[int] = DEFAULT_GLCM_ANGLES) -> List[Tuple[int, int]]:
+    """
+    (row, col) pixel offsets for each distance/angle pair, distance-major.
+    Angles are in degrees, measured counter-clockwise from the +x axis.
+    """
+    offsets = []
+    for distance in distances:
+        for angle in angles:
+            theta = np.deg2rad(angle)
+            offsets.append((int(round(-distance * np.sin(theta))), int(round(distance * np.cos(theta)))))
+    return offsets
+
+
+def compute_glcm(gray: np.ndarray, levels: int = GLCM_LEVELS,
+                 offsets: Iterable[Tuple[int, int]] = ((0, 1),),
+                 normed: bool = True) -> np.ndarray:
+    """
+    Co-occurrence matrices of shape ``(n_offsets, levels, levels)``.
+
+    Every (reference, neighbour) pixel pair for every offset is encoded as a
+    single flat index and counted with one ``np.bincount`` call. ``gray`` must
+    already be quantized to ``[0, levels)``.
+    """
+    gray = np.asarray(gray)
+    h, w = gray.shape
+    offsets = list(offsets)
+    indices = []
+    for k, (dy, dx) in enumerate(offsets):
+        ref = gray[max(0, -dy):h - max(0, dy), max(0, -dx):w - max(0, dx)]
+        nbr = gray[max(0, dy):h - max(0, -dy), max(0, dx):w - max(0, -dx)]
+        if ref.size == 0:
+            continue
+        indices.append((k * levels + ref.astype(np.int64).ravel()) * levels + nbr.ravel())
+
+    n_cells = len(offsets) * levels * levels
+    if indices:
+        counts = np.bincount(np.concatenate(indices), minlength=n_cells)[:n_cells]
+    else:
+        counts = np.zeros(n_cells, dtype=np.int64)
+    glcm = counts.reshape(len(offsets), levels, levels).astype(np.float64)
+
+    if normed:
+        totals = glcm.sum(axis=(1, 2), keepdims=True)
+        glcm = np.divide(glcm, totals, out=np.zeros_like(glcm), where=totals > 0)
+    return glcm
+
+
+def haralick_features(glcm: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Haralick descriptors for a stack of normalized GLCMs.
+    Returns one array of length ``n_offsets`` per name in ``HARALICK_FEATURES``.
+    """
+    glcm = np.asarray(glcm, dtype=np.float64)
+    if glcm.ndim == 2:
+        glcm = glcm[np.newaxis]
+    levels = glcm.shape[-1]
+    i = np.arange(levels, dtype=np.float64).reshape(1, -1, 1)
+    j = np.arange(levels, dtype=np.float64).reshape(1, 1, -1)
+    diff = i - j
+
+    mu_i = np.sum(glcm * i, axis=(1, 2))
+    mu_j = np.sum(glcm * j, axis=(1, 2))
+    var_i = np.sum(glcm * (i - mu_i[:, None, None]) ** 2, axis=(1, 2))
+    var_j = np.sum(glcm * (j - mu_j[:, None, None]) ** 2, axis=(1, 2))
+    cov = np.sum(glcm * (i - mu_i[:, None, None]) * (j - mu_j[:, None, None]), axis=(1, 2))
+    denom = np.sqrt(var_i * var_j)
+    # Constant images are perfectly correlated by convention
+    correlation = np.divide(cov, denom, out=np.ones_like(cov), where=denom > 1e-12)
+
+    return {
+        "energy": np.sum(glcm ** 2, axis=(1, 2)),
+        "contrast": np.sum(glcm * diff ** 2, axis=(1, 2)),
+        "homogeneity": np.sum(glcm / (1.0 + diff ** 2), axis=(1, 2)),
+        "correlation": correlation,
+        "entropy": -np.sum(glcm * np.log2(glcm + 1e-12), axis=(1, 2)),
+        "dissimilarity": np.sum(glcm * np.abs(diff), axis=(1, 2)),
+    }
@@ -0,0 +1,90 @@
+"""
+Dominant color benchmark
+
+Compares latency and palette agreement of the dominant color methods
+against the reference k-means (10 attempts, all pixels) on the 512x512
+enhanced images the feature extractor actually sees.
+
+Usage (from packages/ai-service):
+    python scripts/benchmark_dominant_colors.py                 # synthetic scenes
+    python scripts/benchmark_dominant_colors.py path/to/images  # your own images
+"""
+import os
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.cv_service import CVService  # noqa: E402
+from app.utils.color_features import (  # noqa: E402
+    DOMINANT_COLOR_METHODS,
+    dominant_colors,
+    palette_distance,
+)
+
+REPEATS = 3
+
+
+def inertia(image: np.ndarray, centers: np.ndarray) -> float:
+    """Mean squared BGR distance from each pixel to its nearest center (the k-means objective)"""
+    pixels = image.reshape((-1, 3)).astype(np.float32)
+    d2 = ((pixels[:, None, :] - np.asarray(centers, dtype=np.float32)[None, :, :]) ** 2).sum(axis=2)
+    return float(d2.min(axis=1).mean())
+
+
+def synthetic_scene(seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    image = cv2.GaussianBlur(rng.integers(0, 256, (768, 1024, 3), dtype=np.uint8), (41, 41), 0)
+    for _ in range(30):
+        x, y = (int(v) for v in rng.integers(0, 900, 2))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.rectangle(image, (x, y), (x + int(rng.integers(20, 250)), y + int(rng.integers(20, 250))), color, -1)
+    return image
+
+
+def load_images(directory: str):
+    for name in sorted(os.listdir(directory)):
+        image = cv2.imread(os.path.join(directory, name))
+        if image is not None:
+            yield image
+
+
+def main() -> None:
+    if len(sys.argv) > 1:
+        images = list(load_images(sys.argv[1]))
+    else:
+        images = [synthetic_scene(seed) for seed in range(8)]
+
+    cv_service = CVService()
+    enhanced = [cv_service._enhance_image(cv2.resize(image, (512, 512))) for image in images]
+
+    latencies = {method: [] for method in DOMINANT_COLOR_METHODS}
+    distances = {method: [] for method in DOMINANT_COLOR_METHODS}
+    inertia_ratios = {method: [] for method in DOMINANT_COLOR_METHODS}
+    for image in enhanced:
+        reference = dominant_colors(image, "kmeans", 3, 10)
+        for method in DOMINANT_COLOR_METHODS:
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                centers = dominant_colors(image, method, 3, 10)
+                latencies[method].append(time.perf_counter() - start)
+            distances[method].append(palette_distance(reference, centers))
+            inertia_ratios[method].append(inertia(image, centers) / inertia(image, reference))
+
+    print(f"{len(enhanced)} images, 512x512 enhanced, k=3\n")
+    print(f"{'method':<12}{'median ms':>11}{'mean dist':>11}{'max dist':>10}{'inertia x':>11}")
+    for method in DOMINANT_COLOR_METHODS:
+        print(f"{method:<12}{1000 * statistics.median(latencies[method]):>11.1f}"
+              f"{statistics.mean(distances[method]):>11.1f}{max(distances[method]):>10.1f}"
+              f"{statistics.mean(inertia_ratios[method]):>11.3f}")
+    print("\nDistances are mean BGR Euclidean distance to the reference palette (0-441); "
+          "'kmeans' vs itself shows run-to-run k-means variation.\n'inertia x' is the k-means "
+          "objective relative to the reference (1.0 = equally compact clusters).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Fidelity tier benchmark
+
+Runs the CV damage analysis at every fidelity tier and reports latency and
+how far each tier's damage score lands from the full-fidelity reference.
+
+Usage (from packages/ai-service):
+    python scripts/benchmark_fidelity.py                 # synthetic 12 MP scenes
+    python scripts/benchmark_fidelity.py path/to/images  # your own images
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.config.fidelity import FIDELITY_TIERS  # noqa: E402
+from app.services.cv_service import CVService  # noqa: E402
+from app.utils.image_context import ImageAnalysisContext  # noqa: E402
+
+
+def synthetic_scene(seed: int, size=(3000, 4000)) -> np.ndarray:
+    """Smooth background with rubble-like blobs, cracks and dark patches"""
+    rng = np.random.default_rng(seed)
+    h, w = size
+    image = cv2.GaussianBlur(rng.integers(0, 256, (h, w, 3), dtype=np.uint8), (21, 21), 0)
+    for _ in range(40 + seed * 20):
+        x, y = int(rng.integers(0, w - 300)), int(rng.integers(0, h - 300))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.rectangle(image, (x, y), (x + int(rng.integers(20, 300)), y + int(rng.integers(20, 300))), color, -1)
+    for _ in range(30 * seed):
+        p1 = tuple(int(v) for v in rng.integers(0, (w, h)))
+        p2 = tuple(int(v) for v in rng.integers(0, (w, h)))
+        cv2.line(image, p1, p2, (30, 30, 30), int(rng.integers(2, 8)))
+    return image
+
+
+def load_images(directory: str):
+    for name in sorted(os.listdir(directory)):
+        image = cv2.imread(os.path.join(directory, name))
+        if image is not None:
+            yield name, image
+
+
+async def benchmark(images) -> None:
+    cv_service = CVService()
+    latencies = {name: [] for name in FIDELITY_TIERS}
+    deltas = {name: [] for name in FIDELITY_TIERS}
+    level_matches = {name: 0 for name in FIDELITY_TIERS}
+    count = 0
+
+    for label, image in images:
+        count += 1
+        results = {}
+        for name in ["full", "balanced", "fast"]:
+            # Fresh context per tier so nothing is shared through the cache
+            ctx = ImageAnalysisContext(image)
+            start = time.perf_counter()
+            results[name] = await cv_service.analyze_damage(ctx, fidelity=name)
+            latencies[name].append(time.perf_counter() - start)
+
+        reference = results["full"]
+        for name, result in results.items():
+            deltas[name].append(abs(result["damage_score"] - reference["damage_score"]))
+            level_matches[name] += result["damage_level"] == reference["damage_level"]
+        print(f"{label}: " + ", ".join(
+            f"{name}={results[name]['damage_score']:.3f}" for name in ["full", "balanced", "fast"]
+        ))
+
+    print(f"\n{'tier':<10}{'median s':>10}{'max |delta|':>13}{'level match':>13}")
+    for name in FIDELITY_TIERS:
+        print(f"{name:<10}{statistics.median(latencies[name]):>10.3f}"
+              f"{max(deltas[name]):>13.3f}{level_matches[name]:>9}/{count}")
+
+
+def main() -> None:
+    if len(sys.argv) > 1:
+        images = list(load_images(sys.argv[1]))
+    else:
+        images = [(f"synthetic-{seed}", synthetic_scene(seed)) for seed in range(1, 6)]
+    asyncio.run(benchmark(images))
+
+
+if __name__ == "__main__":
+    main()
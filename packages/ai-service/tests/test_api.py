@@ -4,14 +4,20 @@ Unit tests for API functionality
 """
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 import tempfile
 import os
 
 from app.main import app
+from app.services.image_downloader import DownloadedImage
 
 client = TestClient(app)
 
+def stored_images(directory):
+    """Stored original images, without their thumbnail/preview derivatives"""
+    return [name for name in os.listdir(directory)
+            if not os.path.splitext(name)[0].endswith(("_thumbnail", "_preview"))]
+
 class TestDamageAssessmentAPI:
     """Test cases for damage assessment API"""
 
@@ -22,6 +28,15 @@ class TestDamageAssessmentAPI:
         assert "status" in response.json()
         assert response.json()["status"] == "healthy"
 
+    def test_metrics_endpoint(self):
+        """Metrics endpoint reports counters and the cascade skip rate"""
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        body = response.json()
+        assert body["status"] == "ok"
+        assert "counters" in body
+        assert 0.0 <= body["gauges"]["cv_cascade_skip_rate"] <= 1.0
+
     def test_root_endpoint(self):
         """Test root endpoint"""
         response = client.get("/")
@@ -53,3 +68,333 @@ class TestDamageAssessmentAPI:
 
         response = client.post("/api/v1/damage/analyze", files=files)
         assert response.status_code == 200 or response.status_code == 422  # May fail due to missing DB
+
+class TestAnalyzeByUrlAPI:
+    """Test cases for URL-based analysis"""
+
+    def test_url_image_analyzed_in_memory_and_stored_after_response(self):
+        """The downloaded bytes are analyzed directly and written unchanged in the background"""
+        import cv2
+        import numpy as np
+
+        image = np.random.default_rng(0).integers(0, 256, (120, 160, 3), dtype=np.uint8)
+        image_bytes = cv2.imencode(".png", image)[1].tobytes()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with patch("app.api.damage_assessment.settings.upload_directory", tmp_dir), \
+                 patch("app.api.damage_assessment.get_image_downloader") as mock_downloader:
+                mock_downloader.return_value.fetch = AsyncMock(return_value=DownloadedImage(image_bytes, "image/png"))
+                with TestClient(app) as lifespan_client:
+                    response = lifespan_client.post("/api/v1/damage/analyze-by-url",
+                                                    json={"fileUrl": "https://example.com/photo.png"})
+
+            assert response.status_code == 200
+            stage_timings = response.json()["analysis_data"]["stage_timings"]
+            assert {"cv", "ml", "infrastructure", "location", "priority"} <= set(stage_timings)
+            file_info = response.json()["analysis_data"]["file_info"]
+            assert file_info["file_path"].endswith(".png")
+            with open(file_info["file_path"], "rb") as f:
+                assert f.read() == image_bytes
+
+    def test_undecodable_url_image_rejected(self):
+        """Bytes that are not an image return 400 without storing anything"""
+        with patch("app.api.damage_assessment.get_image_downloader") as mock_downloader:
+            mock_downloader.return_value.fetch = AsyncMock(return_value=DownloadedImage(b"not an image", "image/png"))
+            response = client.post("/api/v1/damage/analyze-by-url", json={"fileUrl": "https://example.com/x.png"})
+
+        assert response.status_code == 400
+
+    def test_bulk_urls_stream_one_line_per_item(self):
+        """Bulk analysis streams a result per URL, stores the good ones and reports failures"""
+        import json
+
+        import cv2
+        import numpy as np
+
+        image = np.random.default_rng(1).integers(0, 256, (120, 160, 3), dtype=np.uint8)
+        image_bytes = cv2.imencode(".png", image)[1].tobytes()
+
+        async def fetch(url):
+            data = b"not an image" if "bad" in url else image_bytes
+            return DownloadedImage(data, "image/png")
+
+        urls = [f"https://example.com/{i}.png" for i in range(4)] + ["https://example.com/bad.png"]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with patch("app.api.damage_assessment.settings.upload_directory", tmp_dir), \
+                 patch("app.api.damage_assessment.get_image_downloader") as mock_downloader:
+                mock_downloader.return_value.fetch = fetch
+                with TestClient(app) as lifespan_client:
+                    response = lifespan_client.post("/api/v1/damage/analyze-by-url/bulk",
+                                                    json={"items": [{"fileUrl": url} for url in urls]})
+                    lines = [json.loads(line) for line in response.text.splitlines()]
+                    first_id = next(line["id"] for line in lines if line.get("status") == "completed")
+                    stored = lifespan_client.get(f"/api/v1/damage/assessment/{first_id}")
+
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("application/x-ndjson")
+            items, summary = lines[:-1], lines[-1]["summary"]
+            assert sorted(item["index"] for item in items) == list(range(5))
+            assert summary == {**summary, "total": 5, "completed": 4, "failed": 1}
+            failed = [item for item in items if item["status"] == "failed"]
+            assert [item["fileUrl"] for item in failed] == ["https://example.com/bad.png"]
+            assert stored.status_code == 200
+            assert len(stored_images(tmp_dir)) == 4
+
+    def test_bulk_rejects_empty_and_oversized_batches(self):
+        """Empty batches and batches above bulk_max_items return 400"""
+        assert client.post("/api/v1/damage/analyze-by-url/bulk", json={"items": []}).status_code == 400
+        with patch("app.api.damage_assessment.settings.bulk_max_items", 2):
+            response = client.post("/api/v1/damage/analyze-by-url/bulk",
+                                   json={"items": [{"fileUrl": "https://example.com/a.png"}] * 3})
+        assert response.status_code == 400
+
+
+class TestProgressiveAPI:
+    """Test cases for progressive (streamed) assessments"""
+
+    def test_upload_streams_coarse_then_refined_then_result(self):
+        """A coarse estimate comes before the refined CV result; the stored record matches the final result"""
+        import json
+
+        import cv2
+        import numpy as np
+
+        image = np.random.default_rng(5).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+        image_bytes = cv2.imencode(".png", image)[1].tobytes()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with patch("app.api.damage_assessment.settings.upload_directory", tmp_dir), TestClient(app) as lifespan_client:
+                with lifespan_client.stream("POST", "/api/v1/damage/assess-damage?stream=ndjson&fidelity=fast",
+                                            files={"file": ("photo.png", image_bytes, "image/png")}) as response:
+                    events = [json.loads(line) for line in response.iter_lines() if line]
+                names = [event["event"] for event in events]
+                result = events[-1]["data"]
+                stored = lifespan_client.get(f"/api/v1/damage/assessment/{result['id']}").json()
+
+            assert response.headers["content-type"].startswith("application/x-ndjson")
+            assert names[-1] == "result"
+            assert names.index("coarse") < names.index("cv") < names.index("severity") < names.index("priority")
+            assert events[names.index("coarse")]["data"]["computer_vision"]["analysis_dimensions"] == [320, 240]
+            assert stored["severity_score"] == result["severity_score"]
+            assert stored["analysis_data"] == result["analysis_data"]
+            assert "coarse" not in stored["analysis_data"]["stage_timings"]
+            assert stored_images(tmp_dir) == [f"{result['assessment_id']}.png"]
+
+    def test_url_streams_server_sent_events(self):
+        """stream=sse sends named events; errors after the stream starts arrive as an error event"""
+        with patch("app.api.damage_assessment.get_image_downloader") as mock_downloader:
+            mock_downloader.return_value.fetch = AsyncMock(return_value=DownloadedImage(b"not an image", "image/png"))
+            response = client.post("/api/v1/damage/analyze-by-url?stream=sse",
+                                   json={"fileUrl": "https://example.com/x.png"})
+
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert "event: error" in response.text
+        assert "Could not decode image" in response.text
+
+    def test_unknown_stream_format_rejected(self):
+        """Unknown stream formats return 400 before any analysis"""
+        response = client.post("/api/v1/damage/assess-damage?stream=xml",
+                               files={"file": ("photo.png", b"data", "image/png")})
+        assert response.status_code == 400
+
+
+class TestRegionOfInterestAPI:
+    """Test cases for analysis restricted to regions of interest"""
+
+    def test_each_region_gets_its_own_result(self):
+        """Only the regions are analyzed; the record carries one result per region and the worst at top level"""
+        import json
+
+        import cv2
+        import numpy as np
+
+        image = np.full((600, 800, 3), 150, dtype=np.uint8)
+        image[100:400, 200:500] = np.random.default_rng(6).integers(0, 256, (300, 300, 3), dtype=np.uint8)
+        image_bytes = cv2.imencode(".png", image)[1].tobytes()
+        rois = [{"bbox": [200, 100, 300, 300], "label": "building"},
+                {"polygon": [[600, 400], [780, 400], [780, 580]], "label": "road"}]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with patch("app.api.damage_assessment.settings.upload_directory", tmp_dir), TestClient(app) as lifespan_client:
+                response = lifespan_client.post("/api/v1/damage/assess-damage", params={"rois": json.dumps(rois)},
+                                                files={"file": ("street.png", image_bytes, "image/png")})
+
+        assert response.status_code == 200
+        data = response.json()
+        regions = data["analysis_data"]["regions"]
+        assert [region["label"] for region in regions] == ["building", "road"]
+        assert regions[0]["area_fraction"] == pytest.approx(300 * 300 / (800 * 600), abs=1e-4)
+        assert data["severity_score"] == max(region["severity_score"] for region in regions)
+        cv_result = data["analysis_data"]["computer_vision"]
+        assert [r["preprocessing"]["original_dimensions"] for r in cv_result["regions"]] == [[300, 300], [180, 180]]
+        assert cv_result["region_index"] == 0
+
+    def test_invalid_regions_rejected(self):
+        """Malformed regions, regions outside the image and rois with tiled mode return 400"""
+        import cv2
+        import numpy as np
+
+        image_bytes = cv2.imencode(".png", np.zeros((64, 64, 3), dtype=np.uint8))[1].tobytes()
+        files = {"file": ("photo.png", image_bytes, "image/png")}
+
+        for params in ({"rois": "not json"}, {"rois": '[{"bbox": [1, 2]}]'},
+                       {"rois": '[{"bbox": [500, 500, 50, 50]}]'},
+                       {"rois": '[{"bbox": [0, 0, 50, 50]}]', "tiled": "true"}):
+            response = client.post("/api/v1/damage/assess-damage", params=params, files=files)
+            assert response.status_code == 400, params
+
+
+class TestImageDerivativesAPI:
+    """Test cases for thumbnails and previews of stored images"""
+
+    def test_derivatives_served_with_etag(self):
+        """Derivatives are written at ingest and served cacheably, WebP when accepted"""
+        import cv2
+        import numpy as np
+
+        image = np.random.default_rng(8).integers(0, 256, (900, 1200, 3), dtype=np.uint8)
+        image_bytes = cv2.imencode(".jpg", image)[1].tobytes()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with patch("app.api.damage_assessment.settings.upload_directory", tmp_dir), TestClient(app) as lifespan_client:
+                response = lifespan_client.post("/api/v1/damage/assess-damage",
+                                                files={"file": ("scene.jpg", image_bytes, "image/jpeg")})
+                assert response.status_code == 200
+                assessment = response.json()
+            file_id = assessment["assessment_id"]
+            assert sorted(os.listdir(tmp_dir)) == sorted([
+                f"{file_id}.jpg", f"{file_id}_thumbnail.jpg", f"{file_id}_thumbnail.webp",
+                f"{file_id}_preview.jpg", f"{file_id}_preview.webp",
+            ])
+            assert "derivatives" in assessment["analysis_data"]["stage_timings"]
+
+            url = f"/api/v1/damage/assessment/{assessment['id']}/image/thumbnail"
+            webp = client.get(url, headers={"Accept": "image/webp,image/*"})
+            assert webp.status_code == 200
+            assert webp.headers["content-type"] == "image/webp"
+            assert "immutable" in webp.headers["cache-control"]
+            assert "Accept" in webp.headers["vary"]
+            assert cv2.imdecode(np.frombuffer(webp.content, np.uint8), cv2.IMREAD_COLOR).shape == (192, 256, 3)
+
+            jpeg = client.get(url, headers={"Accept": "image/*"})
+            assert jpeg.headers["content-type"] == "image/jpeg"
+            assert jpeg.headers["etag"] != webp.headers["etag"]
+
+            revalidated = client.get(url, headers={"Accept": "image/webp", "If-None-Match": webp.headers["etag"]})
+            assert revalidated.status_code == 304
+            assert revalidated.content == b""
+
+            # Derivatives missing for older images are rendered on first request
+            os.remove(os.path.join(tmp_dir, f"{file_id}_preview.jpg"))
+            preview = client.get(f"/api/v1/damage/assessment/{assessment['id']}/image/preview", params={"format": "jpg"})
+            assert preview.status_code == 200
+            assert preview.headers["content-type"] == "image/jpeg"
+
+            assert client.get(f"/api/v1/damage/assessment/{assessment['id']}/image/original").status_code == 404
+            assert client.get(url, params={"format": "gif"}).status_code == 400
+            assert client.get("/api/v1/damage/assessment/missing/image/thumbnail").status_code == 404
+
+
+class TestBatchUploadAPI:
+    """Test cases for multipart batch uploads"""
+
+    def test_files_and_zip_members_assessed_in_one_request(self):
+        """Plain files and ZIP members each get a result; bad files fail alone"""
+        import io
+        import zipfile
+
+        import cv2
+        import numpy as np
+
+        rng = np.random.default_rng(2)
+        images = [cv2.imencode(".png", rng.integers(0, 256, (90, 120, 3), dtype=np.uint8))[1].tobytes()
+                  for _ in range(3)]
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("burst/1.png", images[1])
+            zf.writestr("burst/2.png", images[2])
+            zf.writestr("burst/readme.txt", b"skipped")
+
+        files = [
+            ("files", ("photo.png", images[0], "image/png")),
+            ("files", ("burst.zip", archive.getvalue(), "application/zip")),
+            ("files", ("broken.png", b"not an image", "image/png")),
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with patch("app.api.damage_assessment.settings.upload_directory", tmp_dir):
+                with TestClient(app) as lifespan_client:
+                    response = lifespan_client.post("/api/v1/damage/assess-damage/batch", files=files)
+                    body = response.json()
+                    stored = lifespan_client.get(f"/api/v1/damage/assessment/{body['results'][1]['id']}")
+
+            assert response.status_code == 200
+            results = body["results"]
+            assert [r["filename"] for r in results] == ["photo.png", "burst.zip/burst/1.png",
+                                                        "burst.zip/burst/2.png", "broken.png"]
+            assert [r["status"] for r in results] == ["completed"] * 3 + ["failed"]
+            assert "analysis_ms" in results[0]["timings"]
+            assert body["summary"]["completed"] == 3 and "ml_batch_ms" in body["summary"]["timings"]
+            assert stored.status_code == 200
+            assert sorted(stored_images(tmp_dir)) == sorted(f"{r['assessment_id']}.png" for r in results[:3])
+
+    def test_batch_size_limit(self):
+        """Batches above batch_max_files return 400"""
+        files = [("files", (f"{i}.png", b"x", "image/png")) for i in range(3)]
+        with patch("app.api.damage_assessment.settings.batch_max_files", 2):
+            response = client.post("/api/v1/damage/assess-damage/batch", files=files)
+        assert response.status_code == 400
+
+
+class TestJobsAPI:
+    """Test cases for asynchronous analysis jobs"""
+
+    def test_upload_job_polled_to_completion(self):
+        """Submitting returns 202 with a job id; polling ends with the stored assessment"""
+        import time
+
+        import cv2
+        import numpy as np
+
+        image = np.random.default_rng(3).integers(0, 256, (120, 160, 3), dtype=np.uint8)
+        image_bytes = cv2.imencode(".png", image)[1].tobytes()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with patch("app.api.damage_assessment.settings.upload_directory", tmp_dir):
+                with TestClient(app) as lifespan_client:
+                    response = lifespan_client.post("/api/v1/damage/jobs",
+                                                    files={"file": ("photo.png", image_bytes, "image/png")})
+                    job = response.json()
+                    deadline = time.monotonic() + 30
+                    while job["status"] not in ("completed", "failed") and time.monotonic() < deadline:
+                        time.sleep(0.05)
+                        job = lifespan_client.get(job["status_url"]).json()
+                    stored = lifespan_client.get(job["result"]["assessment_url"])
+
+            assert response.status_code == 202
+            assert response.json()["status"] == "pending"
+            assert job["status"] == "completed"
+            assert stored.status_code == 200
+            assert stored.json()["image_path"].endswith(f"{job['result']['assessment_id']}.png")
+            assert len(stored_images(tmp_dir)) == 1
+
+    def test_url_job_events_stream(self):
+        """The events URL streams server-sent events until the job finishes"""
+        with patch("app.api.damage_assessment.get_image_downloader") as mock_downloader:
+            mock_downloader.return_value.fetch = AsyncMock(return_value=DownloadedImage(b"not an image", "image/png"))
+            with TestClient(app) as lifespan_client:
+                job = lifespan_client.post("/api/v1/damage/jobs/by-url",
+                                           json={"fileUrl": "https://example.com/x.png"}).json()
+                with lifespan_client.stream("GET", job["events_url"]) as response:
+                    body = "".join(response.iter_text())
+
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert "event: failed" in body
+        assert "Could not decode image" in body
+
+    def test_unknown_job_and_bad_fidelity(self):
+        """Unknown jobs return 404 and invalid submissions are rejected before queueing"""
+        assert client.get("/api/v1/damage/jobs/missing").status_code == 404
+        assert client.get("/api/v1/damage/jobs/missing/events").status_code == 404
+        response = client.post("/api/v1/damage/jobs/by-url",
+                               json={"fileUrl": "https://example.com/x.png", "fidelity": "ultra"})
+        assert response.status_code == 400
@@ -0,0 +1,54 @@
+"""
+Test Color Classifier
+Unit tests for the single-pass HSV range classifier
+"""
+import cv2
+import numpy as np
+import pytest
+
+from app.config.settings import get_settings
+from app.utils.color_classifier import HSVRangeClassifier
+
+
+def random_hsv(seed: int, shape=(120, 160)) -> np.ndarray:
+    bgr = np.random.default_rng(seed).integers(0, 256, (*shape, 3), dtype=np.uint8)
+    return cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV)
+
+
+def reference_count(hsv, ranges) -> int:
+    return sum(
+        int(np.count_nonzero(cv2.inRange(hsv, np.array(lower), np.array(upper))))
+        for lower, upper in ranges.values()
+    )
+
+
+class TestHSVRangeClassifier:
+    """Test cases for HSVRangeClassifier"""
+
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_matches_per_range_in_range(self, seed):
+        """Labels and counts equal one cv2.inRange mask per configured range"""
+        ranges = get_settings().color_damage_ranges
+        classifier = HSVRangeClassifier(ranges)
+        hsv = random_hsv(seed)
+
+        labels = classifier.classify(hsv)
+
+        assert classifier.count(labels) == reference_count(hsv, ranges)
+        for name, (lower, upper) in ranges.items():
+            expected = cv2.inRange(hsv, np.array(lower), np.array(upper)) > 0
+            assert np.array_equal(classifier.mask(labels, name), expected)
+
+    def test_overlapping_ranges_counted_per_range(self):
+        """Pixels inside two overlapping ranges count once for each, like summed inRange masks"""
+        ranges = {"warm": [[0, 0, 0], [60, 255, 255]], "bright": [[0, 0, 128], [180, 255, 255]]}
+        classifier = HSVRangeClassifier(ranges)
+        hsv = random_hsv(3)
+
+        assert classifier.overlapping
+        assert classifier.count(classifier.classify(hsv)) == reference_count(hsv, ranges)
+
+    def test_too_many_ranges_rejected(self):
+        ranges = {f"r{i}": [[i, 0, 0], [i, 255, 255]] for i in range(9)}
+        with pytest.raises(ValueError):
+            HSVRangeClassifier(ranges)
@@ -0,0 +1,51 @@
+"""
+Test Color Features
+Unit tests for dominant color extraction
+"""
+import numpy as np
+import pytest
+
+from app.services.cv_service import CVService
+from app.utils.color_features import DOMINANT_COLOR_METHODS, dominant_colors, palette_distance
+
+
+def three_color_image() -> np.ndarray:
+    image = np.zeros((90, 120, 3), dtype=np.uint8)
+    image[:30] = (20, 40, 200)
+    image[30:60] = (200, 180, 30)
+    image[60:] = (90, 90, 90)
+    rng = np.random.default_rng(0)
+    noise = rng.integers(-3, 4, image.shape)
+    return np.clip(image.astype(int) + noise, 0, 255).astype(np.uint8)
+
+
+class TestDominantColors:
+    """Test cases for dominant color methods"""
+
+    @pytest.mark.parametrize("method", DOMINANT_COLOR_METHODS)
+    def test_recovers_distinct_palette(self, method):
+        """Every method finds the three solid colors of a simple scene"""
+        centers = dominant_colors(three_color_image(), method, 3, 3)
+
+        assert palette_distance(centers, [(20, 40, 200), (200, 180, 30), (90, 90, 90)]) < 3.0
+
+    @pytest.mark.parametrize("method", ["subsample", "histogram"])
+    def test_fast_methods_are_deterministic(self, method):
+        image = np.random.default_rng(1).integers(0, 256, (256, 256, 3), dtype=np.uint8)
+
+        assert np.array_equal(dominant_colors(image, method), dominant_colors(image, method))
+
+    def test_unknown_method_rejected(self):
+        with pytest.raises(ValueError):
+            dominant_colors(three_color_image(), "median-cut")
+
+    def test_feature_extraction_uses_configured_method(self):
+        """The dominant color setting switches the feature extractor's method"""
+        cv_service = CVService()
+        cv_service.settings = cv_service.settings.model_copy(update={"dominant_color_method": "histogram"})
+
+        features = cv_service._extract_features(three_color_image())
+
+        assert palette_distance(
+            features["color"]["dominant_colors"], [(20, 40, 200), (200, 180, 30), (90, 90, 90)]
+        ) < 3.0
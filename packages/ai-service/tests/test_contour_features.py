@@ -0,0 +1,110 @@
+"""
+Test Contour Features
+Unit tests for vectorized contour statistics and the detectors built on them
+"""
+import cv2
+import numpy as np
+import pytest
+
+from app.services.cv_service import CVService
+from app.utils.contour_features import contour_areas_and_perimeters
+from app.utils.image_context import ImageAnalysisContext
+
+
+def blob_mask(seed: int, count: int = 400, shape=(600, 800)) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    mask = np.zeros(shape, dtype=np.uint8)
+    for _ in range(count):
+        center = (int(rng.integers(0, shape[1])), int(rng.integers(0, shape[0])))
+        axes = (int(rng.integers(1, 40)), int(rng.integers(1, 12)))
+        cv2.ellipse(mask, center, axes, float(rng.integers(0, 180)), 0, 360, 255, -1)
+    return mask
+
+
+def reference_debris_score(mask: np.ndarray) -> float:
+    """The original per-contour loop"""
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    debris_contours = []
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if 50 < area < 5000:
+            perimeter = cv2.arcLength(contour, True)
+            if perimeter > 0:
+                circularity = 4 * np.pi * area / (perimeter * perimeter)
+                if 0.1 < circularity < 0.9:
+                    debris_contours.append(contour)
+    total_area = sum(cv2.contourArea(c) for c in debris_contours)
+    count_score = min(1.0, len(debris_contours) / 20)
+    area_score = min(1.0, total_area / (mask.shape[0] * mask.shape[1] * 0.1))
+    return (count_score + area_score) / 2
+
+
+def reference_deformation_score(lines) -> float:
+    """The original per-line loop"""
+    if lines is None or len(lines) < 5:
+        return 0.0
+    score = 0.0
+    for line in lines:
+        angle = line[0][1] * 180 / np.pi
+        if min(abs(angle - expected) for expected in [0, 45, 90, 135]) > 15:
+            score += 0.1
+    return min(1.0, score)
+
+
+class TestContourFeatures:
+    """Test cases for vectorized contour statistics"""
+
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_matches_opencv_per_contour(self, seed):
+        contours, _ = cv2.findContours(blob_mask(seed), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        areas, perimeters = contour_areas_and_perimeters(contours)
+
+        assert np.allclose(areas, [cv2.contourArea(c) for c in contours])
+        assert np.allclose(perimeters, [cv2.arcLength(c, True) for c in contours], atol=1e-3)
+
+    def test_degenerate_contours(self):
+        """Single points and two-point segments have zero area, like cv2.contourArea"""
+        contours = (np.array([[[3, 4]]], dtype=np.int32), np.array([[[0, 0]], [[3, 4]]], dtype=np.int32))
+
+        areas, perimeters = contour_areas_and_perimeters(contours)
+
+        assert areas.tolist() == [0.0, 0.0]
+        assert perimeters.tolist() == [0.0, 10.0]
+        assert contour_areas_and_perimeters(())[0].size == 0
+
+    def test_large_coordinates(self):
+        """Contours of very large (tiled/aerial) images do not overflow int32 products"""
+        square = np.array([[[0, 0]], [[60000, 0]], [[60000, 60000]], [[0, 60000]]], dtype=np.int32)
+        offset = square + np.int32(40000)
+
+        areas, perimeters = contour_areas_and_perimeters((square, offset))
+
+        assert areas.tolist() == [3.6e9, 3.6e9]
+        assert perimeters.tolist() == [240000.0, 240000.0]
+        assert np.allclose(areas, [cv2.contourArea(square), cv2.contourArea(offset)])
+
+
+class TestVectorizedDetectors:
+    """Vectorized debris/deformation detectors keep the original scores"""
+
+    def setup_method(self):
+        self.cv_service = CVService()
+
+    @pytest.mark.parametrize("seed,count", [(0, 30), (1, 400), (2, 2000)])
+    def test_debris_score_unchanged(self, seed, count):
+        mask = blob_mask(seed, count)
+        ctx = ImageAnalysisContext(np.zeros((*mask.shape, 3), dtype=np.uint8))
+        ctx.seed("debris_mask", mask)
+
+        assert self.cv_service._detect_debris(ctx) == pytest.approx(reference_debris_score(mask), abs=1e-9)
+
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_deformation_score_unchanged(self, seed):
+        image = np.random.default_rng(seed).integers(0, 256, (240, 320, 3), dtype=np.uint8)
+        ctx = ImageAnalysisContext(image)
+        lines = self.cv_service._hough_lines(ctx)
+
+        assert self.cv_service._detect_structural_deformation(ctx) == pytest.approx(
+            reference_deformation_score(lines), abs=1e-9
+        )
@@ -9,6 +9,9 @@ import tempfile
 import os
 
 from app.services.cv_service import CVService
+from app.services.ml_service import MLService
+from app.services.post_processing import get_post_processing_queue
+from app.utils.image_context import ImageAnalysisContext
 
 class TestCVService:
     """Test cases for CVService"""
@@ -36,6 +39,18 @@ class TestCVService:
             # Cleanup
             os.unlink(tmp.name)
 
+    @pytest.mark.asyncio
+    async def test_preprocess_reports_uploaded_dimensions(self):
+        """original_dimensions is the uploaded image's size, not the budget-reduced decode"""
+        import cv2
+        data = cv2.imencode(".png", np.zeros((600, 800, 3), dtype=np.uint8))[1].tobytes()
+        ctx = ImageAnalysisContext.from_bytes(data, max_pixels=120_000)
+
+        result = await self.cv_service.preprocess_image(ctx)
+
+        assert ctx.dimensions == (400, 300)
+        assert result["original_dimensions"] == (800, 600)
+
     @pytest.mark.asyncio
     async def test_detect_damage(self):
         """Test damage detection"""
@@ -52,3 +67,175 @@ class TestCVService:
         assert "confidence_score" in result
         assert result["damage_level"] in ["Minor", "Moderate", "Severe"]
         assert 0 <= result["confidence_score"] <= 1
+
+    @pytest.mark.asyncio
+    async def test_context_is_decoded_once(self):
+        """CV and ML stages share one decoded image instead of re-reading the file"""
+        import cv2
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "scene.png")
+            test_image = np.random.default_rng(0).integers(0, 256, (120, 160, 3), dtype=np.uint8)
+            cv2.imwrite(path, test_image)
+
+            ctx = ImageAnalysisContext.from_path(path)
+            with patch("cv2.imread", side_effect=AssertionError("image re-read from disk")):
+                cv_result = await self.cv_service.analyze_damage(ctx, debug=True)
+                infra_result = await self.cv_service.assess_infrastructure_damage(ctx)
+                ml_result = await MLService().classify_damage(ctx)
+
+            assert "error" not in cv_result
+            assert cv_result["preprocessing"]["original_dimensions"] == (160, 120)
+            get_post_processing_queue().join()  # the overlay is written in the background
+            assert os.path.exists(cv_result["debug_image_path"])
+            assert "error" not in infra_result
+            assert "error" not in ml_result
+            assert ctx.resized((224, 224)) is ctx.resized((224, 224))
+
+    @pytest.mark.asyncio
+    async def test_derived_planes_computed_once(self):
+        """Gray/Canny/Hough/debris planes and detector scores are computed at most once per image"""
+        test_image = np.random.default_rng(1).integers(0, 256, (200, 240, 3), dtype=np.uint8)
+        ctx = ImageAnalysisContext(test_image)
+
+        await self.cv_service.analyze_damage(ctx)
+        await self.cv_service.assess_infrastructure_damage(ctx)
+        stats = ctx.cache_stats()
+
+        for key in ["gray", "hsv", "canny", "hough_lines", "debris_mask", "color_labels", "indicators",
+                    "score:color", "score:texture", "score:edge", "score:debris", "score:deformation"]:
+            assert stats["misses"][key] == 1
+        # Safety and accessibility checks reuse the debris score and indicator pass
+        assert stats["hits"]["score:debris"] >= 2
+        assert stats["hits"]["indicators"] >= 1
+
+    @pytest.mark.asyncio
+    async def test_fast_fidelity_downscales_and_skips_texture(self):
+        """The fast tier analyzes a <=640px copy and drops the texture detector"""
+        test_image = np.random.default_rng(2).integers(0, 256, (900, 1200, 3), dtype=np.uint8)
+        ctx = ImageAnalysisContext(test_image)
+
+        result = await self.cv_service.analyze_damage(ctx, fidelity="fast")
+
+        assert result["fidelity"] == "fast"
+        assert result["analysis_dimensions"] == (640, 480)
+        assert result["preprocessing"]["original_dimensions"] == (1200, 900)
+        assert result["indicators"]["skipped_detectors"] == ["texture"]
+        assert "score:texture" not in ctx.fit_within(640).cache_stats()["misses"]
+
+    @pytest.mark.asyncio
+    async def test_fast_fidelity_infrastructure_skips_texture(self):
+        """Infrastructure assessment in the fast tier reuses its detector set, so texture never runs"""
+        test_image = np.random.default_rng(2).integers(0, 256, (900, 1200, 3), dtype=np.uint8)
+        ctx = ImageAnalysisContext(test_image)
+
+        await self.cv_service.analyze_damage(ctx, fidelity="fast")
+        result = await self.cv_service.assess_infrastructure_damage(ctx, fidelity="fast")
+
+        assert "error" not in result
+        stats = ctx.fit_within(640).cache_stats()
+        assert "score:texture" not in stats["misses"]
+        assert "indicators" not in stats["misses"]
+        assert stats["hits"]["indicators:color,edge,debris,deformation"] >= 1
+
+    @pytest.mark.asyncio
+    async def test_coarse_damage_uses_small_downscale(self):
+        """The coarse pass runs the fast detectors on a copy no larger than coarse_max_dimension"""
+        test_image = np.random.default_rng(5).integers(0, 256, (900, 1200, 3), dtype=np.uint8)
+
+        result = await self.cv_service.coarse_damage(ImageAnalysisContext(test_image), max_dimension=320)
+
+        assert result["analysis_dimensions"] == (320, 240)
+        assert result["indicators"]["skipped_detectors"] == ["texture"]
+        assert result["damage_level"] in self.cv_service.damage_classes
+
+    @pytest.mark.asyncio
+    async def test_full_fidelity_analyzes_original(self):
+        """The full tier runs every detector on the original resolution"""
+        test_image = np.random.default_rng(4).integers(0, 256, (300, 400, 3), dtype=np.uint8)
+
+        result = await self.cv_service.analyze_damage(ImageAnalysisContext(test_image), fidelity="full")
+
+        assert result["analysis_dimensions"] == (400, 300)
+        assert "skipped_detectors" not in result["indicators"]
+
+    @pytest.mark.asyncio
+    async def test_unknown_fidelity_rejected(self):
+        """Unknown tiers are reported instead of silently falling back"""
+        ctx = ImageAnalysisContext(np.zeros((32, 32, 3), dtype=np.uint8))
+
+        result = await self.cv_service.analyze_damage(ctx, fidelity="ultra")
+
+        assert "error" in result
+
+    def test_damage_score_reweighted_over_run_detectors(self):
+        """Skipped detectors do not drag the combined score towards zero"""
+        indicators = self.cv_service._empty_indicators(["texture"])
+        for name in ["color", "edge", "debris", "deformation"]:
+            indicators[f"{name}_score"] = 0.8
+
+        assert self.cv_service._calculate_damage_score(indicators) == pytest.approx(0.8)
+
+    @pytest.mark.asyncio
+    async def test_tiled_analysis_grid_and_heatmap(self):
+        """Tiled mode returns a per-tile severity grid, aggregate score and heatmap"""
+        test_image = np.random.default_rng(7).integers(0, 256, (300, 500, 3), dtype=np.uint8)
+        test_image[:, :250] = 0
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with patch.object(self.cv_service.settings, "upload_directory", tmp_dir):
+                result = await self.cv_service.analyze_tiled(test_image, tile_size=128, heatmap=True)
+
+            assert "error" not in result
+            assert result["tiling"]["rows"] == 3 and result["tiling"]["cols"] == 4
+            assert len(result["severity_grid"]) == 3 and len(result["severity_grid"][0]) == 4
+            assert result["max_tile_score"] >= result["damage_score"]
+            assert os.path.exists(result["heatmap_path"])
+
+    @pytest.mark.asyncio
+    async def test_single_tile_matches_whole_image_analysis(self):
+        """A tile covering the whole image scores the same as the regular pipeline"""
+        test_image = np.random.default_rng(8).integers(0, 256, (200, 240, 3), dtype=np.uint8)
+
+        tiled = await self.cv_service.analyze_tiled(test_image, tile_size=256)
+        whole = await self.cv_service.analyze_damage(ImageAnalysisContext(test_image))
+
+        assert tiled["damage_score"] == pytest.approx(whole["damage_score"])
+
+    def test_cascade_exits_early_on_minimal_image(self):
+        """A flat image is proven minimal without running Hough or LBP"""
+        test_image = np.full((240, 320, 3), (180, 140, 90), dtype=np.uint8)
+        ctx = ImageAnalysisContext(test_image)
+
+        with patch.object(self.cv_service.settings, "cv_detector_cascade", True):
+            indicators = self.cv_service._compute_damage_indicators(ctx)
+
+        cascade = indicators.pop("cascade")
+        assert cascade["minimal"] is True
+        assert cascade["exit_stage"] == "color"
+        assert set(cascade["bypassed_detectors"]) == {"edge", "deformation", "texture"}
+        assert "hough_lines" not in ctx.cache_stats()["misses"]
+        assert "score:texture" not in ctx.cache_stats()["misses"]
+        assert indicators == self.cv_service._empty_indicators()
+
+    def test_cascade_matches_full_run(self):
+        """Cascade mode reports the same indicators as running every detector"""
+        rng = np.random.default_rng(11)
+        images = [
+            np.full((200, 200, 3), 200, dtype=np.uint8),
+            rng.integers(0, 256, (200, 200, 3), dtype=np.uint8),
+        ]
+        for test_image in images:
+            full = self.cv_service._compute_damage_indicators(ImageAnalysisContext(test_image))
+            with patch.object(self.cv_service.settings, "cv_detector_cascade", True):
+                cascaded = self.cv_service._compute_damage_indicators(ImageAnalysisContext(test_image))
+            cascaded.pop("cascade")
+            assert cascaded == full
+
+    def test_texture_bound_covers_exact_score(self):
+        """The cheap texture bound never underestimates the LBP entropy score"""
+        rng = np.random.default_rng(12)
+        for test_image in [np.full((64, 64, 3), 90, dtype=np.uint8),
+                           rng.integers(0, 256, (64, 64, 3), dtype=np.uint8),
+                           np.tile(np.arange(64, dtype=np.uint8)[None, :, None], (64, 1, 3))]:
+            ctx = ImageAnalysisContext(test_image)
+            assert self.cv_service._texture_score_bound(ctx) >= self.cv_service._detect_texture_anomalies(ctx) - 1e-9
@@ -0,0 +1,76 @@
+"""
+Test Detector Scheduler
+Unit tests for dependency-aware parallel detector execution
+"""
+import threading
+
+import numpy as np
+import pytest
+
+from app.services.cv_service import CVService, DETECTORS
+from app.services.detector_scheduler import AnalysisNode, DetectorScheduler
+from app.utils.image_context import ImageAnalysisContext
+
+
+class TestDetectorScheduler:
+    """Test cases for DetectorScheduler"""
+
+    def setup_method(self):
+        """Setup a small reproducible context"""
+        self.ctx = ImageAnalysisContext(np.zeros((8, 8, 3), dtype=np.uint8))
+
+    def test_independent_nodes_run_concurrently(self):
+        """Two independent nodes can only pass a 2-party barrier if they overlap"""
+        barrier = threading.Barrier(2, timeout=5)
+
+        def meet(_ctx):
+            barrier.wait()
+            return threading.current_thread().name
+
+        scheduler = DetectorScheduler(
+            [AnalysisNode("a", meet), AnalysisNode("b", meet)], max_workers=2
+        )
+        results = scheduler.run(self.ctx, ["a", "b"])
+        scheduler.shutdown()
+
+        assert results["a"] != results["b"]
+
+    def test_dependencies_complete_before_dependents(self):
+        """Nodes start only after every input they read has finished"""
+        finished = []
+
+        def node(name):
+            def compute(_ctx):
+                finished.append(name)
+                return name
+            return compute
+
+        scheduler = DetectorScheduler([
+            AnalysisNode("gray", node("gray")),
+            AnalysisNode("canny", node("canny"), ("gray",)),
+            AnalysisNode("edge", node("edge"), ("canny",)),
+            AnalysisNode("color", node("color")),
+        ], max_workers=4)
+        results = scheduler.run(self.ctx, ["edge", "color"])
+        scheduler.shutdown()
+
+        assert results == {"edge": "edge", "color": "color"}
+        assert finished.index("gray") < finished.index("canny") < finished.index("edge")
+
+    def test_unknown_dependency_rejected(self):
+        """Graphs referencing undefined inputs are rejected up front"""
+        with pytest.raises(ValueError):
+            DetectorScheduler([AnalysisNode("edge", lambda ctx: 0.0, ("canny",))])
+
+    def test_parallel_indicators_match_sequential(self):
+        """Parallel and sequential execution produce identical detector scores"""
+        image = np.random.default_rng(3).integers(0, 256, (160, 200, 3), dtype=np.uint8)
+        cv_service = CVService()
+        sequential = DetectorScheduler(cv_service._analysis_nodes(), max_workers=1)
+        parallel = DetectorScheduler(cv_service._analysis_nodes(), max_workers=4)
+
+        expected = sequential.run(ImageAnalysisContext(image), DETECTORS)
+        actual = parallel.run(ImageAnalysisContext(image), DETECTORS)
+        parallel.shutdown()
+
+        assert actual == expected
@@ -0,0 +1,69 @@
+"""
+Test Image Derivatives
+Unit tests for thumbnail/preview rendering and storage
+"""
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+from app.utils.image_context import ImageAnalysisContext
+from app.utils.image_derivatives import derivative_path, derivative_source, write_derivatives
+
+SIZES = {"thumbnail": 64, "preview": 256}
+
+
+def scene(width: int = 800, height: int = 600) -> np.ndarray:
+    return np.random.default_rng(3).integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+class TestDerivativeSource:
+    """Test cases for derivative_source"""
+
+    def test_reduces_to_largest_size(self):
+        """Only the preview-sized pixels are kept from the decoded image"""
+        source = derivative_source(ImageAnalysisContext(scene()), SIZES)
+
+        assert source.dimensions == (256, 192)
+
+    def test_reduced_decode_too_small(self):
+        """A decode smaller than the preview (of a larger original) cannot be used"""
+        ctx = ImageAnalysisContext(scene(200, 150))
+        ctx.source_dimensions = (2000, 1500)
+
+        assert derivative_source(ctx, SIZES) is None
+
+        # A small original is used as-is
+        assert derivative_source(ImageAnalysisContext(scene(200, 150)), SIZES).dimensions == (200, 150)
+
+
+class TestWriteDerivatives:
+    """Test cases for write_derivatives"""
+
+    def test_writes_each_size_and_format(self):
+        """Thumbnail and preview are stored next to the original as JPEG and WebP"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            original = os.path.join(tmp_dir, "abc.png")
+            written = write_derivatives(ImageAnalysisContext(scene()), original, SIZES, quality=80)
+
+            assert sorted(os.path.basename(path) for path in written) == [
+                "abc_preview.jpg", "abc_preview.webp", "abc_thumbnail.jpg", "abc_thumbnail.webp",
+            ]
+            assert derivative_path(original, "thumbnail", "webp") == os.path.join(tmp_dir, "abc_thumbnail.webp")
+            thumbnail = cv2.imread(derivative_path(original, "thumbnail", "webp"))
+            assert thumbnail.shape == (48, 64, 3)
+            assert not [name for name in os.listdir(tmp_dir) if name.endswith(".partial")]
+
+    def test_renders_from_original_bytes_or_path(self):
+        """Without a decoded image, the original is decoded (just large enough) instead"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            original = os.path.join(tmp_dir, "photo.jpg")
+            data = cv2.imencode(".jpg", scene(2000, 1500))[1].tobytes()
+            with open(original, "wb") as f:
+                f.write(data)
+
+            for source in (data, original):
+                write_derivatives(source, original, SIZES, quality=80)
+                preview = cv2.imread(derivative_path(original, "preview", "jpeg"))
+                assert preview.shape == (192, 256, 3)
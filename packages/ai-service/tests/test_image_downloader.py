@@ -0,0 +1,173 @@
+"""
+Test Image Downloader
+Unit tests for the pooled async image downloader
+"""
+import asyncio
+import http.server
+import threading
+import time
+
+import httpx
+import pytest
+
+from app.services.image_downloader import ImageDownloader
+
+IMAGE_BYTES = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 40
+
+
+def make_downloader(handler, **kwargs) -> ImageDownloader:
+    return ImageDownloader(transport=httpx.MockTransport(handler), **kwargs)
+
+
+class TestImageDownloader:
+    """Test cases for ImageDownloader"""
+
+    @pytest.mark.asyncio
+    async def test_download_reads_full_body(self):
+        """The body is returned intact along with its content type"""
+        def handler(request):
+            return httpx.Response(200, content=IMAGE_BYTES, headers={"content-type": "image/png"})
+
+        downloader = make_downloader(handler)
+        image = await downloader.fetch("https://storage.example.com/a.png")
+        await downloader.aclose()
+
+        assert image.data == IMAGE_BYTES
+        assert image.content_type == "image/png"
+        assert image.from_cache is False
+
+    @pytest.mark.asyncio
+    async def test_unchanged_image_revalidated_not_refetched(self):
+        """A repeated URL sends its ETag and reuses the cached bytes on 304"""
+        seen = []
+
+        def handler(request):
+            seen.append(request.headers.get("if-none-match"))
+            if request.headers.get("if-none-match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, content=IMAGE_BYTES,
+                                  headers={"content-type": "image/png", "etag": '"v1"'})
+
+        downloader = make_downloader(handler)
+        first = await downloader.fetch("https://storage.example.com/a.png")
+        second = await downloader.fetch("https://storage.example.com/a.png")
+        await downloader.aclose()
+
+        assert seen == [None, '"v1"']
+        assert second.from_cache is True
+        assert second.data == first.data
+        assert downloader.stats["downloads"] == 1 and downloader.stats["revalidated"] == 1
+
+    @pytest.mark.asyncio
+    async def test_non_image_and_oversized_responses_rejected(self):
+        """Non-image content types and bodies above max_size raise ValueError"""
+        def handler(request):
+            if request.url.path == "/page.html":
+                return httpx.Response(200, content=b"<html>", headers={"content-type": "text/html"})
+            return httpx.Response(200, content=IMAGE_BYTES, headers={"content-type": "image/png"})
+
+        downloader = make_downloader(handler, max_size=1024)
+        with pytest.raises(ValueError):
+            await downloader.fetch("https://storage.example.com/page.html")
+        with pytest.raises(ValueError):
+            await downloader.fetch("https://storage.example.com/a.png")
+        with pytest.raises(ValueError):
+            await downloader.fetch("ftp://storage.example.com/a.png")
+        await downloader.aclose()
+
+    @pytest.mark.asyncio
+    async def test_per_host_limit_bounds_concurrency(self):
+        """No more than per_host_limit requests to one host are in flight at once"""
+        in_flight = 0
+        peak = 0
+
+        async def handler(request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return httpx.Response(200, content=IMAGE_BYTES, headers={"content-type": "image/png"})
+
+        downloader = make_downloader(handler, per_host_limit=2)
+        await asyncio.gather(*(downloader.fetch(f"https://storage.example.com/{i}.png") for i in range(8)))
+        await downloader.aclose()
+
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_client_of_running_loop_closed_on_swap(self):
+        """Switching event loops closes the previous client on the loop that owns it"""
+        def handler(request):
+            return httpx.Response(200, content=IMAGE_BYTES, headers={"content-type": "image/png"})
+
+        downloader = make_downloader(handler)
+        other_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            asyncio.run_coroutine_threadsafe(downloader.fetch("https://storage.example.com/a.png"), other_loop).result()
+            previous = downloader._client
+
+            await downloader.fetch("https://storage.example.com/b.png")
+            for _ in range(100):
+                if previous.is_closed:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            other_loop.call_soon_threadsafe(other_loop.stop)
+            thread.join()
+            other_loop.close()
+        await downloader.aclose()
+
+        assert previous.is_closed
+
+    def test_connections_of_finished_loop_released(self):
+        """Pooled connections opened on an event loop that has since closed are not leaked"""
+        open_connections = []
+
+        class ImageHandler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so the client pools the connection
+
+            def setup(self):
+                super().setup()
+                open_connections.append(self)
+
+            def finish(self):
+                super().finish()
+                open_connections.remove(self)
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("content-type", "image/png")
+                self.send_header("content-length", str(len(IMAGE_BYTES)))
+                self.end_headers()
+                self.wfile.write(IMAGE_BYTES)
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/a.png"
+        downloader = ImageDownloader()
+        try:
+            first_loop = asyncio.new_event_loop()
+            first_loop.run_until_complete(downloader.fetch(url))
+            first_loop.close()
+            previous = downloader._client  # still referenced, so garbage collection cannot close it
+            assert len(open_connections) == 1
+
+            async def fetch_and_close():
+                await downloader.fetch(url)
+                await downloader.aclose()
+
+            asyncio.run(fetch_and_close())
+            deadline = time.monotonic() + 2
+            while open_connections and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert previous is not None and open_connections == []
@@ -0,0 +1,164 @@
+"""
+Test Image IO
+Unit tests for budgeted image decoding
+"""
+import io
+import os
+import tempfile
+import zipfile
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.config.fidelity import FIDELITY_TIERS
+from app.utils.image_context import ImageAnalysisContext
+from app.utils.image_io import ImageTooLargeError, decode_scale, fit_pixel_budget, iter_zip_images, load_image
+
+
+def scene(width: int, height: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 256, (height // 16, width // 16, 3), dtype=np.uint8)
+    return cv2.resize(small, (width, height), interpolation=cv2.INTER_LINEAR)
+
+
+def encode(image: np.ndarray, ext: str = ".jpg") -> bytes:
+    ok, buffer = cv2.imencode(ext, image)
+    assert ok
+    return buffer.tobytes()
+
+
+class TestPixelBudget:
+    """Test cases for the decode-time pixel budget"""
+
+    def test_fit_pixel_budget_preserves_aspect(self):
+        """Sizes are scaled to fit the budget with the aspect ratio kept"""
+        width, height = fit_pixel_budget(8000, 6000, 4_000_000)
+
+        assert width * height <= 4_000_000
+        assert width / height == pytest.approx(8000 / 6000, rel=0.01)
+        assert fit_pixel_budget(640, 480, 4_000_000) == (640, 480)
+        assert fit_pixel_budget(8000, 6000, None) == (8000, 6000)
+
+    def test_large_jpeg_reduced_while_decoding(self):
+        """JPEGs above the budget come back within it, with the original size reported"""
+        data = encode(scene(1600, 1200))
+
+        image, fmt, original = load_image(data, max_pixels=200_000, max_decode_pixels=0)
+
+        assert fmt == "JPEG"
+        assert original == (1600, 1200)
+        assert image.shape[0] * image.shape[1] <= 200_000
+        assert image.shape[1] / image.shape[0] == pytest.approx(4 / 3, rel=0.01)
+
+    def test_png_within_budget_matches_opencv(self):
+        """Images within the budget decode exactly as cv2.imread would"""
+        source = scene(320, 240)
+        image, fmt, original = load_image(encode(source, ".png"), max_pixels=1_000_000, max_decode_pixels=0)
+
+        assert fmt == "PNG"
+        assert original == (320, 240)
+        np.testing.assert_array_equal(image, source)
+
+    def test_decode_limit_rejects_before_decoding(self):
+        """Images above the decode limit raise ImageTooLargeError"""
+        data = encode(scene(1600, 1200), ".png")
+
+        with pytest.raises(ImageTooLargeError):
+            load_image(data, max_pixels=0, max_decode_pixels=1_000_000)
+
+    def test_exif_orientation_applied(self):
+        """Rotated phone photos come back upright, like cv2.imread"""
+        buffer = io.BytesIO()
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotate 90 degrees clockwise
+        Image.fromarray(scene(640, 480)[:, :, ::-1]).save(buffer, "JPEG", exif=exif)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "rotated.jpg")
+            with open(path, "wb") as f:
+                f.write(buffer.getvalue())
+            image, _, original = load_image(path, max_pixels=0, max_decode_pixels=0)
+
+            assert image.shape[:2] == cv2.imread(path).shape[:2] == (640, 480)
+            assert original == (480, 640)
+
+    def test_context_from_path_applies_budget(self):
+        """ImageAnalysisContext.from_path decodes within the budget and keeps the source size"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "large.jpg")
+            cv2.imwrite(path, scene(1600, 1200))
+
+            ctx = ImageAnalysisContext.from_path(path, max_pixels=300_000)
+
+            assert ctx.width * ctx.height <= 300_000
+            assert ctx.source_dimensions == (1600, 1200)
+
+    def test_context_from_bytes_matches_from_path(self):
+        """In-memory decoding gives the same pixels as decoding the stored file"""
+        data = encode(scene(640, 480))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "image.jpg")
+            with open(path, "wb") as f:
+                f.write(data)
+
+            from_path = ImageAnalysisContext.from_path(path)
+            from_bytes = ImageAnalysisContext.from_bytes(data, source_path=path)
+
+            np.testing.assert_array_equal(from_path.image, from_bytes.image)
+            assert from_bytes.source_path == path
+
+
+class TestReducedDecode:
+    """Test cases for reduced-size JPEG decoding"""
+
+    def test_decode_scale_covers_stage_needs(self):
+        """The chosen scale is the smallest one that still covers the requested size"""
+        assert decode_scale(8000, 6000, None, (640, 512)) == 8
+        assert decode_scale(8000, 6000, None, (1280, 512)) == 4
+        assert decode_scale(8000, 6000, 4_200_000) == 2
+        assert decode_scale(8000, 6000, None) == 1
+        assert decode_scale(1000, 700, None, (640, 512)) == 1
+
+    def test_fast_tier_decodes_reduced_jpeg(self):
+        """A fast-tier decode is no larger than needed but still covers every stage"""
+        tier = FIDELITY_TIERS["fast"]
+        data = encode(scene(2048, 1536))
+
+        image, _, original = load_image(data, max_pixels=0, max_decode_pixels=0, min_size=tier.min_decode_size)
+
+        assert original == (2048, 1536)
+        assert image.shape[:2] == (768, 1024)
+        assert max(image.shape[:2]) >= tier.max_dimension and min(image.shape[:2]) >= 512
+
+    def test_full_tier_has_no_minimum_size(self):
+        """The full tier analyzes the original resolution, so it never requests a smaller decode"""
+        assert FIDELITY_TIERS["full"].min_decode_size is None
+        assert FIDELITY_TIERS["balanced"].min_decode_size == (1280, 512)
+
+
+class TestZipImages:
+    """Test cases for reading images from ZIP uploads"""
+
+    def test_images_read_in_memory_and_others_skipped(self):
+        """Image members are returned with their bytes; other members and folders are skipped"""
+        data = encode(scene(320, 240))
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr("site/a.jpg", data)
+            archive.writestr("notes.txt", b"hello")
+            archive.writestr("__MACOSX/site/._a.jpg", b"meta")
+            archive.writestr("big.png", b"x" * 2048)
+        buffer.seek(0)
+
+        members = list(iter_zip_images(buffer, ["jpg", "png"], max_member_size=1024 + len(data)))
+        oversized = list(iter_zip_images(io.BytesIO(buffer.getvalue()), ["png"], max_member_size=1024))
+
+        assert members == [("site/a.jpg", data, None), ("big.png", b"x" * 2048, None)]
+        assert oversized[0][0] == "big.png" and oversized[0][1] is None and "too large" in oversized[0][2]
+
+    def test_invalid_archive_raises_value_error(self):
+        """Data that is not a ZIP archive raises ValueError"""
+        with pytest.raises(ValueError):
+            list(iter_zip_images(io.BytesIO(b"not a zip"), ["jpg"], 1024))
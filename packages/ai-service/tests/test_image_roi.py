@@ -0,0 +1,76 @@
+"""
+Test Image Regions of Interest
+Unit tests for region parsing and cropping
+"""
+import numpy as np
+import pytest
+
+from app.utils.image_context import ImageAnalysisContext
+from app.utils.image_roi import RegionOfInterest, crop_region, parse_regions, regions_key
+
+
+class TestParseRegions:
+    """Test cases for parse_regions"""
+
+    def test_bbox_and_polygon(self):
+        """Rectangles become their four corners; labels are kept"""
+        regions = parse_regions([
+            {"bbox": [10, 20, 30, 40], "label": "house"},
+            {"polygon": [[0, 0], [10, 0], [0, 10]]},
+        ], max_regions=5)
+
+        assert regions[0].label == "house"
+        assert regions[0].bounds == (10, 20, 30, 40)
+        assert regions[0].area == 1200
+        assert regions[1].shape == "polygon" and regions[1].area == 50
+        assert parse_regions(None, max_regions=5) == ()
+        assert regions_key(regions) == regions_key(parse_regions([
+            {"bbox": [10, 20, 30, 40]}, {"polygon": [[0, 0], [10, 0], [0, 10]]},
+        ], max_regions=5))
+
+    @pytest.mark.parametrize("raw", [
+        [{"bbox": [1, 2, 3]}],
+        [{"bbox": [0, 0, -5, 5]}],
+        [{"polygon": [[0, 0], [1, 1]]}],
+        [{"bbox": [0, 0, 5, 5], "polygon": [[0, 0], [1, 0], [0, 1]]}],
+        ["not a region"],
+        [{"bbox": [0, 0, 5, 5]}] * 3,
+    ])
+    def test_invalid_regions_rejected(self, raw):
+        with pytest.raises(ValueError):
+            parse_regions(raw, max_regions=2)
+
+
+class TestCropRegion:
+    """Test cases for crop_region"""
+
+    def test_bbox_scaled_to_decoded_size(self):
+        """Regions are in original pixels; a context decoded at half size is cropped at half scale"""
+        image = np.arange(100 * 200 * 3, dtype=np.uint32).reshape(100, 200, 3).astype(np.uint8)
+        ctx = ImageAnalysisContext(image)
+        ctx.source_dimensions = (400, 200)
+
+        crop = crop_region(ctx, RegionOfInterest.bbox(40, 20, 100, 60))
+
+        assert crop.dimensions == (50, 30)
+        assert np.array_equal(crop.image, image[10:40, 20:70])
+        assert crop_region(ctx, RegionOfInterest.bbox(40, 20, 100, 60)) is crop
+
+    def test_polygon_outside_filled_with_mean(self):
+        """Pixels outside a polygon take the polygon's mean colour"""
+        image = np.zeros((64, 64, 3), dtype=np.uint8)
+        image[:, :32] = 200
+        ctx = ImageAnalysisContext(image)
+
+        crop = crop_region(ctx, RegionOfInterest.polygon([[0, 0], [32, 0], [32, 64], [0, 64]]))
+
+        assert crop.dimensions == (32, 64)
+        assert (crop.image == 200).all()
+
+        triangle = crop_region(ctx, RegionOfInterest.polygon([[0, 0], [63, 0], [0, 63]]))
+        assert 0 < triangle.image[62, 62, 0] < 200  # outside: mean of the half-bright triangle
+
+    def test_region_outside_image_rejected(self):
+        ctx = ImageAnalysisContext(np.zeros((64, 64, 3), dtype=np.uint8))
+        with pytest.raises(ValueError):
+            crop_region(ctx, RegionOfInterest.bbox(100, 100, 50, 50, label="far"))
@@ -0,0 +1,81 @@
+"""
+Test Image Tiles
+Unit tests for tile grids and tiled image access
+"""
+import os
+import tempfile
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.utils.image_tiles import TiledImage, tile_grid
+
+
+class TestTileGrid:
+    """Test cases for tile_grid"""
+
+    def test_grid_covers_image_with_clipped_edges(self):
+        """Tiles cover every pixel exactly once; edge tiles are clipped"""
+        windows = tile_grid(250, 130, 100)
+
+        assert [(w.row, w.col) for w in windows[:3]] == [(0, 0), (0, 1), (0, 2)]
+        assert len(windows) == 6
+        assert windows[-1].width == 50 and windows[-1].height == 30
+        assert sum(w.area for w in windows) == 250 * 130
+
+    def test_invalid_tile_size_rejected(self):
+        with pytest.raises(ValueError):
+            tile_grid(10, 10, 0)
+
+
+class TestTiledImage:
+    """Test cases for TiledImage"""
+
+    def setup_method(self):
+        self.image = np.random.default_rng(6).integers(0, 256, (130, 250, 3), dtype=np.uint8)
+
+    def test_file_tiles_match_decoded_image(self):
+        """Tiles read from a file equal the same region of the fully decoded image"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "ortho.png")
+            cv2.imwrite(path, self.image)
+
+            tiled = TiledImage.open(path)
+            for window, tile in tiled.iter_tiles(100):
+                expected = self.image[window.y:window.y + window.height, window.x:window.x + window.width]
+                assert np.array_equal(tile, expected)
+
+            assert max(tiled.overview(64).shape[:2]) == 64
+
+    def test_megapixel_budget_enforced(self):
+        """Images above the configured budget are rejected before decoding"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "ortho.png")
+            cv2.imwrite(path, self.image)
+
+            with pytest.raises(ValueError):
+                TiledImage.open(path, max_megapixels=0.01)
+
+    def test_open_keeps_global_bomb_limit(self):
+        """Opening an image above PIL's limit never lifts the limit other decodes rely on"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "ortho.png")
+            cv2.imwrite(path, self.image)
+            factory, accept = Image.OPEN["PNG"]
+            limits_seen = []
+
+            def recording_factory(*args):
+                limits_seen.append(Image.MAX_IMAGE_PIXELS)
+                return factory(*args)
+
+            with patch.object(Image, "MAX_IMAGE_PIXELS", 1000), \
+                    patch.dict(Image.OPEN, {"PNG": (recording_factory, accept)}):
+                tiled = TiledImage.open(path)
+                with pytest.raises(Image.DecompressionBombError):
+                    Image.open(path)
+
+            assert tiled.dimensions == (250, 130)
+            assert limits_seen and set(limits_seen) == {1000}
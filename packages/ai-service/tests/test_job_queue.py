@@ -0,0 +1,230 @@
+"""
+Test Job Queue
+Unit tests for asynchronous analysis jobs
+"""
+import asyncio
+from collections import deque
+
+import pytest
+
+from app.services.job_queue import (
+    JOB_HANDLERS, InMemoryJobBroker, JobQueue, JobQueueFullError, RedisJobBroker, job_handler,
+)
+
+
+class LocalRedis:
+    """Local stand-in for the few redis.asyncio commands the Redis broker uses"""
+
+    def __init__(self):
+        self.values = {}
+        self.lists = {}
+
+    @staticmethod
+    def _encode(value):
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    async def set(self, name, value, ex=None):
+        self.values[name] = self._encode(value)
+
+    async def get(self, name):
+        return self.values.get(name)
+
+    async def delete(self, *names):
+        for name in names:
+            self.values.pop(name, None)
+
+    async def exists(self, *names):
+        return sum(name in self.values for name in names)
+
+    async def lpush(self, name, *values):
+        self.lists.setdefault(name, deque()).extendleft(self._encode(v) for v in values)
+
+    async def rpush(self, name, *values):
+        self.lists.setdefault(name, deque()).extend(self._encode(v) for v in values)
+
+    async def llen(self, name):
+        return len(self.lists.get(name, ()))
+
+    async def lrange(self, name, start, end):
+        items = list(self.lists.get(name, ()))
+        return items[start:] if end == -1 else items[start:end + 1]
+
+    async def lrem(self, name, count, value):
+        items = self.lists.get(name, deque())
+        try:
+            items.remove(self._encode(value))
+        except ValueError:
+            return 0
+        return 1
+
+    async def blmove(self, source, destination, timeout, src="LEFT", dest="RIGHT"):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            if self.lists.get(source):
+                value = self.lists[source].pop() if src == "RIGHT" else self.lists[source].popleft()
+                target = self.lists.setdefault(destination, deque())
+                target.appendleft(value) if dest == "LEFT" else target.append(value)
+                return value
+            if asyncio.get_running_loop().time() >= deadline:
+                return None
+            await asyncio.sleep(0.01)
+
+    async def aclose(self):
+        pass
+
+
+@pytest.fixture
+def handlers():
+    """Register test job kinds for the duration of a test"""
+    saved = dict(JOB_HANDLERS)
+
+    @job_handler("echo")
+    async def echo(payload, data):
+        await asyncio.sleep(0.01)
+        return {"value": payload["value"], "size": len(data or b"")}
+
+    @job_handler("boom")
+    async def boom(payload, data):
+        raise ValueError("bad image")
+
+    yield
+    JOB_HANDLERS.clear()
+    JOB_HANDLERS.update(saved)
+
+
+async def wait_finished(queue: JobQueue, job_id: str) -> dict:
+    async for job in queue.events(job_id, heartbeat_seconds=0.05):
+        if job is not None and job["status"] in ("completed", "failed"):
+            return job
+    raise AssertionError("job disappeared")
+
+
+class TestJobQueue:
+    """Test cases for JobQueue with both brokers"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("make_broker", [
+        lambda: InMemoryJobBroker(),
+        lambda: RedisJobBroker(LocalRedis(), poll_seconds=0.01),
+    ], ids=["memory", "redis"])
+    async def test_jobs_complete_or_fail(self, handlers, make_broker):
+        """Submitting returns a pending job; workers complete it or record the error"""
+        queue = JobQueue(make_broker(), workers=2)
+        ok = await queue.submit("echo", {"value": 7}, b"abc")
+        bad = await queue.submit("boom", {})
+
+        assert ok["status"] == "pending"
+        done, failed = await wait_finished(queue, ok["job_id"]), await wait_finished(queue, bad["job_id"])
+        await queue.stop()
+
+        assert done["status"] == "completed" and done["result"] == {"value": 7, "size": 3}
+        assert failed["status"] == "failed" and failed["error"] == "bad image"
+
+    @pytest.mark.asyncio
+    async def test_events_report_each_status_change(self, handlers):
+        """The event stream yields pending, processing and completed, then ends"""
+        queue = JobQueue(InMemoryJobBroker(), workers=1)
+        job = await queue.submit("echo", {"value": 1})
+
+        statuses = [state["status"] async for state in queue.events(job["job_id"]) if state is not None]
+        await queue.stop()
+
+        assert statuses[-1] == "completed"
+        assert statuses == sorted(set(statuses), key=["pending", "processing", "completed"].index)
+
+    @pytest.mark.asyncio
+    async def test_worker_survives_broker_errors(self, handlers):
+        """A broker error while processing one job is logged and the worker moves on"""
+        class FlakyBroker(InMemoryJobBroker):
+            failures = 1
+
+            async def save(self, job):
+                if job["status"] == "processing" and self.failures:
+                    self.failures -= 1
+                    raise ConnectionError("broker unavailable")
+                await super().save(job)
+
+        queue = JobQueue(FlakyBroker(), workers=1)
+        lost = await queue.submit("echo", {"value": 1})
+        job = await queue.submit("echo", {"value": 2})
+
+        done = await asyncio.wait_for(wait_finished(queue, job["job_id"]), timeout=5)
+        await queue.stop()
+
+        assert done["status"] == "completed" and done["result"]["value"] == 2
+        assert (await queue.get(lost["job_id"]))["status"] == "pending"
+
+    @pytest.mark.asyncio
+    async def test_full_queue_refuses_submissions(self, handlers):
+        """Submissions beyond max_pending raise JobQueueFullError"""
+        queue = JobQueue(InMemoryJobBroker(), workers=1, max_pending=1)
+        queue.start = lambda: None  # no workers, so the job stays queued
+
+        await queue.submit("echo", {"value": 1})
+        with pytest.raises(JobQueueFullError):
+            await queue.submit("echo", {"value": 2})
+        with pytest.raises(ValueError):
+            await queue.submit("unknown", {})
+
+
+class TestRedisJobBroker:
+    """Test cases for at-least-once delivery with the Redis broker"""
+
+    @pytest.mark.asyncio
+    async def test_jobs_of_crashed_worker_are_requeued(self, handlers):
+        """A job dequeued by a worker that died (lease lapsed) runs again after recovery"""
+        redis = LocalRedis()
+        crashed = RedisJobBroker(redis, lease_grace_seconds=0.01)
+        submitter = JobQueue(crashed)
+        submitter.start = lambda: None  # no workers; the job is dequeued by hand below
+        job = await submitter.submit("echo", {"value": 5}, b"xy")
+        job_id, payload, data = await crashed.dequeue(timeout=1)
+        assert payload == {"value": 5} and data == b"xy"
+        assert await redis.lrange("ai-service:jobs:processing", 0, -1) == [job_id.encode()]
+
+        # The worker never acknowledges; its lease expires
+        await redis.delete(f"ai-service:jobs:lease:{job_id}")
+
+        queue = JobQueue(RedisJobBroker(redis, poll_seconds=0.01, lease_grace_seconds=0.01), workers=1)
+        queue.start()
+        done = await asyncio.wait_for(wait_finished(queue, job["job_id"]), timeout=5)
+        await queue.stop()
+
+        assert done["status"] == "completed" and done["result"] == {"value": 5, "size": 2}
+        assert await redis.llen("ai-service:jobs:processing") == 0
+        assert await redis.get(f"ai-service:jobs:payload:{job_id}") is None
+
+    @pytest.mark.asyncio
+    async def test_jobs_interrupted_by_shutdown_are_requeued(self, handlers):
+        """Stopping the queue mid-job leaves the job for recovery instead of failing it"""
+        @job_handler("slow")
+        async def slow(payload, data):
+            await asyncio.sleep(60)
+
+        redis = LocalRedis()
+        queue = JobQueue(RedisJobBroker(redis, poll_seconds=0.01), workers=1)
+        job = await queue.submit("slow", {})
+        while (await queue.get(job["job_id"]))["status"] != "processing":
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+        assert (await queue.get(job["job_id"]))["status"] == "processing"
+        assert await redis.lrange("ai-service:jobs:processing", 0, -1) == [job["job_id"].encode()]
+
+        await redis.delete(f"ai-service:jobs:lease:{job['job_id']}")  # the lease lapses
+        assert await RedisJobBroker(redis, lease_grace_seconds=0.01).recover() == 1
+        assert (await queue.get(job["job_id"]))["status"] == "pending"
+
+    @pytest.mark.asyncio
+    async def test_leased_and_finished_jobs_are_not_requeued(self):
+        """Recovery leaves jobs with a live lease alone and only acknowledges finished ones"""
+        redis = LocalRedis()
+        broker = RedisJobBroker(redis, lease_grace_seconds=0.01)
+        for job_id, status in (("running", "processing"), ("done", "completed")):
+            await broker.enqueue({"job_id": job_id, "status": status, "version": 1}, {}, None)
+            await broker.dequeue(timeout=1)
+        await redis.delete("ai-service:jobs:lease:done")
+
+        assert await broker.recover() == 0
+        assert await redis.lrange("ai-service:jobs:processing", 0, -1) == [b"running"]
+        assert await redis.llen("ai-service:jobs:queue") == 0
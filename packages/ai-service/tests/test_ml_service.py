@@ -51,3 +51,53 @@ class TestMLService:
         assert "priority_level" in result
         assert result["priority_level"] in ["Low", "Medium", "High", "Critical"]
         assert 0 <= result["priority_score"] <= 100
+
+    @pytest.mark.asyncio
+    async def test_classify_damage_batch_matches_single(self):
+        """Batch classification gives the same result as classifying each image alone"""
+        from app.utils.image_context import ImageAnalysisContext
+
+        rng = np.random.default_rng(0)
+        images = [ImageAnalysisContext(rng.integers(0, 256, (240, 320, 3), dtype=np.uint8)) for _ in range(3)]
+
+        batch = await self.ml_service.classify_damage_batch(images, "earthquake")
+        single = [await self.ml_service.classify_damage(image, "earthquake") for image in images]
+
+        assert batch == single
+        assert await self.ml_service.classify_damage_batch([]) == []
+
+    @pytest.mark.asyncio
+    async def test_classify_damage_batch_calls_model_once(self):
+        """A trained classifier is called once with one feature row per image"""
+        from app.utils.image_context import ImageAnalysisContext
+
+        clf = Mock()
+        clf.predict.side_effect = lambda x: np.array([2] * len(x))
+        clf.predict_proba.side_effect = lambda x: np.tile([0.1, 0.1, 0.8], (len(x), 1))
+        images = [ImageAnalysisContext(np.full((64, 64, 3), value, dtype=np.uint8)) for value in (10, 200)]
+
+        with patch.dict(self.ml_service.models, {"damage_classifier": clf}):
+            results = await self.ml_service.classify_damage_batch(images)
+
+        assert clf.predict.call_count == 1
+        assert clf.predict.call_args[0][0].shape[0] == 2
+        assert [r["damage_level"] for r in results] == ["Moderate", "Moderate"]
+        assert results[0]["confidence_score"] == pytest.approx(0.8)
+
+    @pytest.mark.asyncio
+    async def test_trained_classifier_single_matches_batch(self):
+        """With a trained classifier, one image is classified as a one-row batch"""
+        from app.utils.image_context import ImageAnalysisContext
+
+        clf = Mock()
+        clf.predict.side_effect = lambda x: np.array([1] * len(x))
+        clf.predict_proba.side_effect = lambda x: np.tile([0.2, 0.7, 0.1], (len(x), 1))
+        image = ImageAnalysisContext(np.full((64, 64, 3), 90, dtype=np.uint8))
+
+        with patch.dict(self.ml_service.models, {"damage_classifier": clf}):
+            single = await self.ml_service.classify_damage(image, "flood")
+            batch = await self.ml_service.classify_damage_batch([image], "flood")
+
+        assert single["model_used"] == "ml_model"
+        assert single == batch[0]
+        assert clf.predict.call_args[0][0].shape[0] == 1
@@ -0,0 +1,88 @@
+"""
+Test Post-Processing Queue
+Unit tests for background post-processing with retries
+"""
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from app.services.post_processing import PostProcessingQueue, get_post_processing_queue, post_process
+from app.utils.metrics import metrics
+
+
+class TestPostProcessingQueue:
+    """Test cases for PostProcessingQueue"""
+
+    def setup_method(self):
+        # Let the shared queue finish other tests' writes so they do not touch the metrics below
+        get_post_processing_queue().join()
+        metrics.reset()
+
+    def test_failed_tasks_retried_until_they_succeed(self):
+        """A task failing transiently is retried with backoff and then completes"""
+        attempts = []
+
+        def flaky(value):
+            attempts.append(value)
+            if len(attempts) < 3:
+                raise OSError("disk busy")
+
+        queue = PostProcessingQueue(workers=1, max_attempts=3, retry_backoff_seconds=0.001)
+        assert queue.submit("persist_image", flaky, "a")
+        queue.join()
+        queue.stop()
+
+        assert attempts == ["a", "a", "a"]
+        assert metrics.counter("post_processing_retries_total") == 2
+        assert metrics.counter("post_processing_completed_total") == 1
+
+    def test_task_failing_every_attempt_is_counted(self):
+        """After max_attempts the failure is logged and counted per kind"""
+        def broken():
+            raise OSError("read-only file system")
+
+        queue = PostProcessingQueue(workers=1, max_attempts=2, retry_backoff_seconds=0.001)
+        queue.submit("debug_overlay", broken)
+        queue.join()
+        queue.stop()
+
+        assert metrics.counter("post_processing_failed_total") == 1
+        assert metrics.counter("post_processing_failed_total:debug_overlay") == 1
+
+    def test_backlog_gauge_and_overflow(self):
+        """The backlog gauge tracks queued tasks; a full queue refuses new ones"""
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocked():
+            started.set()
+            release.wait(5)
+
+        queue = PostProcessingQueue(workers=1, max_pending=2)
+        queue.submit("persist_image", blocked)
+        started.wait(5)
+        assert queue.submit("persist_image", lambda: None)
+        assert queue.submit("persist_image", lambda: None)
+
+        assert metrics.snapshot()["gauges"]["post_processing_backlog"] == 2
+        assert metrics.snapshot()["gauges"]["post_processing_active"] == 1
+        assert not queue.submit("persist_image", lambda: None)
+        assert metrics.counter("post_processing_overflow_total") == 1
+
+        release.set()
+        queue.stop(timeout=5)
+        assert metrics.snapshot()["gauges"]["post_processing_backlog"] == 0
+        assert metrics.counter("post_processing_completed_total") == 3
+
+    @pytest.mark.asyncio
+    async def test_post_process_runs_inline_when_backlog_full(self):
+        """With a full queue the caller runs the task itself instead of dropping it"""
+        queue = PostProcessingQueue(workers=1, max_pending=1)
+        done = []
+
+        with patch("app.services.post_processing.get_post_processing_queue", return_value=queue), \
+             patch.object(queue, "submit", return_value=False):
+            await post_process("persist_image", done.append, "written")
+
+        assert done == ["written"]
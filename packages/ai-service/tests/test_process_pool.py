@@ -0,0 +1,122 @@
+"""
+Test Process Pool Backend
+Unit tests for shared-memory CV/ML execution in warm worker processes
+"""
+import os
+from multiprocessing import shared_memory
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+import pytest
+
+from app.services.cv_service import CVService, DETECTORS
+from app.services.ml_service import MLService
+from app.services.process_pool import ProcessPoolBackend, _attach_shared_memory
+from app.utils.image_context import ImageAnalysisContext
+from app.utils.metrics import metrics
+
+
+class TestProcessPoolBackend:
+    """Test cases for ProcessPoolBackend"""
+
+    @classmethod
+    def setup_class(cls):
+        """Start one warm worker shared by the tests in this class"""
+        cls.backend = ProcessPoolBackend(max_workers=1)
+        cls.backend.warm_up()
+
+    @classmethod
+    def teardown_class(cls):
+        cls.backend.shutdown()
+
+    def setup_method(self):
+        self.image = np.random.default_rng(5).integers(0, 256, (150, 180, 3), dtype=np.uint8)
+
+    @pytest.mark.asyncio
+    async def test_cv_analysis_matches_in_process(self):
+        """Worker results equal the in-process detector scores and features"""
+        cv_service = CVService()
+        ctx = ImageAnalysisContext(self.image)
+
+        remote = await self.backend.analyze_cv(self.image)
+
+        assert remote["scores"] == cv_service.detector_scheduler.run(ctx, DETECTORS)
+        assert remote["indicators"] == cv_service._detect_damage_indicators(ctx)
+        assert remote["features"]["edges"] == cv_service._enhanced_features(ctx.resized((512, 512)))["edges"]
+
+    @pytest.mark.asyncio
+    async def test_pipeline_infrastructure_reuses_pool_scores(self):
+        """In the damage pipeline, infrastructure reads the scores the pool seeded instead of recomputing them"""
+        from app.api.damage_assessment import UPLOAD_PIPELINE, DamageRequest
+        from app.config.fidelity import resolve_fidelity
+
+        image = np.random.default_rng(21).integers(0, 256, (150, 180, 3), dtype=np.uint8)
+        request = DamageRequest(cv2.imencode(".png", image)[1].tobytes(), resolve_fidelity("full"))
+
+        with patch("app.services.cv_service.process_backend_enabled", return_value=True), \
+                patch("app.services.cv_service.get_process_backend", return_value=self.backend):
+            results, _ = await UPLOAD_PIPELINE.run(request, ("infrastructure",))
+
+        assert "error" not in results["infrastructure"]
+        misses = request.image_ctx.cache_stats()["misses"]
+        assert not [key for key in misses if key.startswith("score:") or key.startswith("indicators")]
+
+    @pytest.mark.asyncio
+    async def test_worker_counters_reach_parent_registry(self):
+        """Counters incremented inside a worker (cascade stats) are merged into the service's metrics"""
+        flat = np.full((150, 180, 3), 120, dtype=np.uint8)
+        metrics.reset()
+
+        # Workers read their settings when spawned
+        with patch.dict(os.environ, {"CV_DETECTOR_CASCADE": "true"}):
+            backend = ProcessPoolBackend(max_workers=1)
+            try:
+                remote = await backend.analyze_cv(flat)
+            finally:
+                backend.shutdown()
+
+        assert remote["indicators"]["cascade"]["minimal"]
+        assert metrics.counter("cv_cascade_runs_total") == 1
+        assert metrics.counter("cv_cascade_minimal_total") == 1
+        assert metrics.counter("cv_cascade_detectors_skipped_total") > 0
+
+    @pytest.mark.asyncio
+    async def test_cascade_skips_texture_in_worker(self):
+        """With the cascade enabled, a minimal image never runs the texture detector in the worker"""
+        flat = np.full((150, 180, 3), (180, 140, 90), dtype=np.uint8)
+        metrics.reset()
+
+        with patch.dict(os.environ, {"CV_DETECTOR_CASCADE": "true"}):
+            backend = ProcessPoolBackend(max_workers=1)
+            try:
+                remote = await backend.analyze_cv(flat)
+            finally:
+                backend.shutdown()
+
+        assert remote["indicators"]["cascade"]["minimal"]
+        assert "texture" in remote["indicators"]["cascade"]["bypassed_detectors"]
+        assert "texture" not in remote["scores"]
+        assert metrics.counter("cv_cascade_detectors_skipped_total") > 0
+
+    @pytest.mark.asyncio
+    async def test_ml_features_match_in_process(self):
+        """Worker ML feature vectors equal the in-process extraction"""
+        expected = MLService()._extract_ml_features(ImageAnalysisContext(self.image))
+
+        remote = await self.backend.extract_ml_features(self.image)
+
+        assert np.allclose(remote, expected)
+
+    def test_attaching_leaves_resource_tracking_to_the_owner(self):
+        """Workers attach to the parent's block without registering it as their own"""
+        owner = shared_memory.SharedMemory(create=True, size=16)
+        try:
+            with patch("multiprocessing.resource_tracker.register") as register:
+                attached = _attach_shared_memory(owner.name)
+                attached.close()
+
+            register.assert_not_called()
+        finally:
+            owner.close()
+            owner.unlink()
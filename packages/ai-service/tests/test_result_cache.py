@@ -0,0 +1,160 @@
+"""
+Test Result Cache
+Unit tests for the content-addressed analysis result cache
+"""
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from app.services.result_cache import AnalysisResultCache
+from app.utils.image_hash import difference_hash, file_sha256, hamming_distance
+
+
+def scene(seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    # Smooth lighting gradient with a few solid objects, like a real photo
+    gradient = np.linspace(40, 200, 320, dtype=np.float32)[None, :] + np.linspace(0, 40, 240)[:, None]
+    image = np.repeat(gradient[:, :, None], 3, axis=2).astype(np.uint8)
+    for _ in range(12):
+        x, y = (int(v) for v in rng.integers(0, 280, 2))
+        cv2.rectangle(image, (x, y), (x + 40, y + 30), tuple(int(c) for c in rng.integers(0, 255, 3)), -1)
+    return image
+
+
+class TestImageHash:
+    """Test cases for content and perceptual hashes"""
+
+    def test_perceptual_hash_survives_resize_and_recompression(self):
+        """A resized JPEG copy stays within a few bits of the original"""
+        original = scene(1)
+        _, encoded = cv2.imencode(".jpg", cv2.resize(original, (160, 120)), [cv2.IMWRITE_JPEG_QUALITY, 60])
+        copy = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+
+        assert hamming_distance(difference_hash(original), difference_hash(copy)) <= 6
+        assert hamming_distance(difference_hash(original), difference_hash(scene(2))) > 6
+
+    def test_file_sha256_matches_bytes(self):
+        import hashlib
+        with tempfile.NamedTemporaryFile(delete=False) as tmp:
+            tmp.write(b"disaster" * 1000)
+        try:
+            assert file_sha256(tmp.name) == hashlib.sha256(b"disaster" * 1000).hexdigest()
+        finally:
+            os.unlink(tmp.name)
+
+
+class TestAnalysisResultCache:
+    """Test cases for AnalysisResultCache"""
+
+    def test_exact_and_near_hits(self):
+        cache = AnalysisResultCache(max_entries=4, max_distance=6)
+        cache.put("sha-a", 0b1011, {"score": 0.7})
+
+        value, info = cache.get_exact("sha-a")
+        assert value == {"score": 0.7} and info["match"] == "exact"
+
+        value, info = cache.get_similar(0b0011)
+        assert value == {"score": 0.7} and info == {**info, "match": "near", "distance": 1}
+        assert cache.get_exact("sha-b") is None
+
+    def test_returned_values_are_copies(self):
+        cache = AnalysisResultCache()
+        cache.put("sha-a", None, {"indicators": {"color_score": 0.1}})
+
+        value, _ = cache.get_exact("sha-a")
+        value["indicators"]["color_score"] = 1.0
+
+        assert cache.get_exact("sha-a")[0]["indicators"]["color_score"] == 0.1
+
+    def test_variants_are_isolated(self):
+        cache = AnalysisResultCache()
+        cache.put("sha-a", 0, {"fidelity": "fast"}, variant="fast")
+
+        assert cache.get_exact("sha-a", variant="full") is None
+        assert cache.get_similar(0, variant="full") is None
+
+    def test_lru_eviction(self):
+        cache = AnalysisResultCache(max_entries=2)
+        cache.put("a", None, 1)
+        cache.put("b", None, 2)
+        cache.get_exact("a")
+        cache.put("c", None, 3)
+
+        assert cache.get_exact("b") is None
+        assert cache.get_exact("a") is not None
+        assert cache.stats["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        cache = AnalysisResultCache(ttl_seconds=0.01)
+        cache.put("a", 0, 1)
+        time.sleep(0.02)
+
+        assert cache.get_exact("a") is None
+        assert cache.get_similar(0) is None
+        assert len(cache) == 0
+
+
+class TestCachedAnalysis:
+    """Test cases for the endpoint-level cache lookup"""
+
+    @pytest.mark.asyncio
+    async def test_resubmitted_images_skip_analysis(self):
+        """Identical bytes hit exactly without decoding; a recompressed copy hits by perceptual hash"""
+        from unittest.mock import patch
+        from app.api.damage_assessment import load_image_context, lookup_cached_analysis, store_cached_analysis
+
+        calls = []
+
+        async def run(path):
+            lookup = await lookup_cached_analysis(path, lambda: load_image_context(path), "full")
+            if lookup.results is not None:
+                return (*lookup.results, lookup.cache_info)
+            ctx = lookup.image_ctx or await load_image_context(path)
+            calls.append(ctx.dimensions)
+            results = {"damage_score": 0.5}, {"damage_score": 0.4}, {"safety_score": 7.0}
+            store_cached_analysis(lookup, results, "full")
+            return (*results, lookup.cache_info)
+
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+                patch("app.api.damage_assessment.get_result_cache", return_value=AnalysisResultCache()):
+            original = os.path.join(tmp_dir, "a.png")
+            copy = os.path.join(tmp_dir, "b.jpg")
+            cv2.imwrite(original, scene(3))
+            cv2.imwrite(copy, cv2.resize(scene(3), (200, 150)), [cv2.IMWRITE_JPEG_QUALITY, 70])
+
+            first = await run(original)
+            exact = await run(original)
+            near = await run(copy)
+
+        assert len(calls) == 1
+        assert first[3]["hit"] is False
+        assert exact[3]["hit"] and exact[3]["match"] == "exact"
+        assert near[3]["hit"] and near[3]["match"] == "near"
+        assert near[0] == {"damage_score": 0.5}
+
+    def test_tiled_heatmap_redrawn_for_each_upload(self):
+        """A tiled result served from the cache points at the new upload's own heatmap"""
+        from unittest.mock import patch
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        image_bytes = cv2.imencode(".png", scene(11))[1].tobytes()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with patch("app.api.damage_assessment.settings.upload_directory", tmp_dir), \
+                    patch("app.api.damage_assessment.get_result_cache", return_value=AnalysisResultCache()), \
+                    TestClient(app) as client:
+                first, second = (
+                    client.post("/api/v1/damage/assess-damage", params={"tiled": "true"},
+                                files={"file": ("aerial.png", image_bytes, "image/png")}).json()
+                    for _ in range(2)
+                )
+
+                assert second["analysis_data"]["cache"]["hit"]
+                for response in (first, second):
+                    heatmap_path = response["analysis_data"]["computer_vision"]["heatmap_path"]
+                    assert os.path.basename(heatmap_path) == f"{response['assessment_id']}_heatmap.png"
+                    assert os.path.exists(heatmap_path)
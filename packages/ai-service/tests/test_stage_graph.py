@@ -0,0 +1,101 @@
+"""
+Test Stage Graph
+Unit tests for the declarative async pipeline
+"""
+import asyncio
+
+import pytest
+
+from app.services.stage_graph import PipelineStage, StageGraph
+
+
+def sleeper(name, delay, log):
+    async def run(request, **inputs):
+        log.append(("start", name))
+        await asyncio.sleep(delay)
+        log.append(("end", name))
+        return {"name": name, "inputs": sorted(inputs), "request": request}
+    return run
+
+
+class TestStageGraph:
+    """Test cases for StageGraph"""
+
+    @pytest.mark.asyncio
+    async def test_independent_stages_overlap_and_dependents_wait(self):
+        """Stages without a dependency between them run at the same time; dependents get their inputs"""
+        log = []
+        graph = StageGraph([
+            PipelineStage("a", sleeper("a", 0.05, log)),
+            PipelineStage("b", sleeper("b", 0.05, log)),
+            PipelineStage("c", sleeper("c", 0.0, log), ("a", "b")),
+        ])
+
+        results, timings = await graph.run("req", ["c"])
+
+        assert log[:2] == [("start", "a"), ("start", "b")]
+        assert log.index(("start", "c")) > max(log.index(("end", "a")), log.index(("end", "b")))
+        assert results["c"] == {"name": "c", "inputs": ["a", "b"], "request": "req"}
+        assert timings["c"]["start_ms"] >= timings["a"]["duration_ms"]
+        assert timings["b"]["start_ms"] < timings["a"]["duration_ms"]
+
+    @pytest.mark.asyncio
+    async def test_provided_results_skip_stages(self):
+        """Stages whose results are provided are not run; only what the targets still need runs"""
+        log = []
+        graph = StageGraph([
+            PipelineStage("a", sleeper("a", 0, log)),
+            PipelineStage("b", sleeper("b", 0, log), ("a",)),
+            PipelineStage("unused", sleeper("unused", 0, log)),
+        ])
+
+        results, timings = await graph.run(None, ["b"], provided={"a": "given"})
+
+        assert set(timings) == {"b"}
+        assert results["a"] == "given"
+        assert ("start", "unused") not in log
+
+    @pytest.mark.asyncio
+    async def test_on_result_reports_stages_as_they_finish(self):
+        """on_result is called once per stage run, in completion order"""
+        log = []
+        graph = StageGraph([
+            PipelineStage("slow", sleeper("slow", 0.05, log)),
+            PipelineStage("fast", sleeper("fast", 0.0, log)),
+        ])
+        finished = []
+
+        await graph.run(None, ["slow", "fast"], on_result=lambda name, result: finished.append(name))
+
+        assert finished == ["fast", "slow"]
+
+    @pytest.mark.asyncio
+    async def test_stage_error_cancels_running_stages(self):
+        """The first failing stage is re-raised and stages still running are cancelled"""
+        cancelled = []
+
+        async def slow(request):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append("slow")
+                raise
+
+        async def fail(request):
+            raise ValueError("boom")
+
+        graph = StageGraph([PipelineStage("slow", slow), PipelineStage("fail", fail)])
+
+        with pytest.raises(ValueError):
+            await graph.run(None, ["slow", "fail"])
+        assert cancelled == ["slow"]
+
+    def test_invalid_graphs_rejected(self):
+        """Unknown dependencies and cycles raise ValueError"""
+        async def noop(request, **inputs):
+            return None
+
+        with pytest.raises(ValueError):
+            StageGraph([PipelineStage("a", noop, ("missing",))])
+        with pytest.raises(ValueError):
+            StageGraph([PipelineStage("a", noop, ("b",)), PipelineStage("b", noop, ("a",))])
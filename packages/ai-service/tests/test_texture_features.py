@@ -0,0 +1,153 @@
+"""
+Test Texture Features
+Unit tests for the vectorized LBP and GLCM texture engines
+"""
+import numpy as np
+import pytest
+
+from app.utils.texture_features import (
+    compute_glcm,
+    glcm_offsets,
+    haralick_features,
+    lbp_histogram,
+    lbp_n_bins,
+    local_binary_pattern,
+    multiscale_lbp_histograms,
+    quantize_gray,
+)
+
+
+def reference_lbp(gray, radius=1, n_points=8):
+    """Per-pixel LBP as originally implemented in CVService._calculate_lbp"""
+    h, w = gray.shape
+    lbp = np.zeros((h, w), dtype=np.int64)
+    for i in range(radius, h - radius):
+        for j in range(radius, w - radius):
+            center = gray[i, j]
+            code = 0
+            for p in range(n_points):
+                angle = 2 * np.pi * p / n_points
+                x = int(round(i + radius * np.cos(angle)))
+                y = int(round(j + radius * np.sin(angle)))
+                if 0 <= x < h and 0 <= y < w:
+                    if gray[x, y] >= center:
+                        code |= (1 << p)
+            lbp[i, j] = code
+    return lbp
+
+
+class TestLocalBinaryPattern:
+    """Test cases for the vectorized LBP engine"""
+
+    def setup_method(self):
+        """Setup a reproducible textured test image"""
+        rng = np.random.default_rng(42)
+        self.gray = rng.integers(0, 256, size=(48, 64), dtype=np.uint8)
+        self.gray[10:20, 10:30] = 128  # flat patch
+
+    @pytest.mark.parametrize("radius,n_points", [(1, 8), (2, 8), (2, 12), (3, 16), (3, 24)])
+    def test_histogram_matches_reference(self, radius, n_points):
+        """Vectorized histogram matches the per-pixel implementation"""
+        n_bins = lbp_n_bins(n_points)
+        expected = np.bincount(reference_lbp(self.gray, radius, n_points).ravel(), minlength=n_bins)
+        expected = expected / expected.sum()
+
+        hist = lbp_histogram(local_binary_pattern(self.gray, radius, n_points), n_bins)
+
+        assert np.allclose(hist, expected, atol=1e-6)
+
+    def test_rotation_invariant_codes_are_rotation_minimal(self):
+        """Rotation-invariant codes are fixed points of every bit rotation"""
+        codes = local_binary_pattern(self.gray, 1, 8, method="ror").astype(np.int64)
+        for shift in range(1, 8):
+            rotated = ((codes >> shift) | (codes << (8 - shift))) & 0xFF
+            assert np.all(codes <= rotated)
+
+    def test_uniform_histogram_bins(self):
+        """Uniform LBP produces n_points + 2 bins that sum to one"""
+        histograms = multiscale_lbp_histograms(self.gray, configs=((1, 8), (2, 16)))
+
+        assert histograms["r1_p8"].shape == (10,)
+        assert histograms["r2_p16"].shape == (18,)
+        assert np.isclose(histograms["r2_p16"].sum(), 1.0)
+
+    def test_codes_match_reference_on_half_pixel_offsets(self):
+        """Half-pixel sample offsets round like the per-pixel code (they alternate with position)"""
+        gray = np.random.default_rng(7).integers(0, 256, size=(40, 300), dtype=np.uint8)
+
+        assert np.array_equal(local_binary_pattern(gray, 3, 24), reference_lbp(gray, 3, 24))
+
+    def test_default_configs(self):
+        """The default multi-scale configs, including 24 points, produce uniform histograms"""
+        histograms = multiscale_lbp_histograms(self.gray)
+
+        assert sorted(histograms) == ["r1_p8", "r2_p16", "r3_p24"]
+        assert histograms["r3_p24"].shape == (26,)
+        assert all(np.isclose(hist.sum(), 1.0) for hist in histograms.values())
+
+    @pytest.mark.parametrize("method", ["ror", "uniform"])
+    def test_large_neighbourhood_mapping(self, method):
+        """Above the lookup-table limit codes are mapped directly, consistently with the tables"""
+        codes = local_binary_pattern(self.gray, 3, 24, method=method).astype(np.int64)
+        raw = local_binary_pattern(self.gray, 3, 24).astype(np.int64)
+
+        rotations = [((raw >> s) | (raw << (24 - s))) & 0xFFFFFF for s in range(24)]
+        if method == "ror":
+            expected = np.min(rotations, axis=0)
+        else:
+            ones = sum((raw >> p) & 1 for p in range(24))
+            transitions = sum(((raw ^ rotations[1]) >> p) & 1 for p in range(24))
+            expected = np.where(transitions <= 2, ones, 25)
+        border = np.zeros_like(raw, dtype=bool)
+        border[3:-3, 3:-3] = True
+        assert np.array_equal(codes[border], expected[border])
+
+    def test_invalid_method(self):
+        """Unknown methods are rejected"""
+        with pytest.raises(ValueError):
+            local_binary_pattern(self.gray, method="variance")
+
+
+def reference_glcm(quantized, levels, dy, dx):
+    """Pair-by-pair co-occurrence counting for a single offset"""
+    h, w = quantized.shape
+    glcm = np.zeros((levels, levels), dtype=np.float64)
+    for i in range(h):
+        for j in range(w):
+            ni, nj = i + dy, j + dx
+            if 0 <= ni < h and 0 <= nj < w:
+                glcm[quantized[i, j], quantized[ni, nj]] += 1.0
+    return glcm / glcm.sum()
+
+
+class TestGLCM:
+    """Test cases for the vectorized GLCM/Haralick engine"""
+
+    def setup_method(self):
+        """Setup a reproducible quantized test image"""
+        rng = np.random.default_rng(7)
+        self.quantized = quantize_gray(rng.integers(0, 256, size=(40, 50), dtype=np.uint8), 32)
+
+    def test_offsets_match_reference(self):
+        """Every offset of the single-pass GLCM matches pairwise counting"""
+        offsets = glcm_offsets(distances=(1, 2), angles=(0, 45, 90, 135))
+        glcm = compute_glcm(self.quantized, 32, offsets)
+
+        assert offsets[0] == (0, 1)
+        assert glcm.shape == (8, 32, 32)
+        for k, (dy, dx) in enumerate(offsets):
+            assert np.allclose(glcm[k], reference_glcm(self.quantized, 32, dy, dx))
+
+    def test_haralick_features(self):
+        """Haralick descriptors are consistent on constant and random images"""
+        constant = haralick_features(compute_glcm(np.full((10, 10), 3, dtype=np.uint8), 32))
+        assert np.isclose(constant["energy"][0], 1.0)
+        assert np.isclose(constant["contrast"][0], 0.0)
+        assert np.isclose(constant["homogeneity"][0], 1.0)
+        assert np.isclose(constant["entropy"][0], 0.0, atol=1e-9)
+        assert np.isclose(constant["correlation"][0], 1.0)
+
+        features = haralick_features(compute_glcm(self.quantized, 32, glcm_offsets()))
+        assert set(features) == {"energy", "contrast", "homogeneity", "correlation", "entropy", "dissimilarity"}
+        assert all(values.shape == (4,) for values in features.values())
+        assert np.all(np.abs(features["correlation"]) <= 1.0 + 1e-9)